@@ -14,6 +14,9 @@
 #include <sys/stat.h>
 #include <fcntl.h>  
 #include <errno.h>  
+#include <chrono>
+#include <cstdio>
+#include <csignal>
 
 
 using namespace cv;
@@ -43,33 +46,113 @@ void initPipe() {
     }
 }
 
+// Identity events are written as "<unix time with ms>|<name>\n".
+// While a student stays in view their name is repeated every
+// RESEND_AFTER_SECONDS as a heartbeat. The reader (IdentityChannel) only
+// greets a name again after hearing nothing of it for absent_after (15 s),
+// so this must stay well below that.
+const double RESEND_AFTER_SECONDS = 5.0;
+
 void sendStudentName(const std::string& studentName) {
     static std::string lastSent;
+    static double lastSentAt = 0.0;
+    static double lastOpenAttempt = 0.0;
+
+    double now = std::chrono::duration<double>(
+        std::chrono::system_clock::now().time_since_epoch()).count();
 
-    std::cerr<<"Function called with: "<<studentName<<std::endl<<std::flush;
-    if (studentName == lastSent){
-    std::cerr<<"Inside the lastSent if: "<<studentName<<std::endl<<std::flush;
-     return;
+    if (studentName == lastSent && now - lastSentAt < RESEND_AFTER_SECONDS) {
+        return;
     }
-     lastSent = studentName;
 
-    if (pipe_fd != -1) {
-        std::string msg = studentName + "\n";
-        ssize_t result= write(pipe_fd, msg.c_str(), msg.size());
-       if (result == -1) {
-            if (errno == EPIPE) {
-                std::cerr << "No reader on pipe\n"<<std::flush;
-            } else if (errno == EAGAIN || errno == EWOULDBLOCK) {
-                std::cerr << "INFO: No reader currently available on pipe\n"<<std::flush;
+    // The reader may have started after us: retry opening the pipe lazily
+    if (pipe_fd == -1) {
+        if (now - lastOpenAttempt < 1.0) {
+            return;
+        }
+        lastOpenAttempt = now;
+        initPipe();
+        if (pipe_fd == -1) {
+            return;
+        }
+    }
 
-            } else {
-                std::cerr << "Write failed: " << strerror(errno) << "\n"<<std::flush;
-            }
+    char stamp[32];
+    snprintf(stamp, sizeof(stamp), "%.3f|", now);
+    std::string msg = stamp + studentName + "\n";
+    ssize_t result= write(pipe_fd, msg.c_str(), msg.size());
+    if (result == -1) {
+        if (errno == EPIPE) {
+            std::cerr << "No reader on pipe\n"<<std::flush;
+            close(pipe_fd);
+            pipe_fd = -1;
+        } else if (errno == EAGAIN || errno == EWOULDBLOCK) {
+            std::cerr << "INFO: Pipe full, dropping " << studentName << "\n"<<std::flush;
+        } else {
+            std::cerr << "Write failed: " << strerror(errno) << "\n"<<std::flush;
         }
+        return;
     }
+
+    lastSent = studentName;
+    lastSentAt = now;
 }
 
 
+// The admin server retrains in a separate process ("FaceRecognition train")
+// after students are enrolled; pick up the new model and labels without a restart.
+const double MODEL_CHECK_SECONDS = 5.0;
+
+void reloadModelIfChanged() {
+    static fs::file_time_type loadedAt{};
+    static auto lastCheck = std::chrono::steady_clock::time_point{};
+
+    auto now = std::chrono::steady_clock::now();
+    if (std::chrono::duration<double>(now - lastCheck).count() < MODEL_CHECK_SECONDS) {
+        return;
+    }
+    lastCheck = now;
+
+    std::error_code ec;
+    auto modified = fs::last_write_time("faces/face_model.yml", ec);
+    if (ec) {
+        return;
+    }
+    if (loadedAt == fs::file_time_type{}) {
+        loadedAt = modified;  // the model loaded at startup
+        return;
+    }
+    if (modified == loadedAt) {
+        return;
+    }
+
+    // Read into a fresh model so a half-written file leaves the current one in place
+    Ptr<LBPHFaceRecognizer> fresh = LBPHFaceRecognizer::create();
+    try {
+        fresh->read("faces/face_model.yml");
+    }
+    catch (const cv::Exception& e) {
+        std::cerr << "Model changed but could not be read yet: " << e.what() << endl << std::flush;
+        return;
+    }
+
+    std::vector<std::string> freshNames;
+    ifstream labelFile("faces/labels.txt");
+    string name;
+    int lbl;
+    while (labelFile >> name >> lbl) {
+        if (lbl >= (int)freshNames.size()) {
+            freshNames.resize(lbl + 1);
+        }
+        freshNames[lbl] = name;
+    }
+
+    model = fresh;
+    names = freshNames;
+    loadedAt = modified;
+    std::cerr << "Reloaded retrained face model (" << names.size() << " labels)\n" << std::flush;
+}
+
 void startRecognition(CascadeClassifier& cascade, CascadeClassifier& nestedCascade, double scale) {
     if (model->empty() && !loadFaceRecognizer()) {
         std::cerr << "No trained model available. Train the recognizer first.\n"<<std::flush;
@@ -96,6 +179,8 @@ void startRecognition(CascadeClassifier& cascade, CascadeClassifier& nestedCasca
 
         cout<<"Before detecting and drawing in startRecognition"<<std::endl;
 
+        reloadModelIfChanged();
+
         Mat frameClone = frame.clone();
         detectAndDraw(frameClone, cascade, nestedCascade, scale, true);
 
@@ -433,6 +518,12 @@ bool loadFaceRecognizer() {
 
 int main(int argc, const char** argv) {
     std::cerr << "Face Recognition System" << endl<<std::flush;
+
+    // Batch retrain for the admin server: faces/ -> faces/face_model.yml, no camera
+    if (argc > 1 && string(argv[1]) == "train") {
+        fs::create_directories("faces");
+        return (loadTrainingData() && trainFaceRecognizer()) ? 0 : 1;
+    }
     
 	
 	struct stat st;
@@ -441,6 +532,8 @@ int main(int argc, const char** argv) {
     mkfifo("/tmp/studentName_pipe", 0666);
 }
 
+// A reader that goes away must not kill us on the next write
+signal(SIGPIPE, SIG_IGN);
 initPipe();
     // Load cascades - try different possible paths
     CascadeClassifier cascade, nestedCascade;
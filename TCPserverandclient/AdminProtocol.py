@@ -0,0 +1,432 @@
+"""
+Binary admin channel for enrolling students together with their face samples.
+
+A session starts with MAGIC on the same port as the JSON inserts; after
+that both sides exchange frames of <type: 1 byte><length: 4 bytes, big
+endian><payload>:
+
+    client -> server
+      S  JSON  student record + manifest [{"name", "size", "sha256"}]
+      C  bin   chunk: <file index: 2 bytes><offset: 8 bytes><data>
+      D  -     all chunks for the current student sent
+      Q  -     end of session
+    server -> client
+      K  JSON  {"upload_id", "have": {name: bytes already received}}
+      R  JSON  {"student", "saved": [...], "failed": {name: reason}}
+      X  JSON  {"error": message}
+
+Per student the client waits twice (K and R); chunks are streamed without
+acknowledgements. Partial files live in UPLOAD_DIR/<upload_id>/ until
+their checksum matches, so a dropped connection resumes from the bytes
+already received when the same manifest is sent again. Images whose
+checksum is already among the student's samples are reported as fully
+received and not stored twice, so resending a student whose R reply was
+lost changes nothing.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+MAGIC = b"SGF1"
+HEADER = struct.Struct("!cI")
+CHUNK_HEADER = struct.Struct("!HQ")
+CHUNK_SIZE = 64 * 1024
+MAX_FRAME = CHUNK_HEADER.size + 1024 * 1024
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+FACES_DIR = os.getenv("STUDENT_GUIDER_FACES_DIR", "faces")
+UPLOAD_DIR = os.getenv("STUDENT_GUIDER_UPLOAD_DIR", "face_uploads")
+RETRAIN_CMD = os.getenv("STUDENT_GUIDER_RETRAIN_CMD", "./FaceRecognition train")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# -------------------------
+# Framing
+# -------------------------
+
+def send_frame(sock, kind, payload=b""):
+    if isinstance(payload, (dict, list)):
+        payload = json.dumps(payload).encode()
+    sock.sendall(HEADER.pack(kind, len(payload)) + payload)
+
+
+def recv_exact(stream, n):
+    data = stream.read(n)
+    if data is None or len(data) < n:
+        raise ConnectionError("connection closed mid-frame")
+    return data
+
+
+def recv_frame(stream):
+    kind, length = HEADER.unpack(recv_exact(stream, HEADER.size))
+    if length > MAX_FRAME:
+        raise ProtocolError(f"frame too large ({length} bytes)")
+    return kind, recv_exact(stream, length) if length else b""
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def safe_name(name):
+    """Student names become folder names under faces/: no paths allowed."""
+    name = name.strip()
+    if not name or name in (".", "..") or "/" in name or "\\" in name or "\0" in name:
+        raise ProtocolError(f"invalid student name {name!r}")
+    return name
+
+
+# -------------------------
+# Retraining
+# -------------------------
+
+class RetrainQueue:
+    """
+    Collects enrolled students and runs one retrain per batch: after
+    `delay` seconds without new enrollments, or as soon as `max_batch`
+    students are waiting.
+    """
+
+    def __init__(self, command=RETRAIN_CMD, delay=30, max_batch=100, cwd=None):
+        self.command = command
+        self.delay = delay
+        self.max_batch = max_batch
+        self.cwd = cwd
+        self._pending = []
+        self._last_add = 0.0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="retrain-queue", daemon=True)
+        self._thread.start()
+
+    def add(self, name):
+        with self._cond:
+            if name not in self._pending:
+                self._pending.append(name)
+            self._last_add = time.monotonic()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while len(self._pending) < self.max_batch:
+                    quiet = time.monotonic() - self._last_add
+                    if quiet >= self.delay:
+                        break
+                    self._cond.wait(self.delay - quiet)
+                batch, self._pending = self._pending, []
+
+            print(f"[+] Retraining face model for {len(batch)} new students")
+            start = time.monotonic()
+            try:
+                result = subprocess.run(self.command, shell=True, cwd=self.cwd)
+                print(f"[+] Retrain finished (exit {result.returncode}) in {time.monotonic() - start:.1f}s")
+            except Exception as e:
+                print(f"[-] Retrain failed: {e}")
+
+
+# -------------------------
+# Server side
+# -------------------------
+
+class EnrollmentReceiver:
+    """
+    Handles one admin session per connection.
+
+    on_student(record) stores the student row (the TCPserver's insert);
+    images are verified and moved into faces/<name>/sample_N.<ext>.
+    """
+
+    def __init__(self, on_student, faces_dir=FACES_DIR, upload_dir=UPLOAD_DIR, retrain=None):
+        self.on_student = on_student
+        self.faces_dir = faces_dir
+        self.upload_dir = upload_dir
+        self.retrain = retrain
+
+    @staticmethod
+    def upload_id(record, manifest):
+        key = json.dumps([record.get("nume"), sorted((f["name"], f["sha256"]) for f in manifest)])
+        return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+    def serve(self, sock):
+        stream = sock.makefile("rb")
+        current = None
+        try:
+            if recv_exact(stream, len(MAGIC)) != MAGIC:
+                raise ProtocolError("bad magic")
+            while True:
+                kind, payload = recv_frame(stream)
+                if kind == b"S":
+                    current = self._begin(json.loads(payload))
+                    send_frame(sock, b"K", {"upload_id": current["upload_id"], "have": current["have"]})
+                elif kind == b"C":
+                    if current is None:
+                        raise ProtocolError("chunk before student record")
+                    self._chunk(current, payload)
+                elif kind == b"D":
+                    if current is None:
+                        raise ProtocolError("done before student record")
+                    send_frame(sock, b"R", self._finish(current))
+                    current = None
+                elif kind == b"Q":
+                    return
+                else:
+                    raise ProtocolError(f"unknown frame {kind!r}")
+        except (ProtocolError, ValueError, KeyError, IndexError, struct.error) as e:
+            print(f"[-] Enrollment session error: {e}")
+            try:
+                send_frame(sock, b"X", {"error": str(e)})
+            except OSError:
+                pass
+        except (ConnectionError, OSError) as e:
+            print(f"[-] Enrollment connection lost: {e} (partial uploads kept for resume)")
+        finally:
+            if current is not None:
+                for f in current["files"].values():
+                    f.close()
+            stream.close()
+
+    def _begin(self, message):
+        record = message["student"]
+        record["nume"] = safe_name(record["nume"])
+        manifest = message["files"]
+        for f in manifest:
+            if os.path.basename(f["name"]) != f["name"] or not f["name"].lower().endswith(IMAGE_EXTENSIONS):
+                raise ProtocolError(f"invalid file name {f['name']!r}")
+
+        upload_id = self.upload_id(record, manifest)
+        folder = os.path.join(self.upload_dir, upload_id)
+        os.makedirs(folder, exist_ok=True)
+
+        samples = self.samples_by_checksum(os.path.join(self.faces_dir, record["nume"]))
+        have, stored = {}, {}
+        for f in manifest:
+            if f["sha256"] in samples:
+                # Saved by an earlier attempt whose reply never arrived
+                stored[f["name"]] = samples[f["sha256"]]
+                have[f["name"]] = f["size"]
+                continue
+            part = os.path.join(folder, f["name"] + ".part")
+            have[f["name"]] = os.path.getsize(part) if os.path.exists(part) else 0
+        return {"record": record, "manifest": manifest, "upload_id": upload_id,
+                "folder": folder, "have": have, "stored": stored, "files": {}}
+
+    @staticmethod
+    def samples_by_checksum(target):
+        """sha256 -> file name for the samples already in faces/<name>/."""
+        if not os.path.isdir(target):
+            return {}
+        return {sha256_file(os.path.join(target, n)): n for n in sorted(os.listdir(target))
+                if n.startswith("sample_")}
+
+    def _chunk(self, upload, payload):
+        index, offset = CHUNK_HEADER.unpack_from(payload)
+        data = memoryview(payload)[CHUNK_HEADER.size:]
+        entry = upload["manifest"][index]
+        name = entry["name"]
+        if offset != upload["have"][name]:
+            raise ProtocolError(f"{name}: chunk at {offset}, expected {upload['have'][name]}")
+        if offset + len(data) > entry["size"]:
+            raise ProtocolError(f"{name}: more data than announced")
+
+        f = upload["files"].get(name)
+        if f is None:
+            f = upload["files"][name] = open(os.path.join(upload["folder"], name + ".part"), "ab")
+        f.write(data)
+        upload["have"][name] += len(data)
+
+    def _finish(self, upload):
+        for f in upload["files"].values():
+            f.close()
+        upload["files"] = {}
+
+        name = upload["record"]["nume"]
+        target = os.path.join(self.faces_dir, name)
+        existing = os.listdir(target) if os.path.isdir(target) else []
+        taken = [int(m.group(1)) for m in (re.match(r"sample_(\d+)\.", n) for n in existing) if m]
+        next_index = max(taken, default=-1) + 1
+
+        saved, failed = [], {}
+        added = 0
+        for entry in upload["manifest"]:
+            if entry["name"] in upload["stored"]:
+                saved.append(upload["stored"][entry["name"]])
+                continue
+            part = os.path.join(upload["folder"], entry["name"] + ".part")
+            if not os.path.exists(part) or os.path.getsize(part) != entry["size"]:
+                failed[entry["name"]] = "incomplete"
+                continue
+            if sha256_file(part) != entry["sha256"]:
+                os.remove(part)  # corrupt: the next attempt starts this file over
+                failed[entry["name"]] = "checksum mismatch"
+                continue
+            os.makedirs(target, exist_ok=True)
+            ext = os.path.splitext(entry["name"])[1].lower()
+            if ext == ".jpeg":
+                ext = ".jpg"  # FaceRecognition only loads .jpg and .png training samples
+            final = os.path.join(target, f"sample_{next_index}{ext}")
+            next_index += 1
+            os.replace(part, final)
+            saved.append(os.path.basename(final))
+            added += 1
+
+        if not failed:
+            shutil.rmtree(upload["folder"], ignore_errors=True)
+        if saved or not upload["manifest"]:
+            self.on_student(upload["record"])
+            if self.retrain is not None and added:
+                self.retrain.add(name)
+
+        print(f"[+] Enrolled {name}: {added} new samples, {len(saved) - added} already saved, {len(failed)} failed")
+        return {"student": name, "saved": saved, "failed": failed}
+
+
+# -------------------------
+# Client side
+# -------------------------
+
+class EnrollmentClient:
+    """Streams students and their images over one connection."""
+
+    def __init__(self, host, port, timeout=30):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.stream = self.sock.makefile("rb")
+        self.sock.sendall(MAGIC)
+
+    def _reply(self, expected):
+        kind, payload = recv_frame(self.stream)
+        message = json.loads(payload) if payload else {}
+        if kind == b"X":
+            raise ProtocolError(message.get("error", "server error"))
+        if kind != expected:
+            raise ProtocolError(f"expected {expected!r}, got {kind!r}")
+        return message
+
+    def enroll(self, record, image_paths):
+        """Upload one student; returns the server's report ({"saved", "failed"})."""
+        manifest = [{"name": os.path.basename(p), "size": os.path.getsize(p), "sha256": sha256_file(p)}
+                    for p in image_paths]
+        send_frame(self.sock, b"S", {"student": record, "files": manifest})
+        have = self._reply(b"K")["have"]
+
+        for index, (path, entry) in enumerate(zip(image_paths, manifest)):
+            offset = have.get(entry["name"], 0)
+            if offset >= entry["size"]:
+                continue
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    send_frame(self.sock, b"C", CHUNK_HEADER.pack(index, offset) + block)
+                    offset += len(block)
+
+        send_frame(self.sock, b"D")
+        return self._reply(b"R")
+
+    def close(self):
+        try:
+            send_frame(self.sock, b"Q")
+        except OSError:
+            pass
+        self.stream.close()
+        self.sock.close()
+
+
+def load_class(csv_path):
+    """
+    Read a class roster: CSV with nume,facultate,serie,grupa; each student's
+    images are in a folder named after them next to the CSV.
+    """
+    base = os.path.dirname(os.path.abspath(csv_path))
+    students = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            record = {k: (row.get(k) or "").strip() for k in ("nume", "facultate", "serie", "grupa")}
+            folder = os.path.join(base, record["nume"])
+            images = sorted(os.path.join(folder, n) for n in os.listdir(folder)
+                            if n.lower().endswith(IMAGE_EXTENSIONS)) if os.path.isdir(folder) else []
+            students.append((record, images))
+    return students
+
+
+def enroll_class(host, port, csv_path, retries=3, progress=print):
+    """
+    Enroll every student in the roster, reconnecting and resuming on network
+    errors. Returns one report per student; a student the server rejected,
+    or that could not be sent once the retries ran out, gets an "error"
+    entry instead of stopping the rest of the class.
+    """
+    pending = load_class(csv_path)
+    reports = []
+    client = None
+    attempts = 0
+    while pending:
+        record, images = pending[0]
+        try:
+            if client is None:
+                client = EnrollmentClient(host, port)
+            report = client.enroll(record, images)
+            reports.append(report)
+            progress(f"{record['nume']}: {len(report['saved'])} saved, {len(report['failed'])} failed")
+            pending.pop(0)
+            attempts = 0
+        except ProtocolError as e:
+            # The server ends the session after an error: record it and reconnect for the next student
+            client.sock.close()
+            client = None
+            reports.append({"student": record["nume"], "saved": [], "failed": {}, "error": str(e)})
+            progress(f"{record['nume']}: rejected ({e})")
+            pending.pop(0)
+            attempts = 0
+        except (ConnectionError, OSError) as e:
+            attempts += 1
+            if client is not None:
+                client.sock.close()
+                client = None
+            if attempts > retries:
+                progress(f"Connection lost ({e}); giving up on {len(pending)} students")
+                reports.extend({"student": r["nume"], "saved": [], "failed": {}, "error": f"not sent: {e}"}
+                               for r, _ in pending)
+                return reports
+            progress(f"Connection lost ({e}); resuming in {attempts} s")
+            time.sleep(attempts)
+    if client is not None:
+        client.close()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enroll a class (records + face images) on the kiosk")
+    parser.add_argument("csv", help="roster CSV (nume,facultate,serie,grupa); images in <nume>/ folders")
+    parser.add_argument("--host", default="192.168.1.108")
+    parser.add_argument("--port", type=int, default=9999)
+    args = parser.parse_args()
+
+    reports = enroll_class(args.host, args.port, args.csv)
+    errors = [r for r in reports if r.get("error")]
+    failed = sum(1 for r in reports if r["failed"])
+    for r in errors:
+        print(f"  {r['student']}: {r['error']}")
+    print(f"Enrolled {len(reports) - len(errors)} students ({failed} with failed images, {len(errors)} not enrolled)")
+    sys.exit(1 if failed or errors else 0)
+
+
+if __name__ == "__main__":
+    main()
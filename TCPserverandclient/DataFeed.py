@@ -0,0 +1,477 @@
+"""
+Read side of the TCPserver: paginated table listings and a change feed.
+
+Requests use the same one-JSON-per-connection format as the inserts:
+
+    {"type": "list", "table": "students", "filter": {"grupa": "30231"},
+     "after": 0, "limit": 100, "compress": true}
+    {"type": "changes", "since": 42, "limit": 1000}
+    {"type": "version"}
+    {"type": "snapshot"}
+
+Responses are newline-delimited JSON, optionally zlib-compressed as one
+stream: a header object, one JSON array per row, and a trailer object
+with the key to continue from ("next"). Rows are read with keyset
+pagination (WHERE id > ? ORDER BY id LIMIT ?) in short transactions,
+so neither side holds a whole table in memory and inserts are never
+blocked behind a long read.
+
+Every insert, update and delete on the served tables is recorded in
+change_log by triggers; its seq is the database version. Only the newest
+FEED_RETENTION entries are kept, so a replica that fell further behind
+gets a FeedGap and takes a new snapshot. Each database gets a random id
+when the feed is first prepared; it is sent with changes and snapshots so
+a replica notices when the writer's database was recreated.
+
+A snapshot is a one-line JSON header ({"version", "database", "size"}) followed by a
+zlib-compressed copy of the database (taken with the SQLite backup API,
+without change_log and its triggers). Replicas load it once and then
+follow the change feed from its version.
+"""
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import uuid
+import zlib
+
+PAGE_SIZE = 500
+
+# table -> columns a listing may filter on
+TABLES = {
+    "students": ("nume", "facultate", "serie", "grupa"),
+    "group_questions": ("facultate", "grupa"),
+    "series_questions": ("facultate", "serie"),
+    "general_questions": (),
+}
+
+READ_TYPES = ("list", "changes", "version", "snapshot")
+
+CHUNK_SIZE = 64 * 1024
+
+# change_log entries kept for replicas to catch up from
+FEED_RETENTION = int(os.getenv("STUDENT_GUIDER_FEED_RETENTION", "100000"))
+
+
+class FeedError(Exception):
+    pass
+
+
+class FeedGap(FeedError):
+    """The server no longer has the changes a replica needs: take a new snapshot."""
+
+
+# -------------------------
+# Change log
+# -------------------------
+
+def prepare_feed(conn):
+    """
+    Create change_log with its triggers, the database id, and (column, id)
+    indexes so filtered listings seek instead of scanning. The served
+    tables must exist.
+    """
+    c = conn.cursor()
+    c.execute("CREATE TABLE IF NOT EXISTS feed_meta(key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("INSERT OR IGNORE INTO feed_meta(key, value) VALUES ('database', ?)", (str(uuid.uuid4()),))
+    c.execute("""CREATE TABLE IF NOT EXISTS change_log(
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tbl TEXT,
+                    row_id INTEGER,
+                    op TEXT
+                )""")
+    for table in TABLES:
+        for op, ref in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            c.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_log_{op.lower()}
+                          AFTER {op} ON {table} BEGIN
+                              INSERT INTO change_log(tbl, row_id, op) VALUES ('{table}', {ref}.id, '{op[0]}');
+                          END""")
+        for column in TABLES[table]:
+            c.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column}_id ON {table}({column}, id)")
+    conn.commit()
+    prune_feed(conn)
+
+
+def prune_feed(conn, keep=None):
+    """Drop all but the newest `keep` change_log entries; returns how many went."""
+    keep = max(1, FEED_RETENTION if keep is None else keep)
+    deleted = conn.execute("DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - ?",
+                           (keep,)).rowcount
+    conn.commit()
+    return deleted
+
+
+def current_version(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+
+def oldest_version(conn):
+    return conn.execute("SELECT COALESCE(MIN(seq), 0) FROM change_log").fetchone()[0]
+
+
+def database_id(conn):
+    row = conn.execute("SELECT value FROM feed_meta WHERE key = 'database'").fetchone()
+    return row[0] if row else None
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# -------------------------
+# Server side
+# -------------------------
+
+class _StreamWriter:
+    """Buffered (and optionally zlib-compressed) line writer over a socket."""
+
+    def __init__(self, sock, compress=False, buffer_size=64 * 1024):
+        self.sock = sock
+        self.compressor = zlib.compressobj(6) if compress else None
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+
+    def line(self, obj):
+        self.buffer += json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+        self.buffer += b"\n"
+        if len(self.buffer) >= self.buffer_size:
+            self._send(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _send(self, data):
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        if data:
+            self.sock.sendall(data)
+
+    def close(self):
+        self._send(bytes(self.buffer))
+        self.buffer.clear()
+        if self.compressor is not None:
+            self.sock.sendall(self.compressor.flush())
+
+
+def _where(table, filters):
+    allowed = TABLES[table]
+    clauses, params = [], []
+    for column, value in (filters or {}).items():
+        if column not in allowed:
+            raise FeedError(f"cannot filter {table} by {column}")
+        clauses.append(f"{column} = ?")
+        params.append(value)
+    return clauses, params
+
+
+def stream_list(conn, writer, table, filters=None, after=0, limit=None):
+    if table not in TABLES:
+        raise FeedError(f"unknown table {table}")
+    clauses, params = _where(table, filters)
+    columns = table_columns(conn, table)
+    writer.line({"table": table, "columns": columns, "version": current_version(conn)})
+
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(clauses + ['id > ?'])} ORDER BY id LIMIT ?"
+    id_index = columns.index("id")
+    sent = 0
+    last = after
+    while limit is None or sent < limit:
+        page = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - sent)
+        rows = conn.execute(sql, params + [last, page]).fetchall()
+        for row in rows:
+            writer.line(list(row))
+        sent += len(rows)
+        if rows:
+            last = rows[-1][id_index]
+        if len(rows) < page:
+            writer.line({"count": sent, "next": None})
+            return
+    writer.line({"count": sent, "next": last})
+
+
+def stream_changes(conn, writer, since=0, limit=None):
+    """
+    Changes after seq `since`, oldest first, each with the row as it is
+    now: ["students", seq, row_id, "I"|"U"|"D", [values] or null].
+    """
+    columns = {table: table_columns(conn, table) for table in TABLES}
+    writer.line({"columns": columns, "version": current_version(conn), "oldest": oldest_version(conn),
+                 "database": database_id(conn)})
+
+    selects = {table: f"SELECT {', '.join(cols)} FROM {table} WHERE id = ?" for table, cols in columns.items()}
+    sent = 0
+    last = since
+    while limit is None or sent < limit:
+        page = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - sent)
+        changes = conn.execute("SELECT seq, tbl, row_id, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+                               (last, page)).fetchall()
+        for seq, table, row_id, op in changes:
+            # The row as it is now: a later change to it is resent anyway
+            row = conn.execute(selects[table], (row_id,)).fetchone() if table in selects else None
+            writer.line([table, seq, row_id, op, list(row) if row else None])
+        sent += len(changes)
+        if changes:
+            last = changes[-1][0]
+        if len(changes) < page:
+            writer.line({"count": sent, "next": None, "last_seq": last})
+            return
+    writer.line({"count": sent, "next": last, "last_seq": last})
+
+
+def write_snapshot(db_path, out_path):
+    """Consistent copy of db_path for replicas; returns its (version, database id)."""
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(out_path)
+    try:
+        src.backup(dst)
+        version = current_version(dst)
+        database = database_id(dst)
+        # Replicas apply changes, they do not log them
+        triggers = [row[0] for row in dst.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+        for name in triggers:
+            dst.execute(f"DROP TRIGGER {name}")
+        dst.execute("DROP TABLE IF EXISTS change_log")
+        dst.execute("DROP TABLE IF EXISTS feed_meta")
+        dst.commit()
+        dst.execute("VACUUM")
+        return version, database
+    finally:
+        src.close()
+        dst.close()
+
+
+def serve_snapshot(sock, db_path):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        version, database = write_snapshot(db_path, path)
+        header = {"version": version, "database": database, "size": os.path.getsize(path)}
+        sock.sendall(json.dumps(header).encode() + b"\n")
+        compressor = zlib.compressobj(6)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sock.sendall(compressor.compress(block))
+        sock.sendall(compressor.flush())
+    except (sqlite3.Error, OSError) as e:
+        print(f"[-] Snapshot failed: {e}")
+    finally:
+        os.remove(path)
+
+
+def serve_read(sock, request, db_path="students_db.db"):
+    """Answer one read request on an accepted connection."""
+    if request["type"] == "snapshot":
+        serve_snapshot(sock, db_path)
+        return
+
+    writer = _StreamWriter(sock, compress=bool(request.get("compress")))
+    conn = sqlite3.connect(db_path)
+    try:
+        kind = request["type"]
+        if kind == "list":
+            stream_list(conn, writer, request["table"], request.get("filter"),
+                        int(request.get("after") or 0), request.get("limit"))
+        elif kind == "changes":
+            stream_changes(conn, writer, int(request.get("since") or 0), request.get("limit"))
+        elif kind == "version":
+            writer.line({"version": current_version(conn), "database": database_id(conn)})
+    except (FeedError, KeyError, ValueError, sqlite3.Error) as e:
+        writer.line({"error": str(e)})
+    finally:
+        conn.close()
+        try:
+            writer.close()
+        except OSError:
+            pass
+
+
+# -------------------------
+# Client side
+# -------------------------
+
+class DataFeedClient:
+    """Reads listings and changes from a TCPserver, one request per connection."""
+
+    def __init__(self, host, port=9999, compress=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.compress = compress
+        self.timeout = timeout
+
+    def _lines(self, request):
+        request = dict(request, compress=self.compress)
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            sock.sendall(json.dumps(request).encode())
+            decompressor = zlib.decompressobj() if self.compress else None
+            pending = b""
+            while True:
+                chunk = sock.recv(64 * 1024)
+                if not chunk:
+                    break
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    obj = json.loads(line)
+                    if isinstance(obj, dict) and "error" in obj:
+                        raise FeedError(obj["error"])
+                    yield obj
+
+    def version(self):
+        return self.head()[0]
+
+    def head(self):
+        """(current version, database id) of the server."""
+        for obj in self._lines({"type": "version"}):
+            return obj["version"], obj.get("database")
+
+    def page(self, table, filters=None, after=0, limit=100):
+        """One page: (columns, rows, next key or None)."""
+        lines = self._lines({"type": "list", "table": table, "filter": filters or {},
+                             "after": after, "limit": limit})
+        columns = next(lines)["columns"]
+        rows = []
+        for obj in lines:
+            if isinstance(obj, dict):
+                return columns, rows, obj["next"]
+            rows.append(obj)
+        raise ConnectionError("listing ended without a trailer")
+
+    def iter_rows(self, table, filters=None, page_size=1000):
+        """Every matching row as a dict, fetched page by page."""
+        after = 0
+        while after is not None:
+            columns, rows, after = self.page(table, filters, after, page_size)
+            for row in rows:
+                yield dict(zip(columns, row))
+
+    def snapshot(self, out_path):
+        """Download a snapshot into out_path; returns its (version, database id)."""
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            sock.sendall(json.dumps({"type": "snapshot"}).encode())
+            pending = b""
+            while b"\n" not in pending:
+                chunk = sock.recv(CHUNK_SIZE)
+                if not chunk:
+                    raise ConnectionError("snapshot ended before its header")
+                pending += chunk
+            line, pending = pending.split(b"\n", 1)
+            header = json.loads(line)
+
+            decompressor = zlib.decompressobj()
+            with open(out_path, "wb") as f:
+                while True:
+                    f.write(decompressor.decompress(pending))
+                    pending = sock.recv(CHUNK_SIZE)
+                    if not pending:
+                        break
+                f.write(decompressor.flush())
+        if os.path.getsize(out_path) != header["size"]:
+            raise ConnectionError("snapshot truncated")
+        return header["version"], header.get("database")
+
+    def iter_changes(self, since=0, page_size=5000, database=None):
+        """
+        (seq, table, row_id, op, row dict or None) after `since`, oldest
+        first. Raises FeedGap if the server cannot continue from `since`,
+        or if `database` is given and the server's database is another one.
+        """
+        while True:
+            lines = self._lines({"type": "changes", "since": since, "limit": page_size})
+            header = next(lines)
+            if database is not None and header.get("database") != database:
+                raise FeedGap(f"server database is {header.get('database')}, replica follows {database}")
+            if since > header["version"] or header.get("oldest", 0) > since + 1:
+                raise FeedGap(f"server has versions {header.get('oldest')}..{header['version']}, replica is at {since}")
+            columns = header["columns"]
+            trailer = None
+            for obj in lines:
+                if isinstance(obj, dict):
+                    trailer = obj
+                    break
+                table, seq, row_id, op, values = obj
+                row = dict(zip(columns[table], values)) if values is not None else None
+                yield seq, table, row_id, op, row
+                since = seq
+            if trailer is None:
+                raise ConnectionError("change feed ended without a trailer")
+            if trailer["next"] is None:
+                return
+
+
+# -------------------------
+# Local mirror
+# -------------------------
+
+def apply_change(conn, table, row_id, op, row):
+    """Apply one feed entry; idempotent, so replaying a range is harmless."""
+    if op == "D" or row is None:
+        conn.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+        return
+    columns = list(row)
+    conn.execute(f"INSERT OR REPLACE INTO {table}({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                 [row[c] for c in columns])
+
+
+def _sync_value(conn, key):
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _copy_all(conn, client, progress):
+    """Replace the local tables with a full keyset copy; returns the (version, database id) it starts from."""
+    # Changes made during the copy are replayed afterwards, so take the version first
+    version, database = client.head()
+    for table in TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        copied = 0
+        for record in client.iter_rows(table):
+            if not copied:
+                columns = [c for c in record if c != "id"]
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table}(id INTEGER PRIMARY KEY"
+                             + "".join(f", {c} TEXT" for c in columns) + ")")
+            apply_change(conn, table, record["id"], "I", record)
+            copied += 1
+        progress(f"Copied {copied} rows from {table}")
+    conn.execute("INSERT OR REPLACE INTO sync_state(key, value) VALUES ('version', ?)", (version,))
+    conn.execute("INSERT OR REPLACE INTO sync_state(key, value) VALUES ('database', ?)", (database,))
+    conn.commit()
+    return version, database
+
+
+def _apply_feed(conn, client, version, database, progress):
+    applied = 0
+    for seq, table, row_id, op, record in client.iter_changes(version, database=database):
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table}(id INTEGER PRIMARY KEY"
+                     + "".join(f", {c} TEXT" for c in (record or {}) if c != "id") + ")")
+        apply_change(conn, table, row_id, op, record)
+        version = seq
+        applied += 1
+        if applied % 1000 == 0:
+            conn.execute("UPDATE sync_state SET value = ? WHERE key = 'version'", (version,))
+            conn.commit()
+    conn.execute("UPDATE sync_state SET value = ? WHERE key = 'version'", (version,))
+    conn.commit()
+    progress(f"Applied {applied} changes, now at version {version}")
+    return version
+
+
+def mirror(conn, client, progress=print):
+    """
+    Bring a local copy up to date: a full keyset copy the first time, then
+    only the changes since the last sync. If the server no longer has
+    those changes, or its database is another one than the copy was made
+    from, the local tables are dropped and copied again. Returns the
+    synced version.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS sync_state(key TEXT PRIMARY KEY, value INTEGER)")
+    version, database = _sync_value(conn, "version"), _sync_value(conn, "database")
+
+    if version is not None and database is not None:
+        try:
+            return _apply_feed(conn, client, version, database, progress)
+        except FeedGap as e:
+            conn.rollback()
+            progress(f"{e}; copying everything again")
+    version, database = _copy_all(conn, client, progress)
+    return _apply_feed(conn, client, version, database, progress)
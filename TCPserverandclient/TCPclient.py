@@ -1,8 +1,12 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog, ttk
 import socket
 import json
 import sqlite3
+import threading
+
+from AdminProtocol import enroll_class
+from DataFeed import TABLES, DataFeedClient, mirror
 
 # Raspberry Pi IP and port
 PI_HOST = "192.168.1.108"
@@ -41,7 +45,7 @@ def sendStudentName():
         try:
             client=socket.socket(socket.AF_INET,socket.SOCK_STREAM);
             client.connect((PI_HOST,PI_PORT))
-            client.send(json.dumps(data).encode())
+            client.sendall(json.dumps(data).encode())
             response=client.recv(4096)
             messagebox.showinfo("Success", response)
             win.destroy()
@@ -82,7 +86,7 @@ def sendSeriesQuestion():
         try:
             client=socket.socket(socket.AF_INET,socket.SOCK_STREAM);
             client.connect((PI_HOST,PI_PORT))
-            client.send(json.dumps(data).encode())
+            client.sendall(json.dumps(data).encode())
             response=client.recv(4096)
             messagebox.showinfo("Success", response)
             win.destroy()
@@ -123,7 +127,7 @@ def sendGroupQuestion():
         try:
             client=socket.socket(socket.AF_INET,socket.SOCK_STREAM);
             client.connect((PI_HOST,PI_PORT))
-            client.send(json.dumps(data).encode())
+            client.sendall(json.dumps(data).encode())
             response=client.recv(4096)
             messagebox.showinfo("Success", response)
             win.destroy()
@@ -154,7 +158,7 @@ def sendGeneralQuestion():
         try:
             client=socket.socket(socket.AF_INET,socket.SOCK_STREAM);
             client.connect((PI_HOST,PI_PORT))
-            client.send(json.dumps(data).encode())
+            client.sendall(json.dumps(data).encode())
             response=client.recv(4096)
             messagebox.showinfo("Success", response)
             win.destroy()
@@ -165,6 +169,87 @@ def sendGeneralQuestion():
 
     return 0
 
+def enrollClass():
+    # Roster CSV (nume,facultate,serie,grupa) with one image folder per student next to it
+    csv_path=filedialog.askopenfilename(title="Class roster",filetypes=[("CSV","*.csv")])
+    if not csv_path:
+        return 0
+
+    def run():
+        try:
+            reports=enroll_class(PI_HOST,PI_PORT,csv_path)
+            errors=[f"{r['student']} ({r['error']})" for r in reports if r.get("error")]
+            failed=[r["student"] for r in reports if r["failed"]]
+            text=f"Enrolled {len(reports)-len(errors)} students."
+            if failed:
+                text+=f" Some images failed for: {', '.join(failed)}"
+            if errors:
+                text+=f" Not enrolled: {', '.join(errors)}"
+            root.after(0,lambda: messagebox.showinfo("Enrollment", text))
+        except Exception as e:
+            error=str(e)
+            root.after(0,lambda: messagebox.showinfo("Error", error))
+
+    threading.Thread(target=run,daemon=True).start()
+    return 0
+
+def browseData():
+    # Pages are fetched on demand with keyset pagination, PAGE_ROWS at a time
+    PAGE_ROWS=200
+    feed=DataFeedClient(PI_HOST,PI_PORT)
+    win=tk.Toplevel(root)
+    win.title("Browse data")
+
+    table=tk.StringVar(value="students")
+    tk.OptionMenu(win,table,*TABLES).grid(column=0,row=0)
+    filters={}
+    for col,name in enumerate(("facultate","serie","grupa"),start=1):
+        tk.Label(win,text=name).grid(column=col,row=0,sticky="w")
+        filters[name]=tk.Entry(win,width=10)
+        filters[name].grid(column=col,row=1)
+
+    tree=ttk.Treeview(win,show="headings",height=20)
+    tree.grid(column=0,row=2,columnspan=5,sticky="nsew")
+    state={"next":0}
+
+    def load(reset):
+        if reset:
+            state["next"]=0
+            tree.delete(*tree.get_children())
+        if state["next"] is None:
+            return
+        allowed=TABLES[table.get()]
+        wanted={k:e.get() for k,e in filters.items() if e.get() and k in allowed}
+        try:
+            columns,rows,state["next"]=feed.page(table.get(),wanted,state["next"],PAGE_ROWS)
+        except Exception as e:
+            messagebox.showinfo("Error", e)
+            return
+        tree["columns"]=columns
+        for c in columns:
+            tree.heading(c,text=c)
+        for row in rows:
+            tree.insert("","end",values=row)
+
+    tk.Button(win,text="Search",command=lambda: load(True)).grid(column=4,row=1)
+    tk.Button(win,text="More",command=lambda: load(False)).grid(column=4,row=3)
+    load(True)
+    return 0
+def syncLocal():
+    # Mirror the Pi's tables into DB_FILE: full copy once, then only changes
+    def run():
+        conn=sqlite3.connect(DB_FILE)
+        try:
+            version=mirror(conn,DataFeedClient(PI_HOST,PI_PORT),progress=lambda m: None)
+            root.after(0,lambda: messagebox.showinfo("Sync", f"{DB_FILE} is at version {version}"))
+        except Exception as e:
+            error=str(e)
+            root.after(0,lambda: messagebox.showinfo("Error", error))
+        finally:
+            conn.close()
+
+    threading.Thread(target=run,daemon=True).start()
+    return 0
 
 
 root=tk.Tk()
@@ -173,6 +258,9 @@ tk.Button(root,text="New Student",command=sendStudentName).grid(column=1, row=0)
 tk.Button(root,text="Send Group Question",command=sendGroupQuestion).grid(column=1,row=1)
 tk.Button(root,text="Send Series Question",command=sendSeriesQuestion).grid(column=1,row=2)
 tk.Button(root,text="Send General Question",command=sendGeneralQuestion).grid(column=1,row=3)
+tk.Button(root,text="Enroll Class (faces)",command=enrollClass).grid(column=1,row=4)
+tk.Button(root,text="Browse Data",command=browseData).grid(column=1,row=5)
+tk.Button(root,text="Sync Local Copy",command=syncLocal).grid(column=1,row=6)
 
 
 root.mainloop()
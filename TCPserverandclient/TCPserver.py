@@ -1,14 +1,40 @@
+import os
+import sys
 import socket
 import threading
 import json
 import sqlite3
 
-def handle_client(client_socket):
-    request = client_socket.recv(4096)
-    data = json.loads(request.decode())
+# Answers are rendered to audio as they arrive, so the kiosk plays them
+# without waiting for speech synthesis (needs gTTS and the TTSpython folder)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TTSpython"))
+answer_audio = None
+if os.getenv("STUDENT_GUIDER_PRERENDER", "1") not in ("", "0", "false", "no"):
+    try:
+        from AnswerAudio import AnswerAudioStore, AnswerAudioRenderer
+        answer_audio = AnswerAudioRenderer(AnswerAudioStore())
+    except ImportError as e:
+        print(f"Answer pre-synthesis disabled: {e}")
 
-    conn = sqlite3.connect("students_db.db")
-    c = conn.cursor()
+from AdminProtocol import MAGIC, EnrollmentReceiver, RetrainQueue
+from DataFeed import READ_TYPES, prepare_feed, prune_feed, serve_read
+
+PORT = int(os.getenv("STUDENT_GUIDER_PORT", "9999"))
+
+# A JSON request larger than this is refused; a client silent for this long is dropped
+MAX_REQUEST_BYTES = 1024 * 1024
+REQUEST_TIMEOUT = float(os.getenv("STUDENT_GUIDER_REQUEST_TIMEOUT", "30"))
+
+# Insert message type -> fields it must carry
+INSERT_FIELDS = {
+    "student": ("nume", "facultate", "serie", "grupa"),
+    "serie": ("facultate", "serie", "intrebare", "raspuns"),
+    "grupa": ("facultate", "grupa", "intrebare", "raspuns"),
+    "general": ("intrebare", "raspuns"),
+}
+
+
+def create_tables(c):
     c.execute("""CREATE TABLE IF NOT EXISTS students(
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     nume TEXT,
@@ -41,29 +67,149 @@ def handle_client(client_socket):
                     intrebare TEXT,
                     raspuns TEXT
                 )""")
+
+
+def enroll_student(record):
+    """Student row for an enrollment upload; resumed uploads must not add it twice."""
+    conn = sqlite3.connect("students_db.db")
+    c = conn.cursor()
+    create_tables(c)
+    c.execute("SELECT id FROM students WHERE nume = ?", (record["nume"],))
+    if c.fetchone() is None:
+        c.execute("INSERT INTO students(nume,facultate, serie, grupa) VALUES (?, ?, ?, ?)",
+                  (record["nume"], record.get("facultate"), record.get("serie"), record.get("grupa")))
+    conn.commit()
+    conn.close()
+
+
+# Face images arrive over the binary admin channel on the same port
+enrollment = EnrollmentReceiver(enroll_student, retrain=RetrainQueue())
+
+
+def read_request(client_socket):
+    """
+    One JSON request object. Clients send it without a terminator and then
+    wait for the reply, so it ends where the object is complete (or at a
+    newline, or when the client shuts down its side); a long answer text
+    arrives over several recv() calls. Raises ValueError unless it is a
+    read request or an insert with every field its type needs.
+    """
+    decoder = json.JSONDecoder()
+    request = b""
+    while True:
+        chunk = client_socket.recv(64 * 1024)
+        request += chunk
+        if len(request) > MAX_REQUEST_BYTES:
+            raise ValueError(f"request larger than {MAX_REQUEST_BYTES} bytes")
+        if not chunk or b"\n" in chunk:
+            # Nothing more is coming, so a parse error is the client's
+            data = json.loads(request.decode())
+            break
+        try:
+            data = decoder.raw_decode(request.decode().lstrip())[0]
+            break
+        except ValueError:
+            continue  # cut mid-object or mid-character: wait for the rest
+    if not isinstance(data, dict):
+        raise ValueError("request is not a JSON object")
+
+    kind = data.get("type")
+    if kind in READ_TYPES:
+        return data
+    if kind not in INSERT_FIELDS:
+        raise ValueError(f"unknown type {kind!r}")
+    missing = [field for field in INSERT_FIELDS[kind] if data.get(field) is None]
+    if missing:
+        raise ValueError(f"{kind} is missing {', '.join(missing)}")
+    return data
+
+
+def handle_client(client_socket):
+    # Before the first read, so a client that connects and stays silent does not hold a thread
+    client_socket.settimeout(REQUEST_TIMEOUT)
+
+    # Binary enrollment sessions start with MAGIC, plain inserts with "{"
+    try:
+        magic = client_socket.recv(len(MAGIC), socket.MSG_PEEK | socket.MSG_WAITALL)
+    except OSError as e:
+        print(f"[-] Client sent nothing ({type(e).__name__}): {e}")
+        client_socket.close()
+        return
+    if magic == MAGIC:
+        enrollment.serve(client_socket)
+        client_socket.close()
+        return
+
+    try:
+        data = read_request(client_socket)
+    except (ValueError, OSError) as e:
+        # Undecodable, incomplete, cut short or too slow: tell the client instead of dropping it
+        print(f"[-] Bad request ({type(e).__name__}): {e}")
+        try:
+            client_socket.sendall(f"Invalid request: {e}".encode())
+        except OSError:
+            pass
+        client_socket.close()
+        return
+
+    # Listings and the change feed stream their answer, then close
+    if data.get("type") in READ_TYPES:
+        serve_read(client_socket, data)
+        client_socket.close()
+        return
+
+    conn = sqlite3.connect("students_db.db")
+    c = conn.cursor()
+    create_tables(c)
     if(data["type"]=="student"):
         c.execute("INSERT INTO students(nume,facultate, serie, grupa) VALUES (?, ?, ?, ?)",
               (data["nume"], data["facultate"], data["serie"], data["grupa"]))
     elif(data["type"]=="serie"):
         c.execute("INSERT INTO series_questions(facultate,serie, intrebare, raspuns) VALUES (?, ?, ?, ?)",
               (data["facultate"], data["serie"], data["intrebare"], data["raspuns"]))
+        tier = "series"
     elif(data["type"]=="grupa"):
         c.execute("INSERT INTO group_questions(facultate, grupa, intrebare, raspuns) VALUES (?, ?, ?, ?)",
               (data["facultate"], data["grupa"], data["intrebare"], data["raspuns"]))
+        tier = "group"
     elif(data["type"]=="general"):
         c.execute("INSERT INTO general_questions( intrebare, raspuns) VALUES (?, ?)",
               (data["intrebare"], data["raspuns"]))
+        tier = "general"
     conn.commit()
+    # Keep the change feed to its retention window
+    prune_feed(conn)
     conn.close()
 
+    # Queue the new answer for synthesis once it is committed
+    if answer_audio is not None and data["type"] in ("serie", "grupa", "general"):
+        answer_audio.submit(tier, c.lastrowid, data["raspuns"])
+
     client_socket.send("Data inserted".encode())
     client_socket.close()
 
-server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server.bind(("0.0.0.0", 9999))
-server.listen(5)
-print("[+] Listening on port 9999")
+def main():
+    # Tables and the change log must exist before the first read or insert
+    conn = sqlite3.connect("students_db.db")
+    # WAL: snapshots and feed reads for the kiosks do not block inserts
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_tables(conn.cursor())
+    prepare_feed(conn)
+    conn.close()
+
+    if answer_audio is not None:
+        answer_audio.start(db_path="students_db.db")
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("0.0.0.0", PORT))
+    server.listen(5)
+    print(f"[+] Listening on port {PORT}")
+
+    while True:
+        client, addr = server.accept()
+        threading.Thread(target=handle_client, args=(client,)).start()
+
 
-while True:
-    client, addr = server.accept()
-    threading.Thread(target=handle_client, args=(client,)).start()
+if __name__ == "__main__":
+    main()
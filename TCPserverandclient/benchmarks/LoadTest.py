@@ -0,0 +1,367 @@
+"""
+Ingest load test for TCPserver.py.
+
+Starts a TCPserver in a scratch directory (or targets a running one with
+--host/--port), then replays many concurrent admin clients sending the
+student / serie / grupa / general insert messages. Reports throughput,
+latency percentiles, client and server error counts and the server's
+peak thread count, and checks afterwards that every acknowledged insert
+is in the database. Can diff the run against a previous results file.
+
+    cd TCPserverandclient
+    python benchmarks/LoadTest.py --clients 50 --requests 5000 --out load.json
+    python benchmarks/LoadTest.py --clients 50 --requests 5000 --baseline load.json
+
+Exits with status 1 if an acknowledged row is missing or the error rate
+exceeds --max-error-rate.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(os.path.dirname(HERE), "TCPserver.py")
+
+MESSAGE_TYPES = ("student", "serie", "grupa", "general")
+
+# message type -> (table, column holding the request's unique token)
+VERIFY = {
+    "student": ("students", "nume"),
+    "serie": ("series_questions", "intrebare"),
+    "grupa": ("group_questions", "intrebare"),
+    "general": ("general_questions", "intrebare"),
+}
+
+# Server log lines worth counting, by what they point at
+SERVER_ERRORS = {
+    "database is locked": "sqlite_locked",
+    "JSONDecodeError": "partial_recv",
+    "UnicodeDecodeError": "partial_recv",
+    "can't start new thread": "thread_limit",
+    "Traceback": "exceptions",
+}
+
+
+# -------------------------
+# Messages
+# -------------------------
+
+def make_message(kind, token, answer_bytes):
+    answer = ("Answer " + token + " ").ljust(answer_bytes, "x")
+    if kind == "student":
+        return {"type": "student", "nume": token, "facultate": "AC",
+                "serie": random.choice("ABCD"), "grupa": str(random.randint(30231, 30239))}
+    if kind == "serie":
+        return {"type": "serie", "facultate": "AC", "serie": random.choice("ABCD"),
+                "intrebare": token, "raspuns": answer}
+    if kind == "grupa":
+        return {"type": "grupa", "facultate": "AC", "grupa": str(random.randint(30231, 30239)),
+                "intrebare": token, "raspuns": answer}
+    return {"type": "general", "intrebare": token, "raspuns": answer}
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in MESSAGE_TYPES:
+            raise SystemExit(f"Unknown message type in --mix: {kind}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+# -------------------------
+# Local server
+# -------------------------
+
+class LocalServer:
+    """TCPserver.py in a scratch directory, on a free port, with answer audio off."""
+
+    def __init__(self):
+        self.workdir = tempfile.mkdtemp(prefix="sg_load_")
+        self.db_path = os.path.join(self.workdir, "students_db.db")
+        self.port = self._free_port()
+        self.errors = Counter()
+        self.peak_threads = 0
+        self.proc = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _free_port():
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    def start(self, timeout=15):
+        env = dict(os.environ,
+                   STUDENT_GUIDER_PORT=str(self.port),
+                   STUDENT_GUIDER_PRERENDER="0",
+                   STUDENT_GUIDER_RETRAIN_CMD="true",
+                   PYTHONUNBUFFERED="1")
+        self.proc = subprocess.Popen([sys.executable, SERVER], cwd=self.workdir, env=env,
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        threading.Thread(target=self._read_log, daemon=True).start()
+        threading.Thread(target=self._watch_threads, daemon=True).start()
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError("TCPserver exited during startup")
+            try:
+                # A read request: answered without an insert or a server error
+                with socket.create_connection(("127.0.0.1", self.port), timeout=1) as s:
+                    s.sendall(json.dumps({"type": "version"}).encode())
+                    if s.recv(1024):
+                        return self
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError("TCPserver did not start listening")
+
+    def _read_log(self):
+        for line in self.proc.stdout:
+            for needle, kind in SERVER_ERRORS.items():
+                if needle in line:
+                    self.errors[kind] += 1
+
+    def _watch_threads(self):
+        status = f"/proc/{self.proc.pid}/status"
+        while not self._stop.is_set() and self.proc.poll() is None:
+            try:
+                with open(status) as f:
+                    for line in f:
+                        if line.startswith("Threads:"):
+                            self.peak_threads = max(self.peak_threads, int(line.split()[1]))
+            except OSError:
+                return
+            self._stop.wait(0.05)
+
+    def stop(self):
+        self._stop.set()
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# -------------------------
+# Clients
+# -------------------------
+
+def send_one(host, port, message, timeout, split_ms):
+    """One admin-client insert; returns (kind of outcome, seconds)."""
+    data = json.dumps(message).encode()
+    start = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as s:
+            if split_ms:
+                # Two TCP segments, as a slow link delivers a large message
+                half = len(data) // 2
+                s.sendall(data[:half])
+                time.sleep(split_ms / 1000.0)
+                s.sendall(data[half:])
+            else:
+                s.sendall(data)
+            reply = b""
+            while True:
+                chunk = s.recv(1024)
+                if not chunk:
+                    break
+                reply += chunk
+    except socket.timeout:
+        return "timeout", time.perf_counter() - start
+    except ConnectionRefusedError:
+        return "refused", time.perf_counter() - start
+    except OSError:
+        return "reset", time.perf_counter() - start
+
+    elapsed = time.perf_counter() - start
+    if reply.decode(errors="replace") != "Data inserted":
+        return "no_ack", elapsed
+    return "ok", elapsed
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pct(p):
+        # Nearest rank, as in LatencyTracker
+        idx = max(0, math.ceil(p / 100.0 * len(ordered)) - 1)
+        return round(ordered[idx] * 1000, 2)
+
+    return {"p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+            "max_ms": round(ordered[-1] * 1000, 2)}
+
+
+def verify(db_path, acked, prefix):
+    """(acknowledged inserts missing from the database, rows this run stored)."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        missing = 0
+        stored = 0
+        for kind, tokens in acked.items():
+            table, column = VERIFY[kind]
+            rows = {r[0] for r in conn.execute(f"SELECT {column} FROM {table} WHERE {column} LIKE ?",
+                                                (prefix + "%",))}
+            missing += len(tokens - rows)
+            stored += len(rows)
+    finally:
+        conn.close()
+    return missing, stored
+
+
+# -------------------------
+# Run
+# -------------------------
+
+def run(args):
+    weights = parse_mix(args.mix)
+    kinds = random.choices(list(weights), weights=list(weights.values()), k=args.requests)
+
+    server = None
+    host, port = args.host, args.port
+    if host is None:
+        server = LocalServer().start()
+        host, port = "127.0.0.1", server.port
+        print(f"TCPserver started in {server.workdir} on port {port}")
+
+    outcomes = Counter()
+    latencies = []
+    acked = {kind: set() for kind in weights}
+    lock = threading.Lock()
+
+    prefix = f"load-{os.getpid()}-"
+
+    def task(i, kind):
+        token = f"{prefix}{i}"
+        outcome, elapsed = send_one(host, port, make_message(kind, token, args.answer_bytes),
+                                    args.timeout, args.split_ms)
+        with lock:
+            outcomes[outcome] += 1
+            if outcome == "ok":
+                latencies.append(elapsed)
+                acked[kind].add(token)
+
+    wall_start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            for i, kind in enumerate(kinds):
+                pool.submit(task, i, kind)
+        wall = time.perf_counter() - wall_start
+
+        missing = stored = None
+        db_path = server.db_path if server else args.db
+        if db_path:
+            missing, stored = verify(db_path, acked, prefix)
+    finally:
+        if server:
+            server.stop()
+
+    errors = sum(n for outcome, n in outcomes.items() if outcome != "ok")
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "clients": args.clients,
+        "requests": args.requests,
+        "mix": weights,
+        "answer_bytes": args.answer_bytes,
+        "split_ms": args.split_ms,
+        "wall_s": round(wall, 3),
+        "inserts_per_s": round(outcomes["ok"] / wall, 1) if wall else 0.0,
+        "ok": outcomes["ok"],
+        "errors": errors,
+        "error_rate": round(errors / args.requests, 4) if args.requests else 0.0,
+        "client_errors": {k: v for k, v in outcomes.items() if k != "ok"},
+        "server_errors": dict(server.errors) if server else {},
+        "server_peak_threads": server.peak_threads if server else None,
+        "latency": percentiles(latencies),
+        "missing_acked_rows": missing,
+        "stored_rows": stored,
+    }
+
+
+# -------------------------
+# Reporting
+# -------------------------
+
+def print_report(result, baseline=None):
+    print(f"\nClients: {result['clients']}  requests: {result['requests']}  "
+          f"wall: {result['wall_s']} s  throughput: {result['inserts_per_s']} inserts/s")
+    print(f"OK: {result['ok']}  errors: {result['errors']} ({result['error_rate'] * 100:.2f}%)  "
+          f"client: {result['client_errors'] or '-'}  server: {result['server_errors'] or '-'}")
+    if result["server_peak_threads"] is not None:
+        print(f"Server peak threads: {result['server_peak_threads']}")
+    if result["missing_acked_rows"] is not None:
+        print(f"Verification: {result['stored_rows']} rows stored, "
+              f"{result['missing_acked_rows']} acknowledged inserts missing")
+
+    latency = result["latency"]
+    base_latency = baseline.get("latency", {}) if baseline else {}
+    print(f"\n{'':<14}{'now':>10}" + (f"{'base':>10}{'Δ':>9}" if baseline else ""))
+    rows = [(k, latency.get(k)) for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+    rows.append(("inserts_per_s", result["inserts_per_s"]))
+    for key, value in rows:
+        if value is None:
+            continue
+        line = f"{key:<14}{value:>10.1f}"
+        base = base_latency.get(key) if key != "inserts_per_s" else (baseline or {}).get(key)
+        if baseline and base:
+            line += f"{base:>10.1f}{(value - base) / base * 100:>+8.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TCPserver ingest load test")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent admin clients")
+    parser.add_argument("--requests", type=int, default=2000, help="total inserts to send")
+    parser.add_argument("--mix", default="student=1,serie=1,grupa=1,general=1",
+                        help="message type weights")
+    parser.add_argument("--answer-bytes", type=int, default=120, help="length of each answer text")
+    parser.add_argument("--split-ms", type=float, default=0,
+                        help="send each message in two parts this many ms apart")
+    parser.add_argument("--timeout", type=float, default=10)
+    parser.add_argument("--host", help="target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--db", help="with --host: that server's students_db.db, to verify the inserts")
+    parser.add_argument("--max-error-rate", type=float, default=1.0,
+                        help="exit 1 when more than this fraction of requests fail")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from a previous run to compare against")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    result = run(args)
+    print_report(result, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+    if result["missing_acked_rows"] or result["error_rate"] > args.max_error_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Catch-up check for kiosk replicas (TTSpython/Replicator.py).
+
+Starts a TCPserver in a scratch directory with a small change-log
+retention, syncs a replica, then lets the replica fall behind the
+retained window and checks that it takes a new snapshot instead of
+missing rows. Finally points the replica at a second, freshly created
+writer whose version is already past the replica's, and checks that the
+changed database id forces a snapshot too. The admin PC's local copy
+(DataFeed.mirror, "Sync Local Copy" in TCPclient.py) goes through the
+same steps and must copy everything again in both cases.
+
+    cd TCPserverandclient
+    python benchmarks/ReplicationCheck.py --retention 50
+
+Exits with status 1 if the replica ends up with different rows than the
+writer or does not re-bootstrap when it should.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", "..", "TTSpython"))
+
+from LoadTest import LocalServer, make_message, send_one
+from Replicator import Replicator
+from DataFeed import DataFeedClient, mirror
+
+
+def insert_students(server, count, prefix):
+    for i in range(count):
+        outcome, _ = send_one("127.0.0.1", server.port, make_message("student", f"{prefix}{i}", 0), 10, 0)
+        if outcome != "ok":
+            raise RuntimeError(f"insert {prefix}{i} failed: {outcome}")
+
+
+def student_names(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT nume FROM students")}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a lagging replica re-bootstraps from a snapshot")
+    parser.add_argument("--retention", type=int, default=50, help="change-log entries the writer keeps")
+    args = parser.parse_args()
+
+    os.environ["STUDENT_GUIDER_FEED_RETENTION"] = str(args.retention)
+    workdir = tempfile.mkdtemp(prefix="sg_replica_")
+    writer = second = None
+    snapshots = []
+    copies = []
+    failures = []
+
+    def check(name, ok):
+        print(f"  {'ok  ' if ok else 'FAIL'}  {name}")
+        if not ok:
+            failures.append(name)
+
+    try:
+        writer = LocalServer().start()
+        replica = Replicator("127.0.0.1", writer.port, os.path.join(workdir, "replica.db"),
+                             on_change=lambda batch: batch is None and snapshots.append(1))
+        local_path = os.path.join(workdir, "local.db")
+        local = sqlite3.connect(local_path)
+
+        def sync_local(port):
+            mirror(local, DataFeedClient("127.0.0.1", port),
+                   progress=lambda message: message.endswith("from students") and copies.append(1))
+
+        insert_students(writer, args.retention // 2, "first-")
+        replica.sync_once()
+        sync_local(writer.port)
+        check("first sync loads a snapshot", len(snapshots) == 1)
+        check("first local sync copies everything", len(copies) == 1)
+
+        insert_students(writer, args.retention // 2, "inside-")
+        replica.sync_once()
+        sync_local(writer.port)
+        check("changes inside the retained window are applied", len(snapshots) == 1)
+        check("the local copy applies them too", len(copies) == 1)
+
+        insert_students(writer, args.retention * 3, "behind-")
+        replica.sync_once()
+        sync_local(writer.port)
+        check("a replica behind the retained window takes a new snapshot", len(snapshots) == 2)
+        check("it then has the writer's rows", student_names(replica.db_path) == student_names(writer.db_path))
+        check("a local copy behind the window is copied again", len(copies) == 2)
+        check("it then has the writer's rows", student_names(local_path) == student_names(writer.db_path))
+
+        # A recreated writer: new database, already at a higher version than the replica
+        second = LocalServer().start()
+        insert_students(second, args.retention * 5, "recreated-")
+        replica.client = DataFeedClient("127.0.0.1", second.port)
+        replica.sync_once()
+        check("a recreated writer database forces a snapshot", len(snapshots) == 3)
+        check("it then has the new writer's rows", student_names(replica.db_path) == student_names(second.db_path))
+        sync_local(second.port)
+        check("a recreated writer database makes the local copy start over", len(copies) == 3)
+        check("it then has the new writer's rows", student_names(local_path) == student_names(second.db_path))
+        local.close()
+    finally:
+        for server in (writer, second):
+            if server is not None:
+                server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{len(failures)} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
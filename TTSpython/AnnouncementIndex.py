@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+INDEX_PATH = os.getenv("STUDENT_GUIDER_ANNOUNCEMENTS_DB", "announcements.db")
+
+# Spoken English topic -> Romanian stems used in the titles (FTS prefix terms)
+TOPIC_SYNONYMS = {
+    "scholarship": ["burs"],
+    "bursa": ["burs"],
+    "scholarships": ["burs"],
+    "registration": ["inscrier", "inscri"],
+    "enrollment": ["inscri"],
+    "results": ["rezultat"],
+    "result": ["rezultat"],
+    "volunteer": ["voluntar"],
+    "volunteering": ["voluntar"],
+    "course": ["curs"],
+    "courses": ["curs"],
+    "exam": ["examen"],
+    "exams": ["examen"],
+    "internship": ["practic", "intern"],
+    "survey": ["chestionar"],
+    "grant": ["grant"],
+    "thesis": ["licent", "disertat"],
+    "admission": ["admiter"],
+    "schedule": ["orar", "program"],
+}
+
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "for", "from", "have", "is", "me",
+    "new", "of", "on", "or", "please", "show", "tell", "the", "there", "to",
+    "what", "with", "latest", "recent", "announcement", "announcements", "news",
+    "anunt", "anunturi", "de", "si", "la", "pentru", "cu",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS announcements(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE,
+    date TEXT,
+    sort_date TEXT,
+    title_ro TEXT,
+    title_en TEXT,
+    url TEXT
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS announcements_fts USING fts5(
+    title_ro, title_en,
+    content='announcements', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS announcements_ai AFTER INSERT ON announcements BEGIN
+    INSERT INTO announcements_fts(rowid, title_ro, title_en) VALUES (new.id, new.title_ro, new.title_en);
+END;
+CREATE TRIGGER IF NOT EXISTS announcements_au AFTER UPDATE ON announcements BEGIN
+    INSERT INTO announcements_fts(announcements_fts, rowid, title_ro, title_en)
+        VALUES ('delete', old.id, old.title_ro, old.title_en);
+    INSERT INTO announcements_fts(rowid, title_ro, title_en) VALUES (new.id, new.title_ro, new.title_en);
+END;
+"""
+
+
+def announcement_key(date, title_ro):
+    return hashlib.sha1(f"{date}|{title_ro}".encode()).hexdigest()
+
+
+def _sort_date(date):
+    """'dd-mm-yyyy hh:mm' -> ISO text that sorts chronologically."""
+    try:
+        return datetime.strptime(date.strip(), "%d-%m-%Y %H:%M").isoformat()
+    except ValueError:
+        return ""
+
+
+class AnnouncementIndex:
+    """
+    Announcements kept in a local SQLite table with an FTS5 index over the
+    Romanian and English titles.
+
+    update() only inserts announcements it has not seen (keyed by date and
+    title), so each fetch costs a few primary-key lookups; search() ranks
+    title matches with bm25 and breaks ties by date, without touching the
+    website. Without FTS5 in the local SQLite, search() falls back to LIKE.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            print(f" FTS5 not available ({e}); announcement search uses LIKE.")
+            self.fts = False
+        self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM announcements").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    # -------------------------
+    # Updates
+    # -------------------------
+    def known_translation(self, date, title_ro):
+        """Stored English title for an announcement we already have, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT title_ro, title_en FROM announcements WHERE key = ?",
+                                    (announcement_key(date, title_ro),)).fetchone()
+        if row and row[1] and row[1] != row[0]:
+            return row[1]
+        return None
+
+    def update(self, announcements):
+        """Insert new announcements, refresh changed ones; returns how many were new."""
+        added = 0
+        with self._lock:
+            cursor = self.conn.cursor()
+            for ann in announcements:
+                key = announcement_key(ann["date"], ann["title_ro"])
+                title_en = ann.get("title_en") or ann["title_ro"]
+                row = cursor.execute("SELECT id, title_en, url FROM announcements WHERE key = ?",
+                                     (key,)).fetchone()
+                if row is None:
+                    cursor.execute(
+                        "INSERT INTO announcements(key, date, sort_date, title_ro, title_en, url) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, ann["date"], _sort_date(ann["date"]), ann["title_ro"], title_en, ann.get("url")))
+                    added += 1
+                    continue
+
+                # Keep an earlier translation if this fetch could not translate
+                if title_en == ann["title_ro"]:
+                    title_en = row[1]
+                if (title_en, ann.get("url")) != (row[1], row[2]):
+                    cursor.execute("UPDATE announcements SET title_en = ?, url = ? WHERE id = ?",
+                                   (title_en, ann.get("url"), row[0]))
+            self.conn.commit()
+        return added
+
+    # -------------------------
+    # Search
+    # -------------------------
+    @staticmethod
+    def query_terms(text):
+        words = [w for w in re.findall(r"\w+", text.lower()) if w not in STOPWORDS and len(w) > 1]
+        terms = []
+        for word in words:
+            terms.append(word)
+            terms.extend(TOPIC_SYNONYMS.get(word, ()))
+        return list(dict.fromkeys(terms))
+
+    def search(self, text, limit=5):
+        """Announcements matching the topic words in text, best first."""
+        terms = self.query_terms(text)
+        if not terms:
+            return []
+
+        with self._lock:
+            if self.fts:
+                match = " OR ".join(f'"{t}"*' for t in terms)
+                rows = self.conn.execute(
+                    "SELECT a.date, a.title_ro, a.title_en, a.url FROM announcements_fts f "
+                    "JOIN announcements a ON a.id = f.rowid "
+                    "WHERE announcements_fts MATCH ? ORDER BY f.rank, a.sort_date DESC LIMIT ?",
+                    (match, limit)).fetchall()
+            else:
+                where = " OR ".join("(title_ro LIKE ? OR title_en LIKE ?)" for _ in terms)
+                params = [p for t in terms for p in (f"%{t}%", f"%{t}%")]
+                rows = self.conn.execute(
+                    f"SELECT date, title_ro, title_en, url FROM announcements WHERE {where} "
+                    "ORDER BY sort_date DESC LIMIT ?", params + [limit]).fetchall()
+
+        return [{"date": d, "title_ro": ro, "title_en": en, "url": url} for d, ro, en, url in rows]
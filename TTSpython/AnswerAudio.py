@@ -0,0 +1,218 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+
+from gtts import gTTS, gTTSError
+
+from HttpClient import GTTS_HOST, RETRY_ERRORS, http
+
+# Where rendered answers live; TTS.py and the TCPserver must agree on it
+AUDIO_DIR = os.getenv("STUDENT_GUIDER_ANSWER_AUDIO", "answer_audio")
+
+# Part of the content hash, so switching engine or voice re-renders everything
+ENGINE = "gtts"
+LANG = "en"
+
+# tier -> table holding its answers (raspuns)
+ANSWER_TABLES = {
+    "group": "group_questions",
+    "series": "series_questions",
+    "general": "general_questions",
+}
+
+# Frequently spoken prompts, rendered from the pre-warm list (see InteractionReport.py)
+PHRASE_TIER = "phrase"
+
+
+def content_hash(text, lang=LANG):
+    return hashlib.sha1(f"{ENGINE}|{lang}|{text}".encode()).hexdigest()[:16]
+
+
+class AnswerAudioStore:
+    """
+    Pre-rendered mp3s for stored answers.
+
+    Files are named <tier>-<row id>-<content hash>.mp3, so an edited answer
+    gets a new file (the old one is removed when the new one is written)
+    and the speaking side can find audio from the answer text alone.
+    """
+
+    def __init__(self, directory=AUDIO_DIR, lang=LANG):
+        self.directory = directory
+        self.lang = lang
+        self._by_hash = {}
+        self._scanned_mtime = None
+        self._lock = threading.Lock()
+
+    def filename(self, tier, row_id, text):
+        return f"{tier}-{row_id}-{content_hash(text, self.lang)}.mp3"
+
+    # -------------------------
+    # Lookup (speaking side)
+    # -------------------------
+    def _scan(self):
+        """Re-list the directory, only when something was added or removed."""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            self._by_hash, self._scanned_mtime = {}, None
+            return
+        if mtime == self._scanned_mtime:
+            return
+
+        by_hash = {}
+        for name in os.listdir(self.directory):
+            if name.startswith(".") or not name.endswith(".mp3"):
+                continue
+            digest = name[:-4].rsplit("-", 1)[-1]
+            by_hash[digest] = os.path.join(self.directory, name)
+        self._by_hash, self._scanned_mtime = by_hash, mtime
+
+    def lookup(self, text):
+        """Path of the pre-rendered audio for this exact text, or None."""
+        with self._lock:
+            self._scan()
+            path = self._by_hash.get(content_hash(text, self.lang))
+        return path if path and os.path.exists(path) else None
+
+    # -------------------------
+    # Rendering (ingest side)
+    # -------------------------
+    def _files_for_row(self, tier, row_id):
+        prefix = f"{tier}-{row_id}-"
+        return [n for n in os.listdir(self.directory) if n.startswith(prefix) and n.endswith(".mp3")]
+
+    def render(self, tier, row_id, text):
+        """Synthesize one answer unless it is already on disk; returns True if rendered."""
+        os.makedirs(self.directory, exist_ok=True)
+        name = self.filename(tier, row_id, text)
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            return False
+
+        # Write next to the target and rename, so readers never see a partial mp3
+        tmp = os.path.join(self.directory, f".{name}.tmp")
+        http.call(GTTS_HOST, lambda: gTTS(text=text, lang=self.lang).save(tmp), retry_on=RETRY_ERRORS + (gTTSError,))
+        os.replace(tmp, path)
+
+        for stale in self._files_for_row(tier, row_id):
+            if stale != name:
+                os.remove(os.path.join(self.directory, stale))
+        return True
+
+    def sync(self, conn):
+        """
+        Render every stored answer that has no audio yet and delete audio
+        for rows that are gone. Returns (rendered, removed).
+        """
+        cursor = conn.cursor()
+        wanted = {}
+        for tier, table in ANSWER_TABLES.items():
+            try:
+                cursor.execute(f"SELECT id, raspuns FROM {table}")
+            except Exception:
+                continue  # table not created yet
+            for row_id, answer in cursor.fetchall():
+                if answer and answer.strip():
+                    wanted[self.filename(tier, row_id, answer)] = (tier, row_id, answer)
+
+        os.makedirs(self.directory, exist_ok=True)
+        removed = 0
+        for name in os.listdir(self.directory):
+            # Phrases are not stored answers; render_phrases() manages them
+            if name.endswith(".mp3") and name.split("-", 1)[0] in ANSWER_TABLES and name not in wanted:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+
+        rendered = 0
+        for tier, row_id, answer in wanted.values():
+            try:
+                rendered += self.render(tier, row_id, answer)
+            except Exception as e:
+                print(f"Answer audio for {tier} #{row_id} failed: {e}")
+        return rendered, removed
+
+
+    def render_phrases(self, texts):
+        """Keep audio for exactly these prompts (by position); returns how many were rendered."""
+        os.makedirs(self.directory, exist_ok=True)
+        rendered = 0
+        for i, text in enumerate(texts):
+            try:
+                rendered += self.render(PHRASE_TIER, i, text)
+            except Exception as e:
+                print(f"Phrase audio for '{text}' failed: {e}")
+        for name in os.listdir(self.directory):
+            if name.startswith(f"{PHRASE_TIER}-") and name.endswith(".mp3"):
+                if int(name.split("-")[1]) >= len(texts):
+                    os.remove(os.path.join(self.directory, name))
+        return rendered
+
+
+class AnswerAudioRenderer:
+    """Background thread rendering answers queued at ingest time."""
+
+    def __init__(self, store, retry_delay=30, max_attempts=5):
+        self.store = store
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self, db_path=None):
+        """Start the worker; with db_path, first catch up on answers missing audio."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(db_path,),
+                                            name="answer-audio", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, tier, row_id, text):
+        if text and text.strip():
+            self._queue.put((tier, row_id, text, 1))
+
+    def request_sync(self, db_path):
+        """Queue a full sync, e.g. after the database was replaced wholesale."""
+        self._queue.put(db_path)
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _sync(self, db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            rendered, removed = self.store.sync(conn)
+            print(f"Answer audio synced: {rendered} rendered, {removed} removed")
+        except Exception as e:
+            print(f"Answer audio sync failed: {e}")
+        finally:
+            conn.close()
+
+    def _run(self, db_path):
+        if db_path is not None:
+            self._sync(db_path)
+
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if isinstance(job, str):
+                self._sync(job)
+                continue
+            tier, row_id, text, attempt = job
+            try:
+                if self.store.render(tier, row_id, text):
+                    print(f"Rendered answer audio for {tier} #{row_id}")
+            except Exception as e:
+                print(f"Answer audio for {tier} #{row_id} failed: {e}")
+                # gTTS needs the network: try again later; the next sync catches anything left
+                if attempt < self.max_attempts:
+                    retry = threading.Timer(self.retry_delay, self._queue.put,
+                                            args=((tier, row_id, text, attempt + 1),))
+                    retry.daemon = True
+                    retry.start()
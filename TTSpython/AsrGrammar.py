@@ -0,0 +1,104 @@
+import json
+import re
+
+# Phrases the command routing in get_response listens for
+COMMAND_PHRASES = [
+    "exit", "stop", "yes", "no",
+    "schedule", "my schedule", "class schedule", "timetable",
+    "what classes do i have today", "when is my class", "when do i have",
+    "announcement", "announcements", "show me the announcements", "any news",
+    "scholarship", "registration", "results", "volunteer", "course",
+    "map", "show me the map", "open the map", "map to the", "closest", "nearest",
+    "library", "cafeteria", "cafe", "coffee", "restaurant", "gym", "hospital",
+    "clinic", "parking", "lab", "building", "faculty", "cluj", "utcn",
+    "where is", "when is", "who is", "what is", "how do i", "please", "the",
+]
+
+NUMBER_WORDS = ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"]
+ORDINALS = ["first", "second", "third", "fourth", "fifth"]
+
+NUMBER_PHRASES = (
+    NUMBER_WORDS
+    + ORDINALS
+    + [f"number {n}" for n in NUMBER_WORDS]
+    + [f"the {o} one" for o in ORDINALS]
+    + ["exit", "stop"]
+)
+
+QUESTION_TABLES = ("group_questions", "series_questions", "general_questions")
+
+# Vosk maps anything outside the grammar to this token
+UNKNOWN = "[unk]"
+
+
+def clean_phrase(text):
+    """Lower-case words only, the way Vosk writes them."""
+    text = re.sub(r"[^a-z' ]+", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class GrammarBuilder:
+    """
+    Keeps the phrase lists for each dialog state.
+
+    "questions": command phrases + every stored question (and its words)
+    "numbers":   announcement numbers only
+
+    refresh() re-reads the question tables only when PRAGMA data_version
+    says another connection committed, and bumps the generation (forcing
+    a recompile) only if a phrase was added, edited or removed.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.question_phrases = {t: {} for t in QUESTION_TABLES}
+        self.generation = 0
+        self._compiled = {}
+
+    def refresh(self, conn):
+        """Pick up question changes; returns True if the grammar changed."""
+        cursor = conn.cursor()
+        version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.version:
+            return False
+        self.version = version
+
+        changed = False
+        for table in QUESTION_TABLES:
+            try:
+                cursor.execute(f"SELECT id, intrebare FROM {table}")
+            except Exception:
+                continue  # table not created yet
+
+            # The tables are small; compiling the grammar is the expensive part
+            phrases = {}
+            for row_id, question in cursor.fetchall():
+                phrase = clean_phrase(question or "")
+                if phrase:
+                    phrases[row_id] = phrase
+            if phrases != self.question_phrases[table]:
+                self.question_phrases[table] = phrases
+                changed = True
+
+        if changed:
+            self.generation += 1
+            self._compiled.pop("questions", None)
+        return changed
+
+    def phrases(self, mode):
+        if mode == "numbers":
+            return list(NUMBER_PHRASES)
+
+        phrases = set(COMMAND_PHRASES)
+        for table in QUESTION_TABLES:
+            for phrase in self.question_phrases[table].values():
+                phrases.add(phrase)
+                phrases.update(phrase.split())
+        return sorted(phrases)
+
+    def grammar(self, mode):
+        """JSON phrase list for KaldiRecognizer, compiled once per change."""
+        compiled = self._compiled.get(mode)
+        if compiled is None:
+            compiled = self._compiled[mode] = json.dumps(self.phrases(mode) + [UNKNOWN])
+        return compiled
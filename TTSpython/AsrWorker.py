@@ -0,0 +1,156 @@
+import json
+import multiprocessing
+import time
+
+# Requests (main -> worker) are raw bytes: 1-byte opcode + payload.
+#   A<pcm>            audio block, int16 mono at the model rate
+#   G<mode>\0<json>   switch grammar ("" json = open vocabulary)
+#   F<seq>            end of utterance: flush and report the full text
+#   R                 drop the current utterance
+#   Q                 quit
+# Replies (worker -> main) are pickled tuples:
+#   ("ready", None) | ("utterance", (seq, text)) | ("error", message)
+OP_AUDIO = b"A"
+OP_GRAMMAR = b"G"
+OP_FINISH = b"F"
+OP_RESET = b"R"
+OP_QUIT = b"Q"
+
+
+def _text(result_json):
+    return json.loads(result_json).get("text", "").strip()
+
+
+def _worker_main(conn, model_path, samplerate):
+    """Worker process: owns the Vosk model and decodes whatever it is fed."""
+    try:
+        from vosk import Model, KaldiRecognizer, SetLogLevel
+        SetLogLevel(-1)
+        model = Model(model_path)
+    except Exception as e:
+        conn.send(("error", f"could not load model: {e}"))
+        return
+
+    open_rec = KaldiRecognizer(model, samplerate)
+    grammars = {}  # mode -> (json, recognizer)
+    rec = open_rec
+    segments = []
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            msg = conn.recv_bytes()
+        except (EOFError, OSError):
+            return
+        op, payload = msg[:1], msg[1:]
+
+        if op == OP_AUDIO:
+            if rec.AcceptWaveform(payload):
+                text = _text(rec.Result())
+                if text:
+                    segments.append(text)
+
+        elif op == OP_FINISH:
+            text = _text(rec.FinalResult())
+            if text:
+                segments.append(text)
+            conn.send(("utterance", (payload.decode(), " ".join(segments))))
+            segments = []
+
+        elif op == OP_RESET:
+            rec.Reset()
+            segments = []
+
+        elif op == OP_GRAMMAR:
+            mode, _, grammar = payload.decode().partition("\0")
+            if not grammar:
+                rec = open_rec
+            else:
+                cached = grammars.get(mode)
+                if cached is None or cached[0] != grammar:
+                    cached = grammars[mode] = (grammar, KaldiRecognizer(model, samplerate, grammar))
+                rec = cached[1]
+            rec.Reset()
+            segments = []
+
+        elif op == OP_QUIT:
+            return
+
+
+class AsrWorker:
+    """
+    Vosk decoding in a separate process.
+
+    Audio blocks are streamed with feed() while they are captured, so
+    decoding runs on another core in parallel with the recording and only
+    the tail is left when finish() is called.
+    """
+
+    def __init__(self, model_path, samplerate=16000, start_timeout=120):
+        self.model_path = model_path
+        self.samplerate = samplerate
+        self.start_timeout = start_timeout
+        self._seq = 0
+        # spawn: the parent has audio and network threads running, forking them is unsafe
+        self._ctx = multiprocessing.get_context("spawn")
+        self._start()
+
+    def _start(self):
+        self.conn, child = self._ctx.Pipe(duplex=True)
+        self.proc = self._ctx.Process(
+            target=_worker_main,
+            args=(child, self.model_path, self.samplerate),
+            name="asr-worker",
+            daemon=True,
+        )
+        self.proc.start()
+        child.close()
+
+        if not self.conn.poll(self.start_timeout):
+            raise RuntimeError("ASR worker did not start in time")
+        kind, payload = self.conn.recv()
+        if kind != "ready":
+            raise RuntimeError(f"ASR worker failed: {payload}")
+        print(f"ASR worker ready (pid {self.proc.pid})")
+
+    def restart(self):
+        self.close()
+        self._start()
+
+    # -------------------------
+    # Streaming
+    # -------------------------
+    def feed(self, pcm):
+        self.conn.send_bytes(OP_AUDIO + bytes(pcm))
+
+    def set_grammar(self, mode, grammar_json):
+        self.conn.send_bytes(OP_GRAMMAR + f"{mode}\0{grammar_json or ''}".encode())
+
+    def reset(self):
+        self.conn.send_bytes(OP_RESET)
+
+    def finish(self, timeout=10.0):
+        """End the utterance and wait for its full text."""
+        self._seq += 1
+        seq = str(self._seq)
+        self.conn.send_bytes(OP_FINISH + seq.encode())
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.conn.poll(remaining):
+                raise TimeoutError("ASR worker did not answer in time")
+            kind, payload = self.conn.recv()
+            if kind == "utterance" and payload[0] == seq:
+                return payload[1]
+            elif kind == "error":
+                raise RuntimeError(payload)
+
+    def close(self):
+        try:
+            self.conn.send_bytes(OP_QUIT)
+        except (OSError, ValueError):
+            pass
+        self.proc.join(timeout=2)
+        if self.proc.is_alive():
+            self.proc.terminate()
+        self.conn.close()
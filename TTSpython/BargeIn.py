@@ -0,0 +1,141 @@
+import math
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+# Speech must be this many dB above the loud end (90th percentile) of what
+# the mic picked up recently, i.e. above the assistant's own voice
+MARGIN_DB = float(os.getenv("STUDENT_GUIDER_BARGE_IN_MARGIN_DB", "8"))
+ONSET_MS = float(os.getenv("STUDENT_GUIDER_BARGE_IN_ONSET_MS", "150"))
+
+# Level history the floor is taken from, and how much of it is needed first
+WINDOW_MS = 2000
+WARMUP_MS = 400
+
+# The gate arms once playback has been heard through the mic this long
+# (mpg123 takes a moment to start), or after LEARN_MAX_MS if it never is
+LEARN_MS = 300
+LEARN_MAX_MS = 2000
+
+# Audio kept from before the onset, so the first syllable is not lost
+PREROLL_MS = 300
+
+
+def level_db(block):
+    samples = block.astype(np.float32)
+    rms = math.sqrt(float(np.dot(samples, samples)) / max(1, len(samples)))
+    return 20.0 * math.log10(rms + 1.0)
+
+
+class EnergyGate:
+    """
+    Detects a student talking over the assistant's playback.
+
+    mpg123 gives us no echo reference, so the gate learns what the
+    speaker sounds like through the mic instead: blocks are compared with
+    the 90th percentile of the recent levels, and speech is declared once
+    ONSET_MS of consecutive blocks are MARGIN_DB louder.
+
+    Until it is armed, every block is learned: the room during WARMUP_MS,
+    then the playback once it is MARGIN_DB above the room, for LEARN_MS
+    of such blocks (or LEARN_MAX_MS in all, for a speaker the mic barely
+    hears). After that loud blocks are kept out of the history, so the
+    student's own voice does not raise the floor.
+    """
+
+    def __init__(self, samplerate, blocksize=1024, margin_db=MARGIN_DB, onset_ms=ONSET_MS):
+        block_ms = 1000.0 * blocksize / samplerate
+        self.margin_db = margin_db
+        self.onset_blocks = max(1, round(onset_ms / block_ms))
+        self.warmup_blocks = max(1, round(WARMUP_MS / block_ms))
+        self.preroll_blocks = max(1, round(PREROLL_MS / block_ms))
+        self.learn_blocks = max(1, round(LEARN_MS / block_ms))
+        self.learn_max_blocks = max(self.warmup_blocks, round(LEARN_MAX_MS / block_ms))
+        self.history = deque(maxlen=max(self.warmup_blocks, round(WINDOW_MS / block_ms)))
+        self.armed = False
+        self._seen = 0
+        self._heard = 0
+        self._room_db = None
+        self._loud = 0
+
+    def floor_db(self):
+        ordered = sorted(self.history)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    def feed(self, block):
+        """Add one int16 mic block; True once speech has started."""
+        level = level_db(block)
+        if not self.armed:
+            self._learn(level)
+            return False
+        if level > self.floor_db() + self.margin_db:
+            self._loud += 1
+        else:
+            self._loud = 0
+            self.history.append(level)
+        return self._loud >= self.onset_blocks
+
+    def _learn(self, level):
+        self.history.append(level)
+        self._seen += 1
+        if self._seen == self.warmup_blocks:
+            self._room_db = self.floor_db()
+        elif self._seen > self.warmup_blocks:
+            if level > self._room_db + self.margin_db:
+                self._heard += 1
+            self.armed = self._heard >= self.learn_blocks or self._seen >= self.learn_max_blocks
+
+
+class BargeInWatch:
+    """
+    Keeps the mic open while the assistant speaks.
+
+    Runs receiver.record_audio() with an EnergyGate on its own thread:
+    nothing is recorded until the gate opens, then on_speech() is called
+    (to stop playback) and a normal utterance is recorded, starting with
+    the blocks just before the onset. finish() returns that utterance,
+    or None if the student stayed quiet.
+    """
+
+    def __init__(self, receiver, on_speech, duration=5):
+        self.receiver = receiver
+        self.on_speech = on_speech
+        self.duration = duration
+        self.audio = None
+        self.triggered = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        gate = EnergyGate(self.receiver.native_samplerate)
+        self._thread = threading.Thread(target=self._run, args=(gate,), name="barge-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, gate):
+        try:
+            self.audio = self.receiver.record_audio(self.duration, stop_event=self._stop,
+                                                    speech_gate=gate, on_speech=self._speech)
+        except Exception as e:
+            print(f"Barge-in capture failed: {e}")
+
+    def _speech(self):
+        print(" Barge-in: student started speaking")
+        self.triggered.set()
+        try:
+            self.on_speech()
+        except Exception as e:
+            print(f"Stopping playback failed: {e}")
+
+    def stop(self):
+        """Abandon the capture without waiting (session cancelled)."""
+        self._stop.set()
+
+    def finish(self):
+        """After playback: the utterance the student barged in with, or None."""
+        if not self.triggered.is_set():
+            self._stop.set()
+        self._thread.join()
+        return self.audio if self.triggered.is_set() else None
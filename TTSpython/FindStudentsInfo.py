@@ -1,11 +1,17 @@
 import subprocess
-import requests
 from bs4 import BeautifulSoup
 from fuzzywuzzy import process
 from gtts import gTTS
 from datetime import datetime
 import os
 import re
+import threading
+import time
+
+from IntentEngine import router, number_reader, announcement_detector
+from AnnouncementIndex import AnnouncementIndex
+from MemoryBudget import budget, deep_sizeof
+from HttpClient import http
 
 # Optional translation (comment out if you prefer Romanian titles)
 try:
@@ -20,26 +26,69 @@ except Exception as e:
 SCHEDULE_URL = "https://docs.google.com/spreadsheets/d/1yCFgf5cqWthT9ckSHwLiSsKxBq1yChmIpLneviGpuoY/edit?gid=1829921421#gid=1829921421"
 ANNOUNCEMENTS_URL = "https://ac.utcluj.ro/anunturi.html"
 
-# Cache announcements to avoid repeated fetching
+# Cache announcements to avoid repeated fetching; refetched once older than this
+ANNOUNCEMENTS_TTL = float(os.getenv("STUDENT_GUIDER_ANNOUNCEMENTS_TTL_MIN", "15")) * 60
 _announcements_cache = None
+_announcements_fetched_at = 0.0  # time.monotonic() of the last fetch attempt
 
+# Held while fetching, so a request during a session prefetch waits for it
+_announcements_lock = threading.Lock()
 
-def get_announcements():
-    """Fetch and parse announcements from the university site."""
+# Local full-text index of every announcement seen so far (opened on first use)
+_announcement_index = None
+
+
+def _drop_announcements():
     global _announcements_cache
+    _announcements_cache = None
+
+
+# Refetched on the next request
+budget.register("announcements", lambda: deep_sizeof(_announcements_cache), _drop_announcements, priority=20)
+
+
+def get_announcement_index():
+    global _announcement_index
+    if _announcement_index is None:
+        _announcement_index = AnnouncementIndex()
+    return _announcement_index
+
+
+def _announcements_fresh():
+    return _announcements_cache is not None and time.monotonic() - _announcements_fetched_at < ANNOUNCEMENTS_TTL
 
-    if _announcements_cache is not None:
+
+def get_announcements():
+    """
+    Fetch and parse announcements from the university site (at most once
+    per ANNOUNCEMENTS_TTL); new ones are added to the search index.
+    """
+    if _announcements_fresh():
         return _announcements_cache
 
+    with _announcements_lock:
+        if _announcements_fresh():
+            return _announcements_cache
+        return _fetch_announcements()
+
+
+def _fetch_announcements():
+    global _announcements_cache, _announcements_fetched_at
+
     try:
-        response = requests.get(ANNOUNCEMENTS_URL, timeout=10)
+        response = http.get(ANNOUNCEMENTS_URL, timeout=10)
         response.raise_for_status()
     except Exception as e:
         print(f" Cannot access announcements page: {e}")
-        return []
+        if _announcements_cache is None:
+            return []
+        # Keep answering from the last list; try the site again after another TTL
+        _announcements_fetched_at = time.monotonic()
+        return _announcements_cache
 
     soup = BeautifulSoup(response.text, "html.parser")
     announcements = []
+    index = get_announcement_index()
 
     # Regex to find date followed by text
     date_pattern = r'(\d{2}-\d{2}-\d{4}\s+\d{2}:\d{2})\s*\n\s*(.+?)(?=\d{2}-\d{2}-\d{4}\s+\d{2}:\d{2}|\Z)'
@@ -52,8 +101,8 @@ def get_announcements():
             continue
 
         # Optional translation to English
-        translated_title = title
-        if TRANSLATE_TO_ENGLISH:
+        translated_title = index.known_translation(date_str, title) or title
+        if TRANSLATE_TO_ENGLISH and translated_title == title:
             try:
                 translated_title = translator.translate(title, src='ro', dest='en').text
             except Exception as e:
@@ -89,8 +138,15 @@ def get_announcements():
 
     announcements.sort(key=lambda a: a["parsed_date"], reverse=True)
 
+    # The parse tree is full of parent/child cycles; free it now, not at the next gc pass
+    soup.decompose()
+
     print(f"Found {len(announcements)} announcements (sorted by date).")
+    added = index.update(announcements)
+    if added:
+        print(f"Indexed {added} new announcements.")
     _announcements_cache = announcements
+    _announcements_fetched_at = time.monotonic()
     return announcements
 
 
@@ -145,9 +201,10 @@ def open_schedule_for_student(student_name, conn=None):
     else:
         return "Sorry, I couldn't open the schedule."
 
-def list_announcements_verbally():
-    """Generate a spoken summary of announcements."""
-    announcements = get_announcements()
+def list_announcements_verbally(announcements=None):
+    """Generate a spoken summary of announcements (default: the newest list)."""
+    if announcements is None:
+        announcements = get_announcements()
 
     if not announcements:
         return "Sorry, I couldn't find any announcements right now."
@@ -164,14 +221,38 @@ def list_announcements_verbally():
     return response
 
 
-def open_announcement_by_number(number_str):
-    """Open an announcement by its list number."""
+def search_announcements_verbally(topic, limit=5):
+    """
+    Spoken list of announcements about a topic, from the local index.
+    Returns (response, matches); matches is the list the numbers refer to.
+    """
+    get_announcements()  # adds what was published since the last fetch, if that was a while ago
+    index = get_announcement_index()
+
+    matches = index.search(topic, limit=limit)
+    if not matches:
+        return f"I couldn't find any announcements about {topic}.", []
+
+    noun = "announcement" if len(matches) == 1 else "announcements"
+    response = f"I found {len(matches)} {noun} about {topic}: "
+    for idx, ann in enumerate(matches, 1):
+        date_str = ann['date'].split()[0]
+        title = ann['title_en'] if TRANSLATE_TO_ENGLISH else ann['title_ro']
+        response += f"Number {idx}, from {date_str}: {title}. "
+
+    response += "Which number would you like me to open?"
+    return response, matches
+
+
+def open_announcement_by_number(number_str, announcements=None):
+    """Open an announcement by its list number (in `announcements`, default: the newest list)."""
     try:
         number = int(number_str)
     except (ValueError, TypeError):
         return "Sorry, I didn't understand that number. Please say a number like one, two, or three."
 
-    announcements = get_announcements()
+    if announcements is None:
+        announcements = get_announcements()
 
     if not announcements:
         return "Sorry, I couldn't find any announcements."
@@ -191,73 +272,35 @@ def open_announcement_by_number(number_str):
 
 def is_schedule_query(question_text):
     """Check if the user asked for the schedule."""
-    schedule_keywords = [
-        "schedule", "timetable", "orar", "class schedule",
-        "my schedule", "today's schedule", "classes today",
-        "what classes", "when is my class", "when do i have"
-    ]
-
-    q = question_text.lower()
-    return any(k in q for k in schedule_keywords)
+    return any(name == "schedule" for name, _ in router.classify(question_text).matches)
 
 
 def is_announcement_query(question_text):
     """Detect if the user is referring to announcements or specific topics from announcements."""
-    # Normalize text (remove extra spaces for better matching)
-    q = question_text.lower()
-    q_normalized = re.sub(r'\s+', '', q)  # Remove all spaces for compound word matching
-    
-    announcement_keywords = [
-        # general
-        "announcement", "anunt", "news", "notice", "update", "notifications", "anunturi",
-        # common announcement topics (with space variants)
-        "deepmind", "deep mind", "results", "result", "bursa", "scholarship", 
-        "volunteer", "grant", "esc", "course", "best", "registration", 
-        "enrollment", "chestionar"
-    ]
-    
-    # Check both normal and normalized versions
-    for keyword in announcement_keywords:
-        if keyword in q:
-            print(f"Detected announcement keyword: '{keyword}'")
-            return True
-        # Also check without spaces
-        keyword_normalized = keyword.replace(" ", "")
-        if keyword_normalized in q_normalized:
-            print(f"Detected announcement keyword (normalized): '{keyword}'")
-            return True
-    
+    intent = announcement_detector.classify(question_text)
+    if intent.name:
+        print(f"Detected announcement keyword: '{intent.matches[0][1]}'")
+        return True
     return False
 
 
 def is_announcement_number_query(question_text):
     """Check if the user said a number for announcement selection."""
-    number_words = {
-        'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-        'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
-        '1': 1, '2': 2, '3': 3, '4': 4, '5': 5
-    }
-
-    q = question_text.lower().strip()
-    for word, num in number_words.items():
-        if word in q:
-            return str(num)
-
-    match = re.search(r'\b(\d+)\b', q)
-    if match:
-        return match.group(1)
-    return None
+    return number_reader.classify(question_text).slots.get("number")
 
-def open_schedule_for_student_2(student_name, conn):
-    cursor = conn.cursor()
+def open_schedule_for_student_2(student_name, conn, grupa=None):
+    """Open the schedule tab for the student's year; grupa (if known already) skips the DB lookup."""
+    if grupa is None:
+        cursor = conn.cursor()
 
-    #  Get the group from the database
-    cursor.execute("SELECT grupa FROM students WHERE nume = ?", (student_name,))
-    result = cursor.fetchone()
-    if not result:
-        return "Sorry, I couldn't find your group in the database."
+        #  Get the group from the database
+        cursor.execute("SELECT grupa FROM students WHERE nume = ?", (student_name,))
+        result = cursor.fetchone()
+        if not result:
+            return "Sorry, I couldn't find your group in the database."
+        grupa = result[0]
 
-    grupa = result[0].upper()  # e.g., '30243R'
+    grupa = grupa.upper()  # e.g., '30243R'
 
     #  Extract year and section
     if len(grupa) < 2:
@@ -0,0 +1,182 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# host -> (concurrent requests, minimum seconds between request starts).
+# Nominatim's usage policy allows one request per second.
+HOST_LIMITS = {
+    "nominatim.openstreetmap.org": (1, 1.0),
+    "overpass-api.de": (2, 0.0),
+    "api.openrouteservice.org": (2, 0.0),
+    "translate.google.com": (4, 0.0),
+    "ac.utcluj.ro": (2, 0.0),
+}
+DEFAULT_LIMIT = (4, 0.0)
+
+# gTTS opens its own connections; its calls still go through call()
+GTTS_HOST = "translate.google.com"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# What call() retries by default: network failures, not bugs in fn
+RETRY_ERRORS = (requests.RequestException, ConnectionError, TimeoutError)
+
+
+class HostGate:
+    """Concurrency and request-rate limit for one host."""
+
+    def __init__(self, concurrency, interval):
+        self.interval = interval
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    @contextmanager
+    def slot(self):
+        with self._slots:
+            if self.interval:
+                with self._lock:
+                    now = time.monotonic()
+                    start = max(now, self._next_start)
+                    self._next_start = start + self.interval
+                if start > now:
+                    time.sleep(start - now)
+            yield
+
+
+class HttpClient(requests.Session):
+    """
+    The kiosk's one outbound HTTP session.
+
+    A requests.Session with a shared keep-alive pool, so it can be handed
+    to libraries that take a session. On top of that, every request:
+
+    - waits for its host's gate (HOST_LIMITS),
+    - is retried with jittered exponential backoff on connection errors
+      and 429/5xx (honouring Retry-After),
+    - is coalesced with an identical request already in flight: GETs and
+      HEADs by default, other methods with coalesce=True. Followers get
+      the leader's Response object (or its exception).
+    """
+
+    def __init__(self, limits=HOST_LIMITS, pool_size=10, retries=3, backoff=0.5):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.limits = dict(limits)
+        self.retries = retries
+        self.backoff = backoff
+        self._gates = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def gate(self, host):
+        with self._lock:
+            gate = self._gates.get(host)
+            if gate is None:
+                gate = self._gates[host] = HostGate(*self.limits.get(host, DEFAULT_LIMIT))
+            return gate
+
+    def _count(self, host, what):
+        with self._lock:
+            counts = self._counts.setdefault(host, {"requests": 0, "retries": 0, "coalesced": 0})
+            counts[what] += 1
+
+    def stats(self):
+        with self._lock:
+            return {host: dict(counts) for host, counts in self._counts.items()}
+
+    # -------------------------
+    # Requests
+    # -------------------------
+    @staticmethod
+    def _key(method, url, kwargs):
+        parts = {k: kwargs.get(k) for k in ("params", "data", "json", "headers")}
+        return method, url, json.dumps(parts, sort_keys=True, default=repr)
+
+    def request(self, method, url, coalesce=None, **kwargs):
+        method = method.upper()
+        if coalesce is None:
+            coalesce = method in ("GET", "HEAD")
+        if not coalesce or kwargs.get("stream"):
+            return self._send(method, url, kwargs)
+
+        key = self._key(method, url, kwargs)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count(urlsplit(url).hostname, "coalesced")
+            return future.result()
+
+        try:
+            response = self._send(method, url, kwargs)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    def _send(self, method, url, kwargs):
+        host = urlsplit(url).hostname
+        gate = self.gate(host)
+        for attempt in range(self.retries + 1):
+            self._count(host, "requests" if attempt == 0 else "retries")
+            try:
+                with gate.slot():
+                    response = super().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = self._delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUS or attempt == self.retries:
+                    return response
+                delay = self._delay(attempt, response)
+                response.close()
+            print(f"HTTP {method} {host} failed, retrying in {delay:.1f} s")
+            time.sleep(delay)
+
+    def call(self, host, fn, retry_on=RETRY_ERRORS):
+        """Run fn() (a library call that makes its own connection) under host's gate and retry policy."""
+        gate = self.gate(host)
+        for attempt in range(self.retries + 1):
+            self._count(host, "requests" if attempt == 0 else "retries")
+            try:
+                with gate.slot():
+                    return fn()
+            except retry_on:
+                if attempt == self.retries:
+                    raise
+                delay = self._delay(attempt)
+                print(f"Call to {host} failed, retrying in {delay:.1f} s")
+                time.sleep(delay)
+
+    def close(self):
+        # Shared for the life of the process: libraries that close "their" session must not close it
+        pass
+
+
+# Process-wide client shared by FindStudentsInfo, TestMonitor, TTS and AnswerAudio
+http = HttpClient()
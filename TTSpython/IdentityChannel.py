@@ -0,0 +1,174 @@
+import os
+import selectors
+import stat
+import threading
+import time
+from collections import namedtuple
+
+# name, sent_at (writer's unix time or None), received_at (monotonic)
+IdentityEvent = namedtuple("IdentityEvent", "name sent_at received_at")
+
+
+def parse_identity_line(line, received_at=None):
+    """
+    Parse one FIFO line: "<unix time>|<name>" from FaceRecognition, or
+    a bare "<name>" from older writers.
+    """
+    received_at = time.monotonic() if received_at is None else received_at
+    line = line.strip()
+    if not line:
+        return None
+
+    stamp, sep, name = line.partition("|")
+    if sep:
+        try:
+            return IdentityEvent(name.strip(), float(stamp), received_at)
+        except ValueError:
+            pass
+    return IdentityEvent(line, None, received_at)
+
+
+class IdentityChannel:
+    """
+    Persistent reader for the student-name FIFO.
+
+    The FIFO stays open for the life of the process, together with a
+    write end of our own, so the FaceRecognition writer (which opens with
+    O_NONBLOCK) always finds a reader and the read side never sees EOF
+    between writers. A selector thread parses events as they arrive and
+    keeps the newest one for latest() / wait().
+
+    FaceRecognition repeats the name in front of the camera every few
+    seconds as a heartbeat. A name is only published again once it has
+    been absent: no repeat of it for `absent_after` seconds, or another
+    student identified in between (A -> B -> A comes through at once).
+    Every repeat, published or not, counts as still present. "Unknown"
+    frames while a student is present are a flicker of the recognizer,
+    not a new arrival, and are dropped.
+    """
+
+    def __init__(self, pipe_path="/tmp/studentName_pipe", absent_after=15.0, on_event=None):
+        self.pipe_path = pipe_path
+        self.absent_after = absent_after
+        self.on_event = on_event
+
+        self._cond = threading.Condition()
+        self._latest = None
+        self._pending = None
+        self._present = None  # (lower-case name, received_at of its last event)
+        self._partial = b""
+        self._thread = None
+        self._read_fd = None
+        self._keepalive_fd = None
+        self._wake_r, self._wake_w = None, None
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self):
+        if self._thread is not None:
+            return self
+
+        # Reuse an existing FIFO so a writer that already opened it keeps working
+        if os.path.exists(self.pipe_path) and not stat.S_ISFIFO(os.stat(self.pipe_path).st_mode):
+            os.remove(self.pipe_path)
+        if not os.path.exists(self.pipe_path):
+            os.mkfifo(self.pipe_path, 0o666)
+            print(f"Created named pipe at {self.pipe_path}")
+
+        self._read_fd = os.open(self.pipe_path, os.O_RDONLY | os.O_NONBLOCK)
+        self._keepalive_fd = os.open(self.pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+        self._wake_r, self._wake_w = os.pipe()
+
+        self._thread = threading.Thread(target=self._run, name="identity-channel", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        os.write(self._wake_w, b"x")
+        self._thread.join(timeout=2)
+        self._thread = None
+        for fd in (self._read_fd, self._keepalive_fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._read_fd = self._keepalive_fd = self._wake_r = self._wake_w = None
+
+    def _run(self):
+        sel = selectors.DefaultSelector()
+        sel.register(self._read_fd, selectors.EVENT_READ, "pipe")
+        sel.register(self._wake_r, selectors.EVENT_READ, "wake")
+        try:
+            while True:
+                for key, _ in sel.select():
+                    if key.data == "wake":
+                        return
+                    self._read_available()
+        finally:
+            sel.close()
+
+    def _read_available(self):
+        try:
+            chunk = os.read(self._read_fd, 4096)
+        except BlockingIOError:
+            return
+        if not chunk:
+            return
+
+        data = self._partial + chunk
+        *lines, self._partial = data.split(b"\n")
+        now = time.monotonic()
+        for raw in lines:
+            event = parse_identity_line(raw.decode(errors="replace"), now)
+            if event is not None:
+                self.publish(event)
+
+    # -------------------------
+    # Events
+    # -------------------------
+    def publish(self, event):
+        """Record an event unless its student is still present (also used to inject events directly)."""
+        key = event.name.strip().lower()
+        with self._cond:
+            present = self._present
+            still_there = present is not None and event.received_at - present[1] < self.absent_after
+            if still_there and key == present[0]:
+                self._present = (key, event.received_at)
+                return False
+            if still_there and key == "unknown":
+                return False
+            self._present = (key, event.received_at)
+
+            self._latest = event
+            self._pending = event
+            self._cond.notify_all()
+
+        if self.on_event is not None:
+            self.on_event(event)
+        return True
+
+    def discard(self, name):
+        """Drop an unconsumed event for name, e.g. one left over when its session ends."""
+        with self._cond:
+            if self._pending is not None and self._pending.name.strip().lower() == name.strip().lower():
+                self._pending = None
+
+    def latest(self):
+        """Most recent identified student (non-blocking, does not consume)."""
+        with self._cond:
+            return self._latest
+
+    def poll(self):
+        """Take the newest unconsumed event, or None (non-blocking)."""
+        with self._cond:
+            event, self._pending = self._pending, None
+            return event
+
+    def wait(self, timeout=None):
+        """Block until an unconsumed event arrives; returns it or None on timeout."""
+        with self._cond:
+            if self._pending is None:
+                self._cond.wait_for(lambda: self._pending is not None, timeout)
+            event, self._pending = self._pending, None
+            return event
@@ -0,0 +1,187 @@
+import re
+from collections import namedtuple
+
+
+# name: intent reported on a match; phrases: trigger words/phrases (a space
+# also matches no space, so "deep mind" finds "deepmind"); slots: optional
+# fn(text, match) -> dict of extracted values. Earlier rules win when
+# several intents match the same utterance.
+IntentRule = namedtuple("IntentRule", "name phrases slots")
+
+# name: winning intent or None; slots: dict; matches: [(intent, matched text)]
+Intent = namedtuple("Intent", "name slots matches")
+
+NUMBER_VALUES = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+}
+
+# Words dropped from a map request to leave the place name
+PLACE_FILLER = re.compile(r"\b(?:maps?|show|open|me|the|please|of|for|to)\b")
+
+# Words dropped from an announcements request to leave its topic
+WORD = re.compile(r"\w+")
+TOPIC_FILLER = frozenset("""
+    announcement announcements news any are there is show tell read me the please
+    about on for of new latest recent all what some regarding
+    can could you list give get see check do does we have has i want today anything
+""".split())
+
+# What is left only counts as a topic after one of these ("announcements about X")...
+TOPIC_MARKER = frozenset(["about", "regarding", "on"])
+
+# ...or when it names a topic the announcements are known to cover. Only
+# words that hardly mean anything else: "best", "course" or "results" turn
+# up in ordinary questions too
+TOPIC_PHRASES = [
+    "deep mind", "bursa", "burse", "scholarship", "scholarships",
+    "volunteer", "volunteering", "esc", "registration", "enrollment", "chestionar",
+    "internship", "internships", "admission", "thesis",
+]
+
+# Words that make a request about the announcements page
+ANNOUNCEMENT_WORDS = [
+    "announcement", "announcements", "anunt", "anunturi", "news", "notice",
+    "notices", "update", "updates", "notifications",
+]
+
+
+def _trie_pattern(phrases):
+    """
+    Factor phrases into one regex over a character trie, so matching
+    costs one walk per position instead of one attempt per phrase and the
+    longest phrase wins.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        ends = "" in node
+        branches = []
+        for ch in sorted(k for k in node if k):
+            piece = r"\s*" if ch == " " else re.escape(ch)
+            branches.append(piece + build(node[ch]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            # Shorter phrase ends here: the longer continuation is optional
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+KNOWN_TOPICS = re.compile(r"\b(?:" + _trie_pattern(sorted(set(TOPIC_PHRASES))) + r")\b")
+
+
+def place_slot(text, match):
+    place = PLACE_FILLER.sub(" ", text)
+    return {"place": " ".join(place.split())}
+
+
+def topic_slot(text, match):
+    """
+    The words left once the request itself is dropped, if they name a
+    topic. "can you list the announcements" has no topic (so the whole
+    list is read out); "announcements about the dean election" and
+    "scholarship news" do.
+    """
+    words = WORD.findall(text)
+    topic = " ".join(w for w in words if w not in TOPIC_FILLER)
+    if topic and (not TOPIC_MARKER.isdisjoint(words) or KNOWN_TOPICS.search(topic)):
+        return {"topic": topic}
+    return {}
+
+
+def explicit_topic_slot(text, match):
+    """A topic named without any announcement word only counts after "about" ("anything about scholarships")."""
+    if not TOPIC_MARKER.isdisjoint(WORD.findall(text)):
+        return topic_slot(text, match)
+    return {}
+
+
+def number_slot(text, match):
+    word = match.group()
+    value = NUMBER_VALUES.get(word)
+    return {"number": str(value if value is not None else int(word))}
+
+
+class IntentEngine:
+    """
+    Keyword intent classifier compiled into a single regex.
+
+    Each rule becomes one named group holding a trie of its phrases; the
+    groups are joined into one alternation anchored on word boundaries, so
+    classify() finds every trigger in a single left-to-right scan and
+    "one" no longer fires inside "phone".
+    """
+
+    def __init__(self, rules, extra_patterns=None):
+        self.rules = list(rules)
+        self.order = {rule.name: i for i, rule in enumerate(self.rules)}
+        extra_patterns = extra_patterns or {}
+
+        groups = []
+        for rule in self.rules:
+            alternatives = [_trie_pattern(sorted({p.lower() for p in rule.phrases}))]
+            if rule.name in extra_patterns:
+                alternatives.append(extra_patterns[rule.name])
+            groups.append(f"(?P<{rule.name}>{'|'.join(a for a in alternatives if a)})")
+        self.pattern = re.compile(r"\b(?:" + "|".join(groups) + r")\b")
+
+    def classify(self, text):
+        text = text.lower().strip()
+        order = self.order
+        matches = []
+        best = None
+        for m in self.pattern.finditer(text):
+            name = m.lastgroup
+            matches.append((name, m.group()))
+            # First match of the highest-priority rule
+            if best is None or order[name] < order[best.lastgroup]:
+                best = m
+
+        if best is None:
+            return Intent(None, {}, matches)
+
+        rule = self.rules[order[best.lastgroup]]
+        slots = rule.slots(text, best) if rule.slots else {}
+        return Intent(rule.name, slots, matches)
+
+
+# -------------------------
+# Rules
+# -------------------------
+
+# Top-level routing in TTS.get_response, in priority order
+ROUTING_RULES = [
+    IntentRule("schedule", [
+        "schedule", "schedules", "timetable", "orar", "orarul", "class schedule",
+        "my schedule", "today's schedule", "classes today",
+        "what classes", "when is my class", "when do i have",
+    ], None),
+    IntentRule("announcements", ["announcement", "announcements"], topic_slot),
+    IntentRule("map", ["map", "maps"], place_slot),
+]
+
+# Follow-up after the announcements were listed
+NUMBER_RULES = [
+    IntentRule("number", list(NUMBER_VALUES), number_slot),
+]
+
+# Fallback for questions the database did not answer: an announcement
+# word, or "about" and a known topic, before it counts as a topic search
+ANNOUNCEMENT_RULES = [
+    IntentRule("announcements", ANNOUNCEMENT_WORDS, topic_slot),
+    IntentRule("announcements_about", TOPIC_PHRASES, explicit_topic_slot),
+]
+
+router = IntentEngine(ROUTING_RULES)
+number_reader = IntentEngine(NUMBER_RULES, extra_patterns={"number": r"\d+"})
+announcement_detector = IntentEngine(ANNOUNCEMENT_RULES)
@@ -0,0 +1,172 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+# Where interactions are appended ("" turns logging off)
+LOG_PATH = os.getenv("STUDENT_GUIDER_INTERACTION_LOG", "interactions.jsonl")
+MAX_BYTES = int(float(os.getenv("STUDENT_GUIDER_INTERACTION_LOG_MB", "5")) * 1024 * 1024)
+BACKUPS = int(os.getenv("STUDENT_GUIDER_INTERACTION_LOG_BACKUPS", "10"))
+
+# Cache pre-warm list written by InteractionReport.py, read at startup
+PREWARM_PATH = os.getenv("STUDENT_GUIDER_PREWARM", "prewarm.json")
+
+# Entries are written when this many are queued or the oldest is this old
+BATCH_SIZE = 200
+FLUSH_SECONDS = 2.0
+
+# Entries beyond this are dropped (and counted) rather than blocking a turn
+QUEUE_SIZE = 10000
+
+
+def rotated_files(path):
+    """Rotated logs for path, oldest first."""
+    root, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{root}-*{ext}.gz"))
+
+
+def log_files(path=LOG_PATH):
+    """Every log file for path (rotated ones first), oldest first."""
+    files = rotated_files(path)
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_entries(paths):
+    """Yield the entries of each file in turn; lines cut short by a crash are skipped."""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def read_prewarm(path=PREWARM_PATH):
+    """The pre-warm list, or None if there is none (yet)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring pre-warm list {path}: {e}")
+        return None
+
+
+class InteractionLog:
+    """
+    Append-only record of what students ask and what the kiosk answered.
+
+    log() only puts the entry on a bounded queue; a background thread
+    writes queued entries in batches as one JSON object per line, with
+    short keys:
+
+        t  unix time         k  kind (q, map, ann, sched, tts)
+        g  group   r  series   q  question   x  spoken text
+        h  tier/id of the matched question, or absent on a miss
+
+    When the file passes max_bytes it is gzipped to
+    <name>-<timestamp>.jsonl.gz and only the newest `backups` of those
+    are kept. InteractionReport.py reads them all back.
+    """
+
+    def __init__(self, path=LOG_PATH, max_bytes=MAX_BYTES, backups=BACKUPS, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def log(self, kind, **fields):
+        if not self.path:
+            return
+        entry = {"t": int(time.time()), "k": kind}
+        entry.update(fields)
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {"path": self.path, "written": self.written, "queued": self._queue.qsize(),
+                "dropped": self.dropped}
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Write out what is queued and stop the writer."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+    # -------------------------
+    # Writer thread
+    # -------------------------
+    def _batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < BATCH_SIZE and batch[-1] is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        f = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                batch = self._batch()
+                entries = [e for e in batch if e is not None]
+                if entries:
+                    f.write("".join(json.dumps(e, separators=(",", ":"), ensure_ascii=False, default=str) + "\n"
+                                    for e in entries))
+                    f.flush()
+                    self.written += len(entries)
+                    if f.tell() >= self.max_bytes:
+                        f.close()
+                        self._rotate()
+                        f = open(self.path, "a", encoding="utf-8")
+                if len(entries) < len(batch):
+                    return
+        except Exception as e:
+            print(f"Interaction log stopped: {e}")
+        finally:
+            f.close()
+
+    def _rotate(self):
+        root, ext = os.path.splitext(self.path)
+        now = time.time()
+        target = f"{root}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}{int(now % 1 * 1000):03d}{ext}.gz"
+        with open(self.path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.path)
+        for old in rotated_files(self.path)[:-self.backups or None]:
+            os.remove(old)
+
+
+# Process-wide log, written from TTS (questions, map, announcements, speech)
+interactions = InteractionLog()
@@ -0,0 +1,215 @@
+"""
+Offline report over the kiosk's interaction log, and the pre-warm list
+TTS.py reads at startup.
+
+    cd TTSpython
+    python InteractionReport.py                      # report + prewarm.json
+    python InteractionReport.py --days 14 --json report.json
+
+Reads interactions.jsonl and its rotated .gz files. Reports the hottest
+stored questions, the questions that matched nothing (candidates for new
+Q&A entries), the places asked for on the map, announcement use and the
+prompts that were synthesized on demand. The pre-warm list holds what
+came up at least --min-count times:
+
+    indexes        (group, series) pairs whose question index is built at startup
+    answers        (tier, row id) of hot answers, rendered if their audio is missing
+    phrases        on-demand prompts, rendered once and kept
+    places         map destinations, geocoded and routed ahead of time
+    announcements  whether to fetch the announcement list at startup
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+from AnswerAudio import ANSWER_TABLES
+from InteractionLog import LOG_PATH, PREWARM_PATH, log_files, read_entries
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def analyze(entries, since=0):
+    """Count everything the report and the pre-warm list need."""
+    counts = {
+        "entries": 0,
+        "questions": 0,
+        "misses": 0,
+        "hits": Counter(),          # "tier/id"
+        "missed": Counter(),        # normalized question
+        "indexes": Counter(),       # (group, series)
+        "places": Counter(),        # normalized place
+        "places_found": Counter(),
+        "announcements": Counter(), # list / search / open
+        "topics": Counter(),
+        "schedule": 0,
+        "tts": Counter(),           # text synthesized on demand
+        "first": None,
+        "last": None,
+    }
+    for e in entries:
+        ts = e.get("t", 0)
+        if ts < since:
+            continue
+        counts["entries"] += 1
+        counts["first"] = ts if counts["first"] is None else min(counts["first"], ts)
+        counts["last"] = ts if counts["last"] is None else max(counts["last"], ts)
+
+        kind = e.get("k")
+        if kind == "q":
+            counts["questions"] += 1
+            counts["indexes"][(e.get("g"), e.get("r"))] += 1
+            if e.get("h"):
+                counts["hits"][e["h"]] += 1
+            else:
+                counts["misses"] += 1
+                counts["missed"][normalize(e.get("q", ""))] += 1
+        elif kind == "map":
+            place = normalize(e.get("p", ""))
+            counts["places"][place] += 1
+            if e.get("ok"):
+                counts["places_found"][place] += 1
+        elif kind == "ann":
+            counts["announcements"][e.get("a")] += 1
+            if e.get("topic"):
+                counts["topics"][normalize(e["topic"])] += 1
+        elif kind == "sched":
+            counts["schedule"] += 1
+        elif kind == "tts":
+            counts["tts"][e.get("x", "")] += 1
+    return counts
+
+
+def question_texts(db_path, keys):
+    """"tier/id" -> stored question, for the keys still in the database."""
+    texts = {}
+    if not db_path or not os.path.exists(db_path):
+        return texts
+    conn = sqlite3.connect(db_path)
+    try:
+        for key in keys:
+            tier, _, row_id = key.partition("/")
+            table = ANSWER_TABLES.get(tier)
+            if table is None or not row_id.isdigit():
+                continue
+            row = conn.execute(f"SELECT intrebare FROM {table} WHERE id = ?", (int(row_id),)).fetchone()
+            if row:
+                texts[key] = row[0]
+    finally:
+        conn.close()
+    return texts
+
+
+def prewarm_list(counts, top, min_count, db_path=None):
+    """With db_path, answers whose question is no longer stored there are left out."""
+    def hot(counter):
+        return [key for key, n in counter.most_common(top) if n >= min_count]
+
+    hot_answers = hot(counts["hits"])
+    if db_path and os.path.exists(db_path):
+        stored = question_texts(db_path, hot_answers)
+        hot_answers = [key for key in hot_answers if key in stored]
+
+    answers = []
+    for key in hot_answers:
+        tier, _, row_id = key.partition("/")
+        if tier in ANSWER_TABLES and row_id.isdigit():
+            answers.append([tier, int(row_id)])
+
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "indexes": [list(pair) for pair in hot(counts["indexes"]) if pair[0] is not None],
+        "answers": answers,
+        "phrases": hot(counts["tts"]),
+        "places": [p for p in hot(counts["places_found"]) if p],
+        "announcements": sum(counts["announcements"].values()) >= min_count,
+    }
+
+
+# -------------------------
+# Reporting
+# -------------------------
+
+def print_table(title, rows, top):
+    print(f"\n{title}")
+    if not rows:
+        print("  (none)")
+        return
+    for count, label in rows[:top]:
+        label = str(label)
+        print(f"  {count:6d}  {label if len(label) <= 100 else label[:97] + '...'}")
+
+
+def report(counts, top, db_path):
+    first = time.strftime("%Y-%m-%d %H:%M", time.localtime(counts["first"])) if counts["first"] else "-"
+    last = time.strftime("%Y-%m-%d %H:%M", time.localtime(counts["last"])) if counts["last"] else "-"
+    questions = counts["questions"]
+    miss_rate = 100.0 * counts["misses"] / questions if questions else 0.0
+    print(f"Entries: {counts['entries']}  from {first} to {last}")
+    print(f"Questions: {questions}  misses: {counts['misses']} ({miss_rate:.1f}%)  "
+          f"schedule: {counts['schedule']}  map: {sum(counts['places'].values())}")
+
+    texts = question_texts(db_path, [key for key, _ in counts["hits"].most_common(top)])
+    print_table("Hot questions", [(n, f"{key:<12} {texts.get(key, '(no longer stored)')}")
+                                  for key, n in counts["hits"].most_common(top)], top)
+    print_table("Missed questions", [(n, q) for q, n in counts["missed"].most_common(top)], top)
+    print_table("Hot places", [(n, f"{p}  ({counts['places_found'][p]} found)")
+                               for p, n in counts["places"].most_common(top)], top)
+    print_table("Announcements", [(n, a) for a, n in counts["announcements"].most_common()], top)
+    print_table("Announcement topics", [(n, t) for t, n in counts["topics"].most_common(top)], top)
+    print_table("Synthesized on demand", [(n, x) for x, n in counts["tts"].most_common(top)], top)
+    print_table("Group / series", [(n, f"{g} / {r}") for (g, r), n in counts["indexes"].most_common(top)], top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on the interaction log and write the pre-warm list")
+    parser.add_argument("--log", default=LOG_PATH, help="interaction log (rotated .gz files are read too)")
+    parser.add_argument("--db", default="students_db.db", help="database used to show the hot questions")
+    parser.add_argument("--days", type=float, default=0, help="only the last N days (default: everything)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--min-count", type=int, default=3, help="how often something must occur to be pre-warmed")
+    parser.add_argument("--prewarm", default=PREWARM_PATH, help='pre-warm list to write ("" to skip)')
+    parser.add_argument("--json", help="also write the counts here")
+    args = parser.parse_args()
+
+    files = log_files(args.log)
+    if not files:
+        print(f"No interaction log at {args.log}")
+        return 1
+
+    since = time.time() - args.days * 86400 if args.days else 0
+    counts = analyze(read_entries(files), since)
+    report(counts, args.top, args.db)
+
+    if args.prewarm:
+        prewarm = prewarm_list(counts, args.top, args.min_count, args.db)
+        with open(args.prewarm, "w", encoding="utf-8") as f:
+            json.dump(prewarm, f, indent=2, ensure_ascii=False)
+        print(f"\nPre-warm list written to {args.prewarm}: {len(prewarm['indexes'])} indexes, "
+              f"{len(prewarm['answers'])} answers, {len(prewarm['phrases'])} phrases, "
+              f"{len(prewarm['places'])} places")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "files": files,
+                "entries": counts["entries"],
+                "questions": counts["questions"],
+                "misses": counts["misses"],
+                "hot_questions": counts["hits"].most_common(args.top),
+                "missed_questions": counts["missed"].most_common(args.top),
+                "places": counts["places"].most_common(args.top),
+                "announcements": dict(counts["announcements"]),
+                "topics": counts["topics"].most_common(args.top),
+                "tts": counts["tts"].most_common(args.top),
+            }, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
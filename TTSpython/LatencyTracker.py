@@ -0,0 +1,235 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stages of one interaction turn, in pipeline order.
+STAGES = (
+    "capture",        # mic read
+    "resample",       # native rate -> 16 kHz
+    "asr_decode",     # Vosk AcceptWaveform / Result
+    "intent",         # keyword routing in get_response
+    "db_lookup",      # SQL + fuzzy match
+    "announcements",  # announcement list / open
+    "map",            # geocoding + routing + folium
+    "tts_synth",      # gTTS
+    "playback",       # mpg123
+    "turn",           # whole turn, record -> response spoken
+)
+
+
+class _NullSpan:
+    """Shared do-nothing span returned when tracking is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracker", "stage", "fields", "start")
+
+    def __init__(self, tracker, stage, fields):
+        self.tracker = tracker
+        self.stage = stage
+        self.fields = fields
+        self.start = 0.0
+
+    def __enter__(self):
+        observer = self.tracker.observer
+        if observer is not None:
+            observer.stage_entered(self.stage)
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.monotonic()
+        observer = self.tracker.observer
+        if observer is not None:
+            observer.stage_exited(self.stage)
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        self.tracker.record(self.stage, end - self.start, start=self.start, **self.fields)
+        return False
+
+
+class StageStats:
+    """Rolling window of durations for one stage."""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, duration):
+        self.samples.append(duration)
+        self.count += 1
+        self.total += duration
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count}
+
+        def pct(p):
+            # Nearest-rank percentile over the rolling window
+            idx = max(0, math.ceil(p / 100.0 * len(ordered)) - 1)
+            return round(ordered[idx] * 1000, 2)
+
+        return {
+            "count": self.count,
+            "window": len(ordered),
+            "mean_ms": round(self.total / self.count * 1000, 2),
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        }
+
+
+class LatencyTracker:
+    """
+    Per-turn span recorder.
+
+    Spans are timed with time.monotonic(), folded into rolling
+    p50/p95/p99 windows per stage and optionally appended to a JSONL log.
+    When disabled, span() hands back a shared no-op object so the
+    instrumented code pays one attribute check per stage.
+
+    An observer (see TurnProfiler) can be attached to hear about stage
+    entry/exit and turn boundaries, whether or not timing is enabled.
+    """
+
+    def __init__(self, enabled=False, log_path=None, window=500):
+        self.enabled = enabled
+        self.window = window
+        self.turn_id = 0
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._log = None
+        self._server = None
+        self._routes = {"/stats": lambda query: self.stats()}
+        self.observer = None
+        if enabled and log_path:
+            self._log = open(log_path, "a", buffering=1)
+
+    @classmethod
+    def from_env(cls):
+        enabled = os.getenv("STUDENT_GUIDER_LATENCY", "0") not in ("", "0", "false", "no")
+        log_path = os.getenv("STUDENT_GUIDER_LATENCY_LOG", "latency.jsonl")
+        window = int(os.getenv("STUDENT_GUIDER_LATENCY_WINDOW", "500"))
+        return cls(enabled=enabled, log_path=log_path, window=window)
+
+    # -------------------------
+    # Recording
+    # -------------------------
+    def span(self, stage, **fields):
+        if not self.enabled and self.observer is None:
+            return _NULL_SPAN
+        return _Span(self, stage, fields)
+
+    def begin_turn(self):
+        self.turn_id += 1
+        if self.observer is not None:
+            self.observer.turn_started(self.turn_id)
+        return self.turn_id
+
+    def record(self, stage, duration, start=None, **fields):
+        if stage == "turn" and self.observer is not None:
+            self.observer.turn_finished(self.turn_id)
+        if not self.enabled:
+            return
+
+        with self._lock:
+            stats = self._stats.get(stage)
+            if stats is None:
+                stats = self._stats[stage] = StageStats(self.window)
+            stats.add(duration)
+
+            if self._log is not None:
+                entry = {
+                    "ts": round(time.time(), 3),
+                    "turn": self.turn_id,
+                    "stage": stage,
+                    "ms": round(duration * 1000, 3),
+                }
+                if start is not None:
+                    entry["mono"] = round(start, 6)
+                if fields:
+                    entry.update(fields)
+                self._log.write(json.dumps(entry, default=str) + "\n")
+
+    def stats(self):
+        with self._lock:
+            ordered = [s for s in STAGES if s in self._stats]
+            ordered += sorted(s for s in self._stats if s not in STAGES)
+            return {
+                "enabled": self.enabled,
+                "turns": self.turn_id,
+                "stages": {s: self._stats[s].summary() for s in ordered},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    # -------------------------
+    # Local stats endpoint
+    # -------------------------
+    def add_route(self, path, handler):
+        """Register handler(query_dict) -> JSON-serializable result under path."""
+        self._routes[path] = handler
+
+    def serve(self, port, host="127.0.0.1"):
+        if self._server is not None:
+            return self._server
+
+        routes = self._routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                handler = routes.get(path)
+                if handler is None:
+                    self.send_error(404)
+                    return
+                params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+                try:
+                    body = json.dumps(handler(params), indent=2, default=str).encode()
+                    self.send_response(200)
+                except Exception as e:
+                    body = json.dumps({"error": str(e)}).encode()
+                    self.send_response(500)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"Stats endpoint on http://{host}:{port}/stats")
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+# Process-wide tracker shared by TTS, StudentReceiver and FindStudentsInfo
+tracker = LatencyTracker.from_env()
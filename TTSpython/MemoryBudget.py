@@ -0,0 +1,271 @@
+import ctypes
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import deque, namedtuple
+
+# name: shown in reports; size: fn() -> estimated bytes; evict: fn() that
+# drops what it can, or None for memory we only account; priority: lower
+# values are evicted first.
+MemoryEntry = namedtuple("MemoryEntry", "name size evict priority")
+
+# Never followed by deep_sizeof: shared by the whole process, not owned by a cache
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType, types.CodeType)
+
+
+def deep_sizeof(obj, max_objects=200000):
+    """
+    Approximate bytes reachable from obj: containers, instance attributes
+    and NumPy buffers (via nbytes). Stops after max_objects objects, so it
+    stays cheap on large caches and under-reports rather than stalls.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < max_objects:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SHARED_TYPES):
+            continue
+        seen.add(id(o))
+
+        nbytes = getattr(o, "nbytes", None)
+        if isinstance(nbytes, int):
+            total += max(nbytes, sys.getsizeof(o))
+            continue
+        total += sys.getsizeof(o)
+
+        if isinstance(o, dict):
+            stack.extend(list(o.items()))
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(list(o))
+        elif isinstance(o, (str, bytes, bytearray, int, float)):
+            continue
+        else:
+            attrs = getattr(o, "__dict__", None)
+            if attrs is not None:
+                stack.append(attrs)
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return total
+
+
+def current_rss():
+    """Resident set size of this process in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _trim_heap():
+    """Hand freed heap pages back to the OS (glibc only)."""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryBudget:
+    """
+    Registry of the process's caches and buffers with a shared budget.
+
+    Each cache registers a size estimator and, if it can shrink, an evict
+    function. check() sums the estimates and, when they exceed the budget,
+    evicts caches in priority order (largest first within a priority)
+    until the total fits again. A background thread runs check() every
+    interval seconds.
+
+    With tracing on, dump() prints the top allocation sites that grew
+    since the previous dump (tracemalloc snapshot diff); it is bound to
+    SIGUSR2 by install_signal() and exposed on the stats endpoint.
+    """
+
+    def __init__(self, budget_bytes=0, interval=60, trace_frames=0):
+        self.budget_bytes = budget_bytes
+        self.interval = interval
+        self.trace_frames = trace_frames
+        self.evictions = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._baseline = None
+        self._thread = None
+        self._stop = threading.Event()
+        if trace_frames:
+            self.start_tracing(trace_frames)
+
+    @classmethod
+    def from_env(cls):
+        budget_mb = float(os.getenv("STUDENT_GUIDER_MEMORY_BUDGET_MB", "0"))
+        interval = float(os.getenv("STUDENT_GUIDER_MEMORY_CHECK", "60"))
+        trace_frames = int(os.getenv("STUDENT_GUIDER_TRACEMALLOC", "0"))
+        return cls(int(budget_mb * 1024 * 1024), interval, trace_frames)
+
+    # -------------------------
+    # Registry
+    # -------------------------
+    def register(self, name, size, evict=None, priority=50):
+        with self._lock:
+            self._entries[name] = MemoryEntry(name, size, evict, priority)
+
+    def unregister(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def usage(self):
+        """name -> estimated bytes for every registered entry."""
+        with self._lock:
+            entries = list(self._entries.values())
+        sizes = {}
+        for entry in entries:
+            try:
+                sizes[entry.name] = int(entry.size())
+            except Exception as e:
+                # The owner may be mutating it right now; report it next time
+                print(f"[memory] Size of {entry.name} unavailable: {e}")
+                sizes[entry.name] = 0
+        return sizes
+
+    # -------------------------
+    # Budget
+    # -------------------------
+    def check(self):
+        """Evict until the tracked total fits the budget; returns bytes freed."""
+        if not self.budget_bytes:
+            return 0
+
+        sizes = self.usage()
+        total = sum(sizes.values())
+        if total <= self.budget_bytes:
+            return 0
+
+        with self._lock:
+            evictable = [e for e in self._entries.values() if e.evict is not None]
+        evictable.sort(key=lambda e: (e.priority, -sizes.get(e.name, 0)))
+
+        freed = 0
+        evicted = []
+        for entry in evictable:
+            if total - freed <= self.budget_bytes:
+                break
+            before = sizes.get(entry.name, 0)
+            if not before:
+                continue
+            try:
+                entry.evict()
+                after = int(entry.size())
+            except Exception as e:
+                print(f"[memory] Evicting {entry.name} failed: {e}")
+                continue
+            freed += max(0, before - after)
+            evicted.append(entry.name)
+
+        if evicted:
+            self.evictions += len(evicted)
+            gc.collect()
+            _trim_heap()
+            print(f"[memory] Tracked {total / 2**20:.1f} MB over budget "
+                  f"{self.budget_bytes / 2**20:.1f} MB: evicted {', '.join(evicted)} "
+                  f"({freed / 2**20:.1f} MB)")
+        return freed
+
+    def start(self):
+        if self._thread is None and self.budget_bytes:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="memory-budget", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def report(self):
+        sizes = self.usage()
+        return {
+            "rss_mb": round(current_rss() / 2**20, 1),
+            "tracked_mb": round(sum(sizes.values()) / 2**20, 2),
+            "budget_mb": round(self.budget_bytes / 2**20, 1) if self.budget_bytes else None,
+            "evictions": self.evictions,
+            "tracing": tracemalloc.is_tracing(),
+            "entries": {name: round(size / 2**20, 3)
+                        for name, size in sorted(sizes.items(), key=lambda kv: -kv[1])},
+        }
+
+    # -------------------------
+    # Allocation diffs
+    # -------------------------
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def start_tracing(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = self._snapshot()
+
+    def diff(self, top=20):
+        """
+        Allocation sites that grew most since the previous call (or since
+        tracing started), as printable lines. The new snapshot becomes the
+        baseline for the next call; like dump(), the first call only starts
+        tracing.
+        """
+        if not tracemalloc.is_tracing():
+            self.start_tracing(self.trace_frames or 1)
+            return ["tracemalloc started; baseline taken, request again for a diff"]
+
+        snapshot = self._snapshot()
+        baseline, self._baseline = self._baseline, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"traced {current / 2**20:.1f} MB (peak {peak / 2**20:.1f} MB)"]
+        if baseline is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = snapshot.compare_to(baseline, "lineno")
+        lines.extend(str(stat) for stat in stats[:top])
+        return lines
+
+    def dump(self, top=20):
+        """Print usage and an allocation diff; the first call only starts tracing."""
+        print(f"[memory] {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        for key, value in self.report().items():
+            print(f"  {key}: {value}")
+        if not tracemalloc.is_tracing():
+            self.start_tracing(self.trace_frames or 1)
+            print("  tracemalloc started; send the signal again for a diff")
+            return
+        for line in self.diff(top):
+            print(f"  {line}")
+
+    def install_signal(self, signum=getattr(signal, "SIGUSR2", None)):
+        """`kill -USR2 <pid>` dumps memory usage and allocation growth."""
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        # The handler runs between bytecodes of the main thread, which may
+        # hold this budget's lock or a cache's own lock that size() needs:
+        # dump on a thread of its own instead
+        signal.signal(signum, lambda *_: threading.Thread(target=self.dump, name="memory-dump",
+                                                          daemon=True).start())
+        return True
+
+
+# Process-wide budget; caches register themselves where they are defined
+budget = MemoryBudget.from_env()
@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from LatencyTracker import tracker
+
+# Warm a student's session while the greeting plays
+PREFETCH = os.getenv("STUDENT_GUIDER_PREFETCH", "1") not in ("", "0", "false", "no")
+PREFETCH_WORKERS = int(os.getenv("STUDENT_GUIDER_PREFETCH_WORKERS", "3"))
+
+# Shared by every session; threads are only started when work arrives
+_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+
+class Prefetch:
+    """
+    Work started speculatively for one student's session.
+
+    Each task runs on the shared prefetch pool, or on a given executor
+    (e.g. the thread that owns the DB connection), and is timed as a
+    "prefetch" span. Most tasks just warm a module-level cache; ones whose
+    result is used directly (the greeting audio) are handed over with
+    take(). close() cancels what has not started and runs the cleanup of
+    results nobody took, e.g. deleting an mp3 that was never played.
+    """
+
+    def __init__(self, student_name, enabled=None):
+        self.student_name = student_name
+        self.enabled = PREFETCH if enabled is None else enabled
+        self._tasks = {}
+
+    def _timed(self, name, fn, *args):
+        try:
+            with tracker.span("prefetch", task=name):
+                return fn(*args)
+        except Exception as e:
+            print(f" Prefetch {name} for {self.student_name} failed: {e}")
+            raise
+
+    def submit(self, name, fn, *args, executor=None, cleanup=None):
+        """Start fn(*args) in the background; returns its future (None when disabled)."""
+        if not self.enabled:
+            return None
+        future = (executor or _pool).submit(self._timed, name, fn, *args)
+        self._tasks[name] = (future, cleanup)
+        return future
+
+    def run(self, name, fn, *args, cleanup=None):
+        """Run fn(*args) on the calling thread, recorded like a submitted task."""
+        if not self.enabled:
+            return None
+        future = Future()
+        try:
+            future.set_result(self._timed(name, fn, *args))
+        except Exception as e:
+            future.set_exception(e)
+        self._tasks[name] = (future, cleanup)
+        return future
+
+    def take(self, name):
+        """The task's future, now owned by the caller (close() leaves it alone), or None."""
+        task = self._tasks.pop(name, None)
+        return task[0] if task else None
+
+    def close(self):
+        for future, cleanup in self._tasks.values():
+            if future.cancel() or cleanup is None:
+                continue
+            future.add_done_callback(
+                lambda f, cleanup=cleanup: f.exception() is None and cleanup(f.result()))
+        self._tasks.clear()
@@ -0,0 +1,257 @@
+import math
+import re
+from collections import Counter, namedtuple
+
+import numpy as np
+
+# Scorers: rapidfuzz (C++) when installed, fuzzywuzzy otherwise
+try:
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process, utils as rf_utils
+    HAVE_RAPIDFUZZ = True
+except ImportError:
+    HAVE_RAPIDFUZZ = False
+
+try:
+    from fuzzywuzzy import fuzz as fw_fuzz, process as fw_process
+    HAVE_FUZZYWUZZY = True
+except ImportError:
+    HAVE_FUZZYWUZZY = False
+
+# Above this many stored questions "auto" narrows candidates with TF-IDF first
+TFIDF_MIN_CHOICES = 2000
+
+
+def preprocess(text):
+    """Same cleanup fuzzywuzzy's full_process applies before scoring."""
+    return re.sub(r"\W+", " ", text).strip().lower()
+
+
+def wratio(a, b, score_cutoff=0):
+    if HAVE_RAPIDFUZZ:
+        return rf_fuzz.WRatio(a, b, processor=None, score_cutoff=score_cutoff)
+    score = fw_fuzz.WRatio(a, b, force_ascii=False, full_process=False)
+    return score if score >= score_cutoff else 0
+
+
+# -------------------------
+# Backends
+# -------------------------
+# Every backend takes the list of stored question strings once and answers
+# extract(query, limit, score_cutoff) -> [(choice, score, index), ...]
+# best first, with scores on fuzzywuzzy's 0-100 WRatio scale.
+
+class QuestionMatcher:
+    name = "base"
+
+    def __init__(self, choices):
+        self.choices = list(choices)
+
+    def __len__(self):
+        return len(self.choices)
+
+    def extract(self, query, limit=5, score_cutoff=0):
+        raise NotImplementedError
+
+    def extract_one(self, query, score_cutoff=0):
+        hits = self.extract(query, limit=1, score_cutoff=score_cutoff)
+        return hits[0] if hits else None
+
+
+class FuzzyWuzzyMatcher(QuestionMatcher):
+    """The original process.extractOne path, kept for comparison."""
+    name = "fuzzywuzzy"
+
+    def __init__(self, choices):
+        super().__init__(choices)
+        self._by_index = dict(enumerate(self.choices))
+
+    def extract(self, query, limit=5, score_cutoff=0):
+        if not self.choices:
+            return []
+        hits = fw_process.extractBests(query, self._by_index, score_cutoff=score_cutoff, limit=limit)
+        return [(choice, score, idx) for choice, score, idx in hits]
+
+
+class RapidFuzzMatcher(QuestionMatcher):
+    """WRatio over every choice in C++, choices preprocessed once."""
+    name = "rapidfuzz"
+
+    def __init__(self, choices):
+        super().__init__(choices)
+        self._processed = [rf_utils.default_process(c) for c in self.choices]
+
+    def extract(self, query, limit=5, score_cutoff=0):
+        if not self.choices:
+            return []
+        hits = rf_process.extract(
+            rf_utils.default_process(query),
+            self._processed,
+            scorer=rf_fuzz.WRatio,
+            processor=None,
+            limit=limit,
+            score_cutoff=score_cutoff,
+        )
+        return [(self.choices[idx], score, idx) for _, score, idx in hits]
+
+
+class TfidfMatcher(QuestionMatcher):
+    """
+    Character 3-gram TF-IDF retrieval followed by WRatio rescoring.
+
+    Documents live in a sparse inverted index (one posting array per
+    n-gram), so a query touches only the postings of its own n-grams. The
+    best `candidates` cosine hits are rescored with WRatio, which keeps
+    the score scale, and the 70 threshold, identical to the other backends.
+    """
+    name = "tfidf"
+
+    def __init__(self, choices, candidates=32):
+        super().__init__(choices)
+        self.candidates = candidates
+        self._processed = [preprocess(c) for c in self.choices]
+
+        # Sparse doc x n-gram matrix in COO form, then split by column
+        vocab = {}
+        rows, cols, tfs = [], [], []
+        for doc, text in enumerate(self._processed):
+            for gram, tf in Counter(self._grams(text)).items():
+                tid = vocab.get(gram)
+                if tid is None:
+                    tid = vocab[gram] = len(vocab)
+                rows.append(doc)
+                cols.append(tid)
+                tfs.append(tf)
+
+        n = len(self.choices)
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        doc_freq = np.bincount(cols, minlength=len(vocab))
+        self._vocab = vocab
+        self._idf = np.log((1.0 + n) / (1.0 + doc_freq)) + 1.0
+
+        weights = (1.0 + np.log(np.asarray(tfs, dtype=np.float64))) * self._idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+        weights /= np.where(norms > 0, norms, 1.0)[rows]
+
+        order = np.argsort(cols, kind="stable")
+        bounds = np.cumsum(doc_freq)[:-1]
+        self._postings = list(zip(
+            np.split(rows[order], bounds),
+            np.split(weights[order].astype(np.float32), bounds),
+        ))
+        self._scores = np.zeros(n, dtype=np.float32)
+
+    @staticmethod
+    def _grams(text):
+        for word in text.split():
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3]
+
+    def extract(self, query, limit=5, score_cutoff=0):
+        if not self.choices:
+            return []
+
+        processed = preprocess(query)
+        counts = Counter(g for g in self._grams(processed) if g in self._vocab)
+        if not counts:
+            return []
+
+        scores = self._scores
+        scores.fill(0.0)
+        for gram, tf in counts.items():
+            tid = self._vocab[gram]
+            docs, weights = self._postings[tid]
+            scores[docs] += (1.0 + math.log(tf)) * self._idf[tid] * weights
+
+        k = min(max(self.candidates, limit), len(scores))
+        if k < len(scores):
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[scores[top] > 0]
+
+        hits = []
+        for idx in top:
+            score = wratio(processed, self._processed[idx], score_cutoff=score_cutoff)
+            if score and score >= score_cutoff:
+                hits.append((self.choices[idx], score, int(idx)))
+        hits.sort(key=lambda h: (-h[1], h[2]))
+        return hits[:limit]
+
+
+BACKENDS = {
+    "fuzzywuzzy": FuzzyWuzzyMatcher,
+    "rapidfuzz": RapidFuzzMatcher,
+    "tfidf": TfidfMatcher,
+}
+
+
+def make_matcher(choices, backend="auto"):
+    """
+    Build a matcher over choices.
+
+    "auto" uses rapidfuzz for small sets and TF-IDF narrowing once the
+    set is large enough for the full scan to dominate the lookup.
+    """
+    if backend == "auto":
+        if len(choices) >= TFIDF_MIN_CHOICES:
+            backend = "tfidf"
+        elif HAVE_RAPIDFUZZ:
+            backend = "rapidfuzz"
+        else:
+            backend = "fuzzywuzzy"
+    return BACKENDS[backend](choices)
+
+
+# -------------------------
+# Cross-tier index
+# -------------------------
+
+QuestionHit = namedtuple("QuestionHit", "tier row_id question answer score rank")
+
+
+class QuestionIndex:
+    """
+    Matchers over the questions of several tiers (group, series,
+    general), one per tier. A search takes the best hits of every tier;
+    tier priority (plus the hint bias for tiers the question points at) is
+    added to the match score only to rank hits that already passed the
+    cutoff. A question
+    below the cutoff never wins, but among those above it a group hit
+    outranks a general one that scored up to its total bias higher
+    (e.g. 6 + 10 points in TTS.py).
+    """
+
+    def __init__(self, entries, tier_bias, backend="auto"):
+        # entries: (tier, row_id, normalized question, answer)
+        self.entries = list(entries)
+        self.tier_bias = tier_bias
+        # Every hit of a tier gets the same bias, so that tier's top `limit`
+        # hits are the only ones of it that can make the ranked top `limit`
+        positions = {}
+        for i, entry in enumerate(self.entries):
+            positions.setdefault(entry[0], []).append(i)
+        self.tiers = [(make_matcher([self.entries[i][2] for i in idxs], backend), idxs)
+                      for idxs in positions.values()]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(self, query, score_cutoff=0, limit=1, hint_tiers=(), hint_bias=0, strict=False):
+        """Best hits by rank; strict drops hits scoring exactly score_cutoff before ranking."""
+        if not self.entries:
+            return []
+
+        ranked = []
+        for matcher, idxs in self.tiers:
+            for _, score, idx in matcher.extract(query, limit=limit, score_cutoff=score_cutoff):
+                if strict and score <= score_cutoff:
+                    continue
+                tier, row_id, question, answer = self.entries[idxs[idx]]
+                rank = score + self.tier_bias.get(tier, 0)
+                if tier in hint_tiers:
+                    rank += hint_bias
+                ranked.append(QuestionHit(tier, row_id, question, answer, score, rank))
+        ranked.sort(key=lambda h: -h.rank)
+        return ranked[:limit]
@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+# The feed protocol lives next to the TCPserver that serves it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TCPserverandclient"))
+from DataFeed import DataFeedClient, FeedError, FeedGap, apply_change
+
+# host[:port] of the writer (the TCPserver); unset means this kiosk is not a replica
+REPLICATE_FROM = os.getenv("STUDENT_GUIDER_REPLICATE_FROM", "")
+REPLICATE_INTERVAL = float(os.getenv("STUDENT_GUIDER_REPLICATE_INTERVAL", "10"))
+
+# Commit (and record progress) every this many applied changes
+BATCH_SIZE = 500
+
+
+def parse_address(address, default_port=9999):
+    host, _, port = address.partition(":")
+    return host, int(port) if port else default_port
+
+
+class Replicator:
+    """
+    Keeps this kiosk's students_db.db a read-only copy of the writer's.
+
+    The first sync loads a snapshot of the whole database; after that only
+    the writer's change log is pulled, starting after the last applied
+    sequence number, so a kiosk that was off catches up from where it
+    stopped. The version is stored in the same transaction as the changes
+    it covers. The database runs in WAL mode, so the kiosk keeps reading
+    while changes are applied. If the writer can no longer continue from
+    our version (we fell behind its retained change log, or its database
+    was recreated and has another id), a new snapshot is taken.
+
+    on_change, if given, is called after each commit with the applied
+    (table, row_id, op, row) entries, or with None after a snapshot.
+    """
+
+    def __init__(self, host, port=9999, db_path="students_db.db", interval=REPLICATE_INTERVAL, on_change=None):
+        self.client = DataFeedClient(host, port)
+        self.db_path = db_path
+        self.interval = interval
+        self.on_change = on_change
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------
+    # State
+    # -------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS replica_state(key TEXT PRIMARY KEY, value INTEGER)")
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def version(conn):
+        row = conn.execute("SELECT value FROM replica_state WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def database(conn):
+        row = conn.execute("SELECT value FROM replica_state WHERE key = 'database'").fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_version(conn, version, database=None):
+        conn.execute("INSERT OR REPLACE INTO replica_state(key, value) VALUES ('version', ?)", (version,))
+        if database is not None:
+            conn.execute("INSERT OR REPLACE INTO replica_state(key, value) VALUES ('database', ?)", (database,))
+
+    # -------------------------
+    # Sync
+    # -------------------------
+    def bootstrap(self, conn):
+        """Replace the local database with a fresh snapshot; returns its (version, database id)."""
+        fd, path = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(os.path.abspath(self.db_path)))
+        os.close(fd)
+        try:
+            version, database = self.client.snapshot(path)
+            snapshot = sqlite3.connect(path)
+            try:
+                # Through SQLite rather than a file rename, so open readers see the new data
+                snapshot.backup(conn)
+            finally:
+                snapshot.close()
+        finally:
+            os.remove(path)
+
+        conn.execute("CREATE TABLE IF NOT EXISTS replica_state(key TEXT PRIMARY KEY, value INTEGER)")
+        self._set_version(conn, version, database)
+        self._commit(conn, version, None)
+        print(f"[replica] Loaded snapshot at version {version}")
+        return version, database
+
+    def sync_once(self):
+        """Pull everything new from the writer; returns the number of changes applied."""
+        conn = self._connect()
+        try:
+            version, database = self.version(conn), self.database(conn)
+            if version is None or database is None:
+                version, database = self.bootstrap(conn)
+
+            try:
+                return self._apply_changes(conn, version, database)
+            except FeedGap as e:
+                print(f"[replica] {e}; taking a new snapshot")
+                conn.rollback()
+                return self._apply_changes(conn, *self.bootstrap(conn))
+        finally:
+            conn.close()
+
+    def _apply_changes(self, conn, version, database):
+        applied = 0
+        batch = []
+        for seq, table, row_id, op, row in self.client.iter_changes(version, database=database):
+            apply_change(conn, table, row_id, op, row)
+            batch.append((table, row_id, op, row))
+            version = seq
+            if len(batch) >= BATCH_SIZE:
+                self._commit(conn, version, batch)
+                applied += len(batch)
+                batch = []
+        if batch:
+            self._commit(conn, version, batch)
+            applied += len(batch)
+        if applied:
+            print(f"[replica] Applied {applied} changes, now at version {version}")
+        return applied
+
+    def _commit(self, conn, version, batch):
+        self._set_version(conn, version)
+        conn.commit()
+        if self.on_change is not None:
+            try:
+                self.on_change(batch)
+            except Exception as e:
+                print(f"[replica] Change callback failed: {e}")
+
+    # -------------------------
+    # Background thread
+    # -------------------------
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replicator", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except (OSError, FeedError, sqlite3.Error, ValueError) as e:
+                # Writer unreachable or mid-restart: keep serving the local copy
+                print(f"[replica] Sync failed: {e}")
+            self._stop.wait(self.interval)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python Replicator.py <writer host[:port]> [db path]")
+        sys.exit(1)
+    host, port = parse_address(sys.argv[1])
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "students_db.db"
+    Replicator(host, port, db_path).sync_once()
+
+
+if __name__ == "__main__":
+    main()
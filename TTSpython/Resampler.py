@@ -0,0 +1,102 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (in_rate -> out_rate).
+
+    The rate ratio is reduced to L/M and a Kaiser-windowed sinc low-pass is
+    split into L polyphase branches of `taps` coefficients each. Blocks of
+    int16 samples are pushed through process_into(); the last taps-1 input
+    samples and the output phase carry over to the next block, so the
+    capture can be resampled while it is still being recorded. All work
+    arrays are allocated once, for blocks of up to max_block samples.
+    """
+
+    def __init__(self, in_rate, out_rate, taps=24, max_block=4096, rolloff=0.9, beta=8.0):
+        g = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        self.taps = taps
+        self.max_block = max_block
+
+        # Prototype low-pass at the upsampled rate, gain `up` to undo zero-stuffing
+        length = taps * self.up
+        cutoff = rolloff * 0.5 / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2.0
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+        h *= self.up / h.sum()
+
+        # phases[p, k] multiplies input sample i + k for an output at phase p
+        self.phases = np.ascontiguousarray(h.reshape(taps, self.up).T[:, ::-1], dtype=np.float32)
+
+        max_out = self.max_output(max_block)
+        self._ext = np.zeros(taps - 1 + max_block, dtype=np.float32)
+        self._steps = np.arange(max_out, dtype=np.int64) * self.down
+        self._pos = np.empty(max_out, dtype=np.int64)
+        self._idx = np.empty(max_out, dtype=np.int64)
+        self._phase = np.empty(max_out, dtype=np.int64)
+        self._coef = np.empty((max_out, taps), dtype=np.float32)
+        self._win = np.empty((max_out, taps), dtype=np.float32)
+        self._acc = np.empty(max_out, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Forget filter history (start of a new utterance)."""
+        self._ext[:self.taps - 1] = 0.0
+        self._t = 0  # next output position, in upsampled samples from block start
+
+    def max_output(self, n_in):
+        """Upper bound on output samples produced from n_in input samples."""
+        return (n_in * self.up) // self.down + 1
+
+    def process_into(self, block, out, offset=0):
+        """
+        Resample an int16 block into out[offset:], returning the number of
+        samples written. out must have room for max_output(len(block)).
+        """
+        written = 0
+        for start in range(0, len(block), self.max_block):
+            written += self._process_chunk(block[start:start + self.max_block], out, offset + written)
+        return written
+
+    def process(self, block):
+        out = np.empty(self.max_output(len(block)), dtype=np.int16)
+        return out[:self.process_into(block, out)]
+
+    def _process_chunk(self, block, out, offset):
+        n = len(block)
+        k = self.taps - 1
+        ext = self._ext
+        ext[k:k + n] = block
+
+        span = n * self.up
+        count = 0 if self._t >= span else -(-(span - self._t) // self.down)
+        if count:
+            pos = self._pos[:count]
+            idx = self._idx[:count]
+            phase = self._phase[:count]
+            np.add(self._steps[:count], self._t, out=pos)
+            np.floor_divide(pos, self.up, out=idx)
+            np.remainder(pos, self.up, out=phase)
+
+            coef = self._coef[:count]
+            win = self._win[:count]
+            acc = self._acc[:count]
+            np.take(self.phases, phase, axis=0, out=coef)
+            np.take(sliding_window_view(ext[:k + n], self.taps), idx, axis=0, out=win)
+            np.einsum("ij,ij->i", coef, win, out=acc)
+
+            np.rint(acc, out=acc)
+            np.clip(acc, -32768, 32767, out=acc)
+            out[offset:offset + count] = acc
+
+        self._t += count * self.down - span
+        # Keep the last taps-1 inputs for the next block
+        ext[:k] = ext[n:n + k]
+        return count
@@ -1,49 +1,81 @@
 import os
 import json
 import time
-import sounddevice as sd
+from collections import deque
 import numpy as np
 from vosk import Model, KaldiRecognizer
-import resampy
 
+from LatencyTracker import tracker
+from AsrGrammar import GrammarBuilder
+from Resampler import PolyphaseResampler
+from IdentityChannel import IdentityChannel
+from AsrWorker import AsrWorker
+from MemoryBudget import budget, deep_sizeof
 
-class StudentReceiver:
-    def __init__(self, usb_mic_name="AB13X USB Audio", model_path="models/vosk-model-small-en-us-0.15"):
-        # Initialize Vosk model
-        print(f"Loading Vosk model from {model_path} ...")
-        self.model = Model(model_path)
 
+class StudentReceiver:
+    def __init__(self, usb_mic_name="AB13X USB Audio", model_path="models/vosk-model-small-en-us-0.15",
+                 use_grammar=False, asr_worker=False):
         # Sampling rates
         self.samplerate = 16000
         self.pipe_path = "/tmp/studentName_pipe"
         self.usb_mic_name = usb_mic_name
 
-        # Kaldi recognizer (default vocabulary)
-        self.rec = KaldiRecognizer(self.model, self.samplerate)
+        # Vosk model: in a worker process fed while recording, or in-process
+        self.worker = None
+        self._streamed = False
+        if asr_worker:
+            print(f"Starting ASR worker with model {model_path} ...")
+            self.worker = AsrWorker(model_path, self.samplerate)
+            self.model = None
+            self.rec = self.open_rec = None
+        else:
+            print(f"Loading Vosk model from {model_path} ...")
+            self.model = Model(model_path)
+            # Kaldi recognizer (default vocabulary)
+            self.rec = KaldiRecognizer(self.model, self.samplerate)
+            self.open_rec = self.rec
+            # Loaded size is close to the size on disk
+            model_bytes = sum(os.path.getsize(os.path.join(root, name))
+                              for root, _, names in os.walk(model_path) for name in names)
+            budget.register("vosk_model", lambda: model_bytes)
 
-        # Detect USB mic
+        # Optional constrained grammars, one recognizer per dialog state
+        self.grammar = GrammarBuilder() if use_grammar else None
+        self.grammar_recs = {}
+        self.grammar_mode = None
+        self._worker_grammar = None
+
+        # Detect USB mic. sounddevice is imported where the mic is used, so
+        # subclasses without audio hardware (benchmarks) load without PortAudio
+        import sounddevice as sd
         self.usb_mic_index = self._detect_usb_mic(self.usb_mic_name)
         dev_info = sd.query_devices(self.usb_mic_index)
         self.native_samplerate = int(dev_info['default_samplerate'])
         print(f"USB mic '{self.usb_mic_name}' at index {self.usb_mic_index}, "
               f"native rate {self.native_samplerate} Hz")
 
-        # Create named pipe
-        if os.path.exists(self.pipe_path):
-            os.remove(self.pipe_path)
-        os.mkfifo(self.pipe_path)
-        print(f"Created named pipe at {self.pipe_path}")
+        # Streaming resamplers (one per input rate) and the reusable capture buffer
+        self.resamplers = {}
+        self.record_buffer = None
+        budget.register("audio_buffers", lambda: deep_sizeof([self.record_buffer, self.resamplers]),
+                        self._drop_record_buffer, priority=90)
+
+        # Keep the named pipe open for the whole run
+        self.identity = IdentityChannel(self.pipe_path).start()
 
         # Pre-warm mic
         self._prewarm_mic()
 
     def _detect_usb_mic(self, name):
+        import sounddevice as sd
         for i, dev in enumerate(sd.query_devices()):
             if name in dev['name'] and dev['max_input_channels'] > 0:
                 return i
         raise RuntimeError(f"USB mic '{name}' not found")
 
     def _prewarm_mic(self):
+        import sounddevice as sd
         print("Pre-warming mic...")
         try:
             s = sd.InputStream(
@@ -63,14 +95,14 @@ class StudentReceiver:
     # -------------------------
     # Named pipe
     # -------------------------
-    def wait_for_student(self):
-        try:
-            with open(self.pipe_path, 'r') as pipe:
-                student_name = pipe.readline().strip()
-                return student_name if student_name else None
-        except Exception as e:
-            print(f"Pipe read error: {e}")
-            return None
+    def wait_for_student(self, timeout=None):
+        event = self.identity.wait(timeout)
+        return event.name if event else None
+
+    def latest_student(self):
+        """Most recently identified student, without blocking"""
+        event = self.identity.latest()
+        return event.name if event else None
 
     def start_listening(self):
         while True:
@@ -78,15 +110,39 @@ class StudentReceiver:
             if student_name:
                 print(f"Received student: {student_name}")
                 return student_name
-            time.sleep(0.5)
 
     # -------------------------
     # Audio recording
     # -------------------------
-    def record_audio(self, duration=5):
+    def record_audio(self, duration=5, stop_event=None, speech_gate=None, on_speech=None):
+        """
+        Record `duration` seconds and return it at the model rate.
+
+        Blocks are resampled as they arrive into a buffer that is reused
+        across calls, so the returned array is only valid until the next
+        record_audio(). Setting stop_event ends the capture early.
+
+        With speech_gate (BargeIn.EnergyGate) nothing is recorded until the
+        gate opens; on_speech() is then called and the recording starts
+        from the blocks just before the onset. If stop_event is set first,
+        returns None.
+        """
+        import sounddevice as sd
         frames_needed = int(duration * self.native_samplerate)
         collected = 0
-        audio_buffer = []
+        written = 0
+
+        resampler = self.resampler_for(self.native_samplerate)
+        resampler.reset()
+        out_needed = resampler.max_output(frames_needed + 1024)
+        if self.record_buffer is None or len(self.record_buffer) < out_needed:
+            self.record_buffer = np.empty(out_needed, dtype=np.int16)
+        out = self.record_buffer
+
+        # Stream blocks to the ASR worker as they are resampled
+        self._streamed = self.worker is not None
+        if self._streamed:
+            self._stream_to_worker(self.worker.reset)
 
         # Open mic
         for attempt in range(5):
@@ -107,46 +163,177 @@ class StudentReceiver:
             print("Mic failed completely")
             return None
 
+        # Barge-in: hold the mic open until the student talks over the playback
+        pending = deque()
+        if speech_gate is not None:
+            heard = False
+            try:
+                heard = self._wait_for_speech(stream, speech_gate, stop_event, pending)
+            finally:
+                if not heard:
+                    stream.stop()
+                    stream.close()
+            if not heard:
+                return None
+            if on_speech is not None:
+                on_speech()
+
+        capture_start = time.monotonic()
+        resample_time = 0.0
         try:
             while collected < frames_needed:
-                data, overflowed = stream.read(1024)
-                if overflowed:
-                    print("Overflow detected")
-                audio_buffer.append(data)
+                if stop_event is not None and stop_event.is_set():
+                    break
+                if pending:
+                    data = pending.popleft()
+                else:
+                    data, overflowed = stream.read(1024)
+                    if overflowed:
+                        print("Overflow detected")
+
+                block_start = time.monotonic()
+                count = resampler.process_into(data[:, 0], out, written)
+                resample_time += time.monotonic() - block_start
+                if self._streamed and count:
+                    self._stream_to_worker(self.worker.feed, out[written:written + count])
+                written += count
                 collected += len(data)
         finally:
             stream.stop()
             stream.close()
+            tracker.record("capture", time.monotonic() - capture_start - resample_time, frames=frames_needed)
+            tracker.record("resample", resample_time)
 
-        if not audio_buffer:
+        if written == 0:
             return None
 
-        audio = np.concatenate(audio_buffer).flatten()
+        audio = out[:written]
         if np.abs(audio).mean() < 50:
             return None  # silence
 
-        # Resample to model rate
-        audio_resampled = resampy.resample(
-            audio.astype(np.float32),
-            self.native_samplerate,
-            self.samplerate
-        )
-        return np.array(audio_resampled, dtype=np.int16)
+        return audio
+
+    @staticmethod
+    def _wait_for_speech(stream, gate, stop_event, pending):
+        """Read blocks until the gate opens (True) or stop_event is set (False); keeps the pre-roll in pending."""
+        while stop_event is None or not stop_event.is_set():
+            data, _ = stream.read(1024)
+            pending.append(data)
+            if len(pending) > gate.preroll_blocks:
+                pending.popleft()
+            if gate.feed(data[:, 0]):
+                return True
+        return False
+
+    def _stream_to_worker(self, op, *args):
+        """Send to the ASR worker; if it is gone, recognize_audio restarts it and feeds the whole capture."""
+        try:
+            op(*args)
+        except (BrokenPipeError, EOFError, OSError) as e:
+            print(f"ASR worker unavailable while recording: {e}")
+            self._streamed = False
+
+    def _restart_worker(self):
+        try:
+            self.worker.restart()
+            self._worker_grammar = None
+            if self.grammar_mode is not None:
+                self.worker.set_grammar(self.grammar_mode, self.grammar.grammar(self.grammar_mode))
+                self._worker_grammar = (self.grammar_mode, self.grammar.generation)
+            return True
+        except Exception as e:
+            print(f"ASR worker restart failed: {e}")
+            return False
+
+    def _drop_record_buffer(self):
+        # Reallocated by the next record_audio()
+        self.record_buffer = None
+
+    def resampler_for(self, samplerate):
+        resampler = self.resamplers.get(samplerate)
+        if resampler is None:
+            resampler = PolyphaseResampler(samplerate, self.samplerate)
+            self.resamplers[samplerate] = resampler
+        return resampler
+
+    def to_model_rate(self, audio, samplerate):
+        """Resample a whole int16 recording captured at samplerate to the model rate"""
+        with tracker.span("resample"):
+            resampler = self.resampler_for(samplerate)
+            resampler.reset()
+            return resampler.process(audio)
+
+    # -------------------------
+    # Grammar
+    # -------------------------
+    def select_grammar(self, mode, conn=None):
+        """
+        Switch recognizer for the dialog state: "questions" or "numbers".
+        Without use_grammar the open-vocabulary recognizer stays active.
+        """
+        if self.grammar is None:
+            return
+
+        if mode == "questions" and conn is not None and self.grammar.refresh(conn):
+            self.grammar_recs.pop("questions", None)
+            print(f"ASR grammar rebuilt (generation {self.grammar.generation})")
+
+        if self.worker is not None:
+            # Only ship the grammar when the mode or its contents changed
+            state = (mode, self.grammar.generation)
+            if state != self._worker_grammar:
+                try:
+                    self.worker.set_grammar(mode, self.grammar.grammar(mode))
+                    self._worker_grammar = state
+                except (BrokenPipeError, EOFError, OSError) as e:
+                    print(f"ASR worker unavailable: {e}")
+            self.grammar_mode = mode
+            return
+
+        rec = self.grammar_recs.get(mode)
+        if rec is None:
+            rec = KaldiRecognizer(self.model, self.samplerate, self.grammar.grammar(mode))
+            self.grammar_recs[mode] = rec
+        self.rec = rec
 
     # -------------------------
     # Recognition
     # -------------------------
     def recognize_audio(self, audio):
         """Recognize audio and map common keywords"""
-        if self.rec.AcceptWaveform(audio.tobytes()):
-            result = json.loads(self.rec.Result())
+        if self.worker is not None:
+            text = self._recognize_in_worker(audio)
         else:
-            result = json.loads(self.rec.PartialResult())
+            with tracker.span("asr_decode"):
+                if self.rec.AcceptWaveform(audio.tobytes()):
+                    result = json.loads(self.rec.Result())
+                else:
+                    result = json.loads(self.rec.PartialResult())
+            text = result.get("text", "")
 
-        text = result.get("text", "").strip()
+        text = text.replace("[unk]", "").strip()
         text = self.fix_common_errors(text)
         return text
 
+    def _recognize_in_worker(self, audio):
+        """
+        Collect the worker's text for this capture. Audio streamed during
+        record_audio is already decoded, so only the tail is left here.
+        """
+        streamed, self._streamed = self._streamed, False
+        with tracker.span("asr_decode", streamed=streamed):
+            try:
+                if not streamed:
+                    if not self.worker.proc.is_alive() and not self._restart_worker():
+                        return ""
+                    self.worker.reset()
+                    self.worker.feed(audio.tobytes())
+                return self.worker.finish()
+            except (BrokenPipeError, EOFError, OSError, TimeoutError, RuntimeError) as e:
+                print(f"ASR worker failed: {e}; restarting")
+                self._restart_worker()
+                return ""
+
     def fix_common_errors(self, text):
         """Map common mis-recognitions to 'cluj' or 'utcn'"""
         replacements = {
@@ -166,6 +353,9 @@ class StudentReceiver:
     # Cleanup
     # -------------------------
     def cleanup(self):
+        if self.worker is not None:
+            self.worker.close()
+        self.identity.stop()
         if os.path.exists(self.pipe_path):
             os.remove(self.pipe_path)
             print(f"Removed pipe {self.pipe_path}")
\ No newline at end of file
@@ -1,19 +1,35 @@
+import asyncio
 import os
 import sqlite3
 import subprocess
+import tempfile
+import threading
 import time
 import re
-from gtts import gTTS
-from fuzzywuzzy import process
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from gtts import gTTS, gTTSError
 
 from StudentReceiver import StudentReceiver
 from TestMonitor import MapAssistant
+from LatencyTracker import tracker
+from QuestionMatcher import QuestionIndex
+from IntentEngine import router, announcement_detector
+from AnswerAudio import ANSWER_TABLES, AnswerAudioStore, AnswerAudioRenderer
+from InteractionLog import PREWARM_PATH, interactions, read_prewarm
+from Replicator import REPLICATE_FROM, Replicator, parse_address
+from MemoryBudget import budget, deep_sizeof
+from TurnProfiler import PROFILE_TURNS, TurnProfiler
+from BargeIn import BargeInWatch
+from HttpClient import GTTS_HOST, RETRY_ERRORS, http
+from Prefetch import Prefetch
 
 from FindStudentsInfo import (
-    is_schedule_query,
     is_announcement_number_query,
+    get_announcements,
     open_schedule_for_student_2,
     list_announcements_verbally,
+    search_announcements_verbally,
     open_announcement_by_number
 )
 
@@ -25,60 +41,102 @@ def normalize(text):
     return re.sub(r"[^\w\s]", "", text).strip().lower()
 
 
-# Try to match the question against stored Q&A.
-# Priority:
-#   1. Lab-specific (group)
-#   2. Series-level
-#   3. General fallback
-# Fuzzy match because speech recognition is noisy.
+# Matcher backend ("auto", "rapidfuzz", "tfidf" or "fuzzywuzzy")
+MATCH_BACKEND = os.getenv("STUDENT_GUIDER_MATCHER", "auto")
+MATCH_THRESHOLD = 70
 
-def search_database(question_text, cursor, grupa, serie):
-    question_lower = question_text.lower()
+# Tier priority, added to the fuzzy score when ranking matches that passed
+# the threshold: lab-specific (group) > series > general.
+TIER_BIAS = {"group": 6, "series": 3, "general": 0}
 
-    if "lab" in question_lower or "laborator" in question_lower:
-        cursor.execute("""
-            SELECT intrebare, raspuns 
-            FROM group_questions
-            WHERE grupa = ?
-        """, (grupa,))
+# Words that point at a tier get it an extra push
+TIER_HINTS = {"group": ("lab", "laborator"), "series": ("series", "serie")}
+HINT_BIAS = 10
 
-    elif "series" in question_lower:
-        cursor.execute("""
-            SELECT intrebare, raspuns 
-            FROM series_questions
-            WHERE serie = ?
-        """, (serie,))
+TIER_QUERIES = (
+    ("group", "SELECT id, intrebare, raspuns FROM group_questions WHERE grupa = ?"),
+    ("series", "SELECT id, intrebare, raspuns FROM series_questions WHERE serie = ?"),
+    ("general", "SELECT id, intrebare, raspuns FROM general_questions"),
+)
 
-    else:
-        cursor.execute("SELECT intrebare, raspuns FROM general_questions")
+# (grupa, serie) -> (data_version, QuestionIndex)
+_index_cache = {}
 
-    rows = cursor.fetchall()
-    if not rows:
-        return None
 
-    norm_q = normalize(question_text)
-    norm_map = {normalize(q): (q, a) for q, a in rows}
+def load_question_index(cursor, grupa, serie):
+    """
+    Build, or reuse, the index over every question a student can reach.
 
-    best, score = process.extractOne(norm_q, list(norm_map.keys()))
+    PRAGMA data_version changes whenever another connection (the
+    TCPserver) commits, so a cached index is rebuilt only after
+    new questions arrive.
+    """
+    version = cursor.execute("PRAGMA data_version").fetchone()[0]
+    key = (grupa, serie)
+    cached = _index_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
 
-    
-    print(f" Fuzzy input: {question_text}")
-    print(f" Best match: {best}")
-    print(f" Score: {score}")
+    params = {"group": (grupa,), "series": (serie,), "general": ()}
+    entries = []
+    for tier, sql in TIER_QUERIES:
+        cursor.execute(sql, params[tier])
+        entries.extend((tier, row_id, normalize(q), a) for row_id, q, a in cursor.fetchall())
 
-    if score > 70:
-        return norm_map[best][1]
+    index = QuestionIndex(entries, TIER_BIAS, MATCH_BACKEND)
+    _index_cache[key] = (version, index)
+    return index
 
+
+# Rebuilt per student on the next question
+budget.register("question_indexes", lambda: deep_sizeof(_index_cache), _index_cache.clear, priority=30)
+
+
+# Match the question against every stored Q&A the student can see
+# (group, series and general) in one ranked search.
+# Fuzzy match because speech recognition is noisy.
+
+def search_database(question_text, cursor, grupa, serie):
+    with tracker.span("db_lookup"):
+        hit = find_question(question_text, cursor, grupa, serie)
+    if hit:
+        interactions.log("q", g=grupa, r=serie, q=question_text, h=f"{hit.tier}/{hit.row_id}")
+        return hit.answer
+    interactions.log("q", g=grupa, r=serie, q=question_text)
     return None
 
 
+def find_question(question_text, cursor, grupa, serie):
+    index = load_question_index(cursor, grupa, serie)
+    if not len(index):
+        return None
+
+    question_lower = question_text.lower()
+    hint_tiers = [tier for tier, words in TIER_HINTS.items()
+                  if any(w in question_lower for w in words)]
+
+    norm_q = normalize(question_text)
+    # Strict, so a hit scoring exactly the threshold cannot shadow a lower-ranked one above it
+    hits = index.search(norm_q, score_cutoff=MATCH_THRESHOLD,
+                        hint_tiers=hint_tiers, hint_bias=HINT_BIAS, strict=True)
+
+    print(f" Fuzzy input: {question_text}")
+    if not hits:
+        print(f" No match above {MATCH_THRESHOLD}")
+        return None
+
+    best = hits[0]
+    print(f" Best match: {best.question} ({best.tier})")
+    print(f" Score: {best.score}")
+    return best
+
+
 # -------------------------
 # Response Logic
 # -------------------------
 
 def get_response(receiver, conn, mapper, question_text, conversation_state, student_name, grupa, serie):
     cursor = conn.cursor()
-    query_lower = question_text.lower().strip()
     print(f" Processing question: {question_text}")
 
     # initialize number_str
@@ -86,46 +144,61 @@ def get_response(receiver, conn, mapper, question_text, conversation_state, stud
 
     # --- Announcement follow-up ---
     if conversation_state.get("waiting_for_announcement_number", False):
-        number_str = is_announcement_number_query(question_text)
+        with tracker.span("intent"):
+            number_str = is_announcement_number_query(question_text)
         if number_str:
             conversation_state["waiting_for_announcement_number"] = False  
             print(f" Opening announcement #{number_str}")
-            result = open_announcement_by_number(number_str)
+            interactions.log("ann", a="open", n=number_str)
+            with tracker.span("announcements", action="open"):
+                result = open_announcement_by_number(
+                    number_str, conversation_state.pop("announcement_choices", None))
             return result if result else "Couldn't open the announcement."
         else:
             # still waiting for number
             print(" Didn't understand the number, still waiting...")
             return "I didn't catch that number. Please say a number like one, two, or three."
 
+    # --- Routing ---
+    with tracker.span("intent"):
+        intent = router.classify(question_text)
+
     # --- Schedule ---
-    if is_schedule_query(question_text):
+    if intent.name == "schedule":
         print(f" Schedule detected for {student_name}")
+        interactions.log("sched", g=grupa)
         try:
-            result = open_schedule_for_student_2(student_name, conn)
+            result = open_schedule_for_student_2(student_name, conn, grupa)
             return result if result else "I couldn't open your schedule."
         except Exception as e:
             print(f" Schedule error: {e}")
             return "There was an error opening your schedule."
 
     # --- Announcements ---
-    if "announcement" in query_lower:
+    if intent.name == "announcements":
+        topic = intent.slots.get("topic")
+        if topic:
+            return search_announcements(topic, conversation_state)
         conversation_state["waiting_for_announcement_number"] = True
         print(" Listing announcements")
-        return list_announcements_verbally()
+        interactions.log("ann", a="list")
+        with tracker.span("announcements", action="list"):
+            # The numbers refer to this list, even if it is refetched before the answer
+            announcements = get_announcements()
+            conversation_state["announcement_choices"] = announcements
+            return list_announcements_verbally(announcements)
 
     # --- Map ---
-    if "map" in query_lower:
-        place_name = re.sub(
-            r"\bmap\b|\bshow\b|\bopen\b|\bme\b|\bthe\b|\bplease\b|\bof\b|\bfor\b|\bto\b",
-            "",
-            query_lower
-        ).strip()
+    if intent.name == "map":
+        place_name = intent.slots["place"]
 
         print(f" Map request: {place_name}")
 
         if place_name:
             try:
-                result = mapper.generate_map(place_name)
+                with tracker.span("map", place=place_name):
+                    result = mapper.generate_map(place_name)
+                interactions.log("map", p=place_name, ok=bool(result))
                 if result:
                     distance, dest_name = result
                     return f"{dest_name} is approximately {distance:.2f} km away. I've opened the map."
@@ -143,45 +216,161 @@ def get_response(receiver, conn, mapper, question_text, conversation_state, stud
         print(f" DB answer: {answer}")
         return answer
 
+    # --- Announcement topics ("any scholarship news?") ---
+    topic = announcement_detector.classify(question_text).slots.get("topic")
+    if topic:
+        return search_announcements(topic, conversation_state)
+
     print(" No response found")
     return "Sorry, I couldn't understand your question."
 
 
+def search_announcements(topic, conversation_state):
+    print(f" Announcement search: {topic}")
+    interactions.log("ann", a="search", topic=topic)
+    with tracker.span("announcements", action="search"):
+        response, matches = search_announcements_verbally(topic)
+    if matches:
+        conversation_state["waiting_for_announcement_number"] = True
+        conversation_state["announcement_choices"] = matches
+    return response
+
+
 # -------------------------
 # Text-to-Speech
 # -------------------------
 
-def speak_response(text):
+# Audio player and the pause after each utterance (benchmarks swap these out)
+PLAYER_CMD = ["mpg123", "-q", "-a", "default"]
+POST_PLAYBACK_PAUSE = 1.5
+
+def synthesize(text, path="response.mp3"):
+    with tracker.span("tts_synth", chars=len(text)):
+        # gTTS reports network failures as gTTSError
+        http.call(GTTS_HOST, lambda: gTTS(text=text, lang="en").save(path), retry_on=RETRY_ERRORS + (gTTSError,))
+    return path
+
+
+# Stored answers rendered by the TCPserver at ingest time
+answer_audio = AnswerAudioStore()
+budget.register("answer_audio_paths", lambda: deep_sizeof(answer_audio._by_hash))
+
+
+def cached_audio(text):
+    path = answer_audio.lookup(text)
+    if path is not None:
+        tracker.record("tts_synth", 0.0, chars=len(text), cached=True)
+    return path
+
+
+def speak_response(text, listen=None, prepared=None, log=True):
+    """
+    Speak text. With listen (the StudentReceiver) the mic stays open
+    during playback; if the student talks over it, playback stops and
+    their utterance is returned (otherwise None). prepared is a future
+    for audio of text already being synthesized (see begin_prefetch); if
+    that synthesis failed, text is synthesized again here.
+    log=False keeps text that names the student out of the interaction log.
+    """
+    heard = None
     try:
         print(f"Speaking: {text}")
 
-        tts = gTTS(text=text, lang="en")
-        tts.save("response.mp3")
-
-        proc = subprocess.Popen(
-            ["mpg123", "-q", "-a", "default", "response.mp3"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        proc.wait()
+        cached = cached_audio(text)
+        if cached is None and prepared is None and log:
+            interactions.log("tts", x=text)
+        path = cached
+        if path is None and prepared is not None:
+            try:
+                path = prepared.result()
+            except Exception as e:
+                print(f" Prefetched audio failed ({e}); synthesizing again")
+        if path is None:
+            path = synthesize(text)
+
+        with tracker.span("playback"):
+            proc = subprocess.Popen(
+                PLAYER_CMD + [path],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            watch = BargeInWatch(listen, proc.terminate).start() if listen is not None else None
+            proc.wait()
+            if watch is not None:
+                heard = watch.finish()
 
-        time.sleep(1.5)
+            if heard is None:
+                time.sleep(POST_PLAYBACK_PAUSE)
 
-        if os.path.exists("response.mp3"):
-            os.remove("response.mp3")
+        if cached is None and os.path.exists(path):
+            os.remove(path)
 
     except Exception as e:
         print(f" TTS error: {e}")
+    return heard
+
+
+def grammar_mode(conversation_state):
+    return "numbers" if conversation_state.get("waiting_for_announcement_number", False) else "questions"
+
+
+# -------------------------
+# Session prefetch
+# -------------------------
+
+def greeting(student_name):
+    return f"Hello, {student_name}, how can I help you?"
+
+
+def synthesize_temp(text):
+    """Synthesize into a new file in the cwd; the caller removes it."""
+    fd, path = tempfile.mkstemp(prefix="response_", suffix=".mp3", dir=".")
+    os.close(fd)
+    try:
+        return synthesize(text, path)
+    except Exception:
+        _discard(path)
+        raise
+
+
+def begin_prefetch(student_name):
+    """
+    Called as soon as a name arrives, before the student is looked up:
+    the greeting is synthesized meanwhile (and thrown away if the
+    student turns out to be unknown).
+    """
+    prefetch = Prefetch(student_name)
+    prefetch.submit("greeting", synthesize_temp, greeting(student_name), cleanup=_discard)
+    return prefetch
+
+
+def prefetch_session(prefetch, conn, grupa, serie, db_executor=None):
+    """
+    Warm what the first question is likely to need while the greeting
+    plays: the announcement list and the question index over the
+    student's group, series and general Q&A. The index is built on
+    db_executor, the thread that owns conn, or here without one.
+    """
+    prefetch.submit("announcements", get_announcements)
+    def warm_questions():
+        return load_question_index(conn.cursor(), grupa, serie)
+
+    if db_executor is not None:
+        prefetch.submit("questions", warm_questions, executor=db_executor)
+    else:
+        prefetch.run("questions", warm_questions)
 
 
 # -------------------------
 # Interaction Loop
 # -------------------------
 
-def interaction_loop(MAX_IDLE, receiver, student_name, conn, mapper, grupa, serie):
+def interaction_loop(MAX_IDLE, receiver, student_name, conn, mapper, grupa, serie, prefetch=None):
     last_interaction = time.time()
     prompted = False
     conversation_state = {"waiting_for_announcement_number": False}
+    listen = receiver if BARGE_IN else None
+    heard = None  # utterance the student started while the assistant was speaking
 
     while True:
         if time.time() - last_interaction > MAX_IDLE:
@@ -189,11 +378,20 @@ def interaction_loop(MAX_IDLE, receiver, student_name, conn, mapper, grupa, seri
             break
 
         if not prompted:
-            speak_response(f"Hello, {student_name}, how can I help you?")
+            receiver.select_grammar(grammar_mode(conversation_state), conn)
+            prepared = prefetch.take("greeting") if prefetch is not None else None
+            heard = speak_response(greeting(student_name), listen, prepared, log=False)
             prompted = True
 
+        receiver.select_grammar(grammar_mode(conversation_state), conn)
+
         print(" Listening...")
-        audio_data = receiver.record_audio(duration=5)
+        tracker.begin_turn()
+        turn_start = time.monotonic()
+        if heard is not None:
+            audio_data, heard = heard, None
+        else:
+            audio_data = receiver.record_audio(duration=5)
 
         if audio_data is None or audio_data.size == 0:
             speak_response("I didn't hear anything.")
@@ -224,28 +422,427 @@ def interaction_loop(MAX_IDLE, receiver, student_name, conn, mapper, grupa, seri
         if not response:
             response = "Sorry, I couldn't understand the question."
 
-        speak_response(response)
+        # The student may answer over the response, so decode it with the next turn's grammar
+        receiver.select_grammar(grammar_mode(conversation_state), conn)
+        heard = speak_response(response, listen)
+        tracker.record("turn", time.monotonic() - turn_start)
 
-        if not conversation_state.get("waiting_for_announcement_number", False):
-            speak_response("Ask another question or say exit.")
+        if heard is None and not conversation_state.get("waiting_for_announcement_number", False):
+            heard = speak_response("Ask another question or say exit.", listen)
 
         last_interaction = time.time()
 
 
+# -------------------------
+# Event-driven loop
+# -------------------------
+# Identity events, finished utterances, finished speech and the idle
+# deadline are all awaitables, so a new student in front of the camera
+# ends the current session immediately instead of after MAX_IDLE.
+# Blocking work runs on single-thread executors: one for the mic/ASR, one
+# for speech synthesis and one that owns every use of the DB connection.
+
+class StudentSwitched(Exception):
+    def __init__(self, event):
+        super().__init__(event.name)
+        self.event = event
+
+
+def _discard(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _terminate(proc):
+    # Playback may have ended on its own just before the student spoke
+    if proc.returncode is None:
+        try:
+            proc.terminate()
+        except ProcessLookupError:
+            pass
+
+
+def lookup_student(conn, student_name):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, grupa, serie 
+        FROM students 
+        WHERE nume = ?
+    """, (student_name,))
+    return cursor.fetchone()
+
+
+class AsyncKiosk:
+    def __init__(self, receiver, conn, mapper, max_idle=90):
+        self.receiver = receiver
+        self.conn = conn
+        self.mapper = mapper
+        self.max_idle = max_idle
+        self.identities = None
+        self.prefetch = None
+        self.audio_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio")
+        self.speech_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speech")
+        self.work_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="work")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.identities = asyncio.Queue()
+        self.receiver.identity.on_event = (
+            lambda event: loop.call_soon_threadsafe(self.identities.put_nowait, event)
+        )
+        pending = self.receiver.identity.poll()
+        if pending is not None:
+            self.identities.put_nowait(pending)
+
+        try:
+            next_event = None
+            while True:
+                if next_event is None:
+                    print("\n Waiting for student identification...")
+                    next_event = await self.identities.get()
+                print(f"Received student: {next_event.name}")
+                name = next_event.name
+                next_event = await self.session(name)
+                if next_event is None:
+                    self.discard_events(name)
+        finally:
+            self.receiver.identity.on_event = None
+            for pool in (self.audio_pool, self.speech_pool, self.work_pool):
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def discard_events(self, name):
+        """After a session: events for the same student that are still queued must not greet them again."""
+        key = name.strip().lower()
+        kept = []
+        while not self.identities.empty():
+            event = self.identities.get_nowait()
+            if event.name.strip().lower() != key:
+                kept.append(event)
+        for event in kept:
+            self.identities.put_nowait(event)
+        self.receiver.identity.discard(name)
+
+    # -------------------------
+    # Awaitable building blocks
+    # -------------------------
+    async def work(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.work_pool, partial(fn, *args))
+
+    async def guard(self, coro, student_name):
+        """Await coro unless a different student is identified first (StudentSwitched)."""
+        task = asyncio.ensure_future(coro)
+        try:
+            while True:
+                getter = asyncio.ensure_future(self.identities.get())
+                done, _ = await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    event = getter.result()
+                    name = event.name.strip().lower()
+                    if name and name != "unknown" and name != student_name.strip().lower():
+                        raise StudentSwitched(event)
+                    continue  # same student still in front of the camera
+                getter.cancel()
+                return task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    async def listen(self, audio=None):
+        """Record one utterance (unless given one caught during playback) and decode it; returns (heard, text)."""
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        if audio is None:
+            try:
+                audio = await loop.run_in_executor(
+                    self.audio_pool, partial(self.receiver.record_audio, duration=5, stop_event=stop))
+            except asyncio.CancelledError:
+                stop.set()
+                raise
+        if audio is None or audio.size == 0:
+            return False, ""
+        text = await loop.run_in_executor(self.audio_pool, self.receiver.recognize_audio, audio)
+        return True, text
+
+    async def speak(self, text, listen=False, prepared=None, log=True):
+        """
+        Speak text (prepared: a future for its audio, already being
+        synthesized; synthesized again if that fails); with listen and
+        BARGE_IN, returns the utterance the student interrupted with, or
+        None. log=False: text names the student, so it is not written to
+        the interaction log.
+        """
+        print(f"Speaking: {text}")
+        loop = asyncio.get_running_loop()
+        heard = None
+        watch = None
+        cached = cached_audio(text)
+        if cached is not None:
+            path = cached
+            synth = loop.create_future()
+            synth.set_result(path)
+        elif prepared is not None:
+            path = None
+            synth = asyncio.wrap_future(prepared)
+        else:
+            if log:
+                interactions.log("tts", x=text)
+            fd, path = tempfile.mkstemp(prefix="response_", suffix=".mp3", dir=".")
+            os.close(fd)
+            synth = loop.run_in_executor(self.speech_pool, synthesize, text, path)
+        try:
+            try:
+                path = await synth
+            except Exception as e:
+                if prepared is None or cached is not None:
+                    raise
+                # The prefetched synthesis failed: synthesize on demand, as without a prefetch
+                print(f" Prefetched audio failed ({e}); synthesizing again")
+                prepared = None
+                fd, path = tempfile.mkstemp(prefix="response_", suffix=".mp3", dir=".")
+                os.close(fd)
+                synth = loop.run_in_executor(self.speech_pool, synthesize, text, path)
+                path = await synth
+            with tracker.span("playback"):
+                proc = await asyncio.create_subprocess_exec(
+                    *PLAYER_CMD, path,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+                if listen and BARGE_IN:
+                    watch = BargeInWatch(
+                        self.receiver, lambda: loop.call_soon_threadsafe(_terminate, proc)).start()
+                try:
+                    await proc.wait()
+                except asyncio.CancelledError:
+                    proc.terminate()
+                    raise
+                if watch is not None:
+                    heard = await loop.run_in_executor(None, watch.finish)
+                    watch = None
+                if heard is None:
+                    await asyncio.sleep(POST_PLAYBACK_PAUSE)
+        except Exception as e:
+            print(f" TTS error: {e}")
+        finally:
+            if watch is not None:
+                watch.stop()
+            # Pre-rendered answers stay on disk; temporary synthesis output does not
+            if prepared is not None and cached is None:
+                prepared.add_done_callback(
+                    lambda f: f.cancelled() or f.exception() is not None or _discard(f.result()))
+            elif cached is None:
+                if synth.done():
+                    _discard(path)
+                else:
+                    # Interrupted mid-synthesis: clean up once gTTS has written the file
+                    synth.add_done_callback(lambda _: _discard(path))
+        return heard
+
+    # -------------------------
+    # Session
+    # -------------------------
+    async def session(self, student_name):
+        """Run one student's session; returns the identity event that ended it, if any."""
+        try:
+            await self.guard(self._session(student_name), student_name)
+        except StudentSwitched as switched:
+            print(f" New student detected: {switched.event.name}")
+            return switched.event
+        except Exception as e:
+            print(f" Session error: {e}")
+        finally:
+            if self.prefetch is not None:
+                self.prefetch.close()
+                self.prefetch = None
+        return None
+
+    async def _session(self, student_name):
+        if not student_name or student_name.strip().lower() == "unknown":
+            await self.speak("I couldn't identify you. Please try again!")
+            return
+
+        self.prefetch = begin_prefetch(student_name)
+        result = await self.work(lookup_student, self.conn, student_name)
+        if result is None:
+            await self.speak(f"I couldn't find you, {student_name}.", log=False)
+            return
+
+        student_id, grupa, serie = result
+        print(f" Student identified: {student_name}")
+        print(f" Group: {grupa}, Series: {serie}")
+
+        loop = asyncio.get_running_loop()
+        conversation_state = {"waiting_for_announcement_number": False}
+        await self.work(self.receiver.select_grammar, grammar_mode(conversation_state), self.conn)
+        # Queued behind the grammar switch on the DB thread, so the greeting is not held up
+        prefetch_session(self.prefetch, self.conn, grupa, serie, db_executor=self.work_pool)
+        pending = await self.speak(greeting(student_name), listen=True,
+                                   prepared=self.prefetch.take("greeting"), log=False)
+        deadline = loop.time() + self.max_idle
+
+        while True:
+            await self.work(self.receiver.select_grammar, grammar_mode(conversation_state), self.conn)
+
+            print(" Listening...")
+            tracker.begin_turn()
+            turn_start = time.monotonic()
+            try:
+                heard, question_text = await asyncio.wait_for(
+                    self.listen(pending), timeout=max(0.0, deadline - loop.time()))
+                pending = None
+            except asyncio.TimeoutError:
+                await self.speak("Session stopped due to inactivity")
+                return
+
+            if not heard:
+                await self.speak("I didn't hear anything.")
+                continue
+
+            print(f"Recognized: {question_text}")
+            if not question_text:
+                await self.speak("I didn't understand.")
+                continue
+
+            if question_text.lower() in ("exit", "stop"):
+                await self.speak("Goodbye.")
+                return
+
+            response = await self.work(
+                get_response, self.receiver, self.conn, self.mapper, question_text,
+                conversation_state, student_name, grupa, serie
+            )
+            if not response:
+                response = "Sorry, I couldn't understand the question."
+
+            # The student may answer over the response, so decode it with the next turn's grammar
+            await self.work(self.receiver.select_grammar, grammar_mode(conversation_state), self.conn)
+            pending = await self.speak(response, listen=True)
+            tracker.record("turn", time.monotonic() - turn_start)
+
+            if pending is None and not conversation_state.get("waiting_for_announcement_number", False):
+                pending = await self.speak("Ask another question or say exit.", listen=True)
+
+            deadline = loop.time() + self.max_idle
+
+
 # -------------------------
 # Main
 # -------------------------
 
+# Constrained Vosk grammars built from stored questions (needs a model with
+# a dynamic graph, e.g. vosk-model-small-en-us)
+USE_ASR_GRAMMAR = os.getenv("STUDENT_GUIDER_ASR_GRAMMAR", "0") not in ("", "0", "false", "no")
+
+# Decode in a separate Vosk process, fed while the mic is still recording
+USE_ASR_WORKER = os.getenv("STUDENT_GUIDER_ASR_WORKER", "0") not in ("", "0", "false", "no")
+
+# Keep the mic open while speaking; talking over the assistant interrupts it
+BARGE_IN = os.getenv("STUDENT_GUIDER_BARGE_IN", "0") not in ("", "0", "false", "no")
+
+# Fall back to the original blocking loop (identify -> session -> identify)
+SEQUENTIAL_LOOP = os.getenv("STUDENT_GUIDER_SEQUENTIAL", "0") not in ("", "0", "false", "no")
+
+
+def start_replica(db_path="students_db.db"):
+    """
+    Follow the writer's database and render audio for answers that arrive
+    through it, since this kiosk's TCPserver never sees them.
+    """
+    renderer = AnswerAudioRenderer(answer_audio).start(db_path)
+    tiers = {table: tier for tier, table in ANSWER_TABLES.items()}
+
+    def on_change(entries):
+        if entries is None:
+            renderer.request_sync(db_path)
+            return
+        for table, row_id, op, row in entries:
+            if table in tiers and row is not None:
+                renderer.submit(tiers[table], row_id, row.get("raspuns"))
+
+    host, port = parse_address(REPLICATE_FROM)
+    print(f"Replicating students_db.db from {host}:{port}")
+    return Replicator(host, port, db_path, on_change=on_change).start()
+
+
+def prewarm_caches(prewarm, conn, mapper, db_path="students_db.db"):
+    """
+    Fill caches from the list InteractionReport.py wrote. Question indexes
+    are built right here (conn belongs to this thread); everything that
+    needs the network runs on a background thread, so startup does not
+    wait for it.
+    """
+    indexes = prewarm.get("indexes", [])
+    for grupa, serie in indexes:
+        load_question_index(conn.cursor(), grupa, serie)
+    print(f"Pre-warmed {len(indexes)} question indexes")
+    threading.Thread(target=_prewarm_network, args=(prewarm, mapper, db_path),
+                     name="prewarm", daemon=True).start()
+
+
+def _prewarm_network(prewarm, mapper, db_path):
+    start = time.monotonic()
+
+    # Hot answers should already be rendered at ingest; make sure they are
+    rendered = 0
+    db = sqlite3.connect(db_path)
+    try:
+        for tier, row_id in prewarm.get("answers", []):
+            table = ANSWER_TABLES.get(tier)
+            row = db.execute(f"SELECT raspuns FROM {table} WHERE id = ?", (row_id,)).fetchone() if table else None
+            if row and row[0] and row[0].strip():
+                try:
+                    rendered += answer_audio.render(tier, row_id, row[0])
+                except Exception as e:
+                    print(f"Answer audio for {tier} #{row_id} failed: {e}")
+    finally:
+        db.close()
+
+    phrases = answer_audio.render_phrases(prewarm.get("phrases", []))
+    if prewarm.get("announcements"):
+        get_announcements()
+    places = mapper.warm(prewarm.get("places", []))
+    print(f"Pre-warm done in {time.monotonic() - start:.1f} s: {rendered} answers and {phrases} phrases "
+          f"rendered, {places} places located")
+
+
 def main():
-    conn = sqlite3.connect("students_db.db")
+    replica = start_replica() if REPLICATE_FROM else None
+
+    # The async loop touches the connection only from its single "work" thread
+    conn = sqlite3.connect("students_db.db", check_same_thread=False)
     mapper = MapAssistant(start_address="Cluj-Napoca, Romania")
     receiver = None
 
+    prewarm = read_prewarm(PREWARM_PATH)
+    if prewarm:
+        prewarm_caches(prewarm, conn, mapper)
+
+    budget.start()
+    budget.install_signal()
+    profiler = TurnProfiler(tracker)
+    profiler.install_signal()
+
+    stats_port = os.getenv("STUDENT_GUIDER_STATS_PORT")
+    if stats_port:
+        tracker.add_route("/memory", lambda query: budget.report())
+        tracker.add_route("/memory/diff", lambda query: budget.diff(int(query.get("top", 20))))
+        tracker.add_route("/profile", lambda query: profiler.arm(int(query.get("turns", PROFILE_TURNS))))
+        tracker.add_route("/profile/status", lambda query: profiler.status())
+        tracker.add_route("/profile/stop", lambda query: profiler.stop() or profiler.status())
+        tracker.add_route("/http", lambda query: http.stats())
+        tracker.add_route("/interactions", lambda query: interactions.stats())
+        tracker.serve(int(stats_port))
+
     try:
         print("Initializing Vosk...")
-        receiver = StudentReceiver()
+        receiver = StudentReceiver(use_grammar=USE_ASR_GRAMMAR, asr_worker=USE_ASR_WORKER)
         print("System ready.")
 
+        if not SEQUENTIAL_LOOP:
+            asyncio.run(AsyncKiosk(receiver, conn, mapper, max_idle=90).run())
+            return
+
         while True:
             print("\n Waiting for student identification...")
             student_name = receiver.start_listening()
@@ -254,40 +851,46 @@ def main():
                 speak_response("I couldn't identify you. Please try again!")
                 continue
 
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, grupa, serie 
-                FROM students 
-                WHERE nume = ?
-            """, (student_name,))
-
-            result = cursor.fetchone()
-
-            if result is None:
-                speak_response(f"I couldn't find you, {student_name}.")
-                continue
-
-            student_id, grupa, serie = result
-
-            print(f" Student identified: {student_name}")
-            print(f" Group: {grupa}, Series: {serie}")
-
-            interaction_loop(
-                MAX_IDLE=90,
-                receiver=receiver,
-                student_name=student_name,
-                conn=conn,
-                mapper=mapper,
-                grupa=grupa,
-                serie=serie
-            )
+            prefetch = begin_prefetch(student_name)
+            try:
+                result = lookup_student(conn, student_name)
+
+                if result is None:
+                    speak_response(f"I couldn't find you, {student_name}.", log=False)
+                    continue
+
+                student_id, grupa, serie = result
+
+                print(f" Student identified: {student_name}")
+                print(f" Group: {grupa}, Series: {serie}")
+
+                prefetch_session(prefetch, conn, grupa, serie)
+                interaction_loop(
+                    MAX_IDLE=90,
+                    receiver=receiver,
+                    student_name=student_name,
+                    conn=conn,
+                    mapper=mapper,
+                    grupa=grupa,
+                    serie=serie,
+                    prefetch=prefetch
+                )
+            finally:
+                prefetch.close()
+                # A repeat of this student queued during the session must not greet them again
+                receiver.identity.discard(student_name)
 
     except KeyboardInterrupt:
         print("\n Shutting down...")
     finally:
         if receiver:
             receiver.cleanup()
+        if replica:
+            replica.stop()
+        budget.stop()
+        interactions.close()
         conn.close()
+        tracker.close()
         print(" Database connection closed.")
 
 
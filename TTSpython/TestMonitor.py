@@ -1,4 +1,5 @@
 import folium
+from geopy.adapters import BaseSyncAdapter, RequestsAdapter
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 import openrouteservice
@@ -8,12 +9,48 @@ import os
 import re
 import subprocess
 
+from HttpClient import http
+from MemoryBudget import budget, deep_sizeof
+
+
+class SharedSessionAdapter(RequestsAdapter):
+    """geopy adapter sending through the shared HttpClient (pool, 1 req/s for Nominatim, retries)."""
+
+    def __init__(self, *, proxies, ssl_context):
+        BaseSyncAdapter.__init__(self, proxies=proxies, ssl_context=ssl_context)
+        self.session = http
+
+
 class MapAssistant:
-    def __init__(self, start_address="Cluj-Napoca, Romania"):
+    def __init__(self, start_address="Cluj-Napoca, Romania", open_browser=True,
+                 nominatim_domain=None, overpass_url=None, ors_base_url=None):
         self.start_address = start_address
-        self.geolocator = Nominatim(user_agent="tts_map_agent")
-        self.api = overpy.Overpass()
-        self.client = openrouteservice.Client(key=os.getenv("ORS_API_KEY"))
+        self.open_browser = open_browser
+
+        # Service endpoints can be pointed elsewhere (e.g. local benchmark stubs)
+        # All three talk through the shared HttpClient
+        if nominatim_domain:
+            self.geolocator = Nominatim(user_agent="tts_map_agent", domain=nominatim_domain, scheme="http",
+                                        adapter_factory=SharedSessionAdapter)
+        else:
+            self.geolocator = Nominatim(user_agent="tts_map_agent", adapter_factory=SharedSessionAdapter)
+        self.api = overpy.Overpass(url=overpass_url) if overpass_url else overpy.Overpass()
+        if ors_base_url:
+            self.client = openrouteservice.Client(key=os.getenv("ORS_API_KEY"), base_url=ors_base_url)
+        else:
+            self.client = openrouteservice.Client(key=os.getenv("ORS_API_KEY"))
+        self.client._session = http
+
+        # The start never moves, and neither do places: geocode/route each once
+        self._start = None
+        self._places = {}
+        budget.register("map_places", lambda: deep_sizeof(self._places), self._places.clear, priority=40)
+
+    def overpass_query(self, query):
+        """Run an Overpass QL query; identical queries in flight share one request."""
+        response = http.post(self.api.url, data=query.encode("utf-8"), timeout=30, coalesce=True)
+        response.raise_for_status()
+        return self.api.parse_json(response.content)
 
     def search_place_osm(self, place_name, center_lat, center_lon, radius=5000):
         """Search for a place by name using Overpass API"""
@@ -73,7 +110,7 @@ class MapAssistant:
         # Try each query
         for query in queries:
             try:
-                result = self.api.query(query)
+                result = self.overpass_query(query)
                 candidates = []
                 
                 for node in result.nodes:
@@ -94,8 +131,20 @@ class MapAssistant:
         
         return None
 
-    def generate_map(self, place_name):
-        start = self.geolocator.geocode(self.start_address)
+    def start_location(self):
+        if self._start is None:
+            self._start = self.geolocator.geocode(self.start_address)
+        return self._start
+
+    def locate(self, place_name):
+        """(dest_name, dest_coords, dist_km, route polyline or None) for a place, or None if not found."""
+        key = place_name.lower().strip()
+        cached = self._places.get(key)
+        if cached is not None:
+            print(f"Using cached location for: {place_name}")
+            return cached
+
+        start = self.start_location()
         if not start:
             print("Start address not found.")
             return None
@@ -145,6 +194,27 @@ class MapAssistant:
             print(f"Routing failed: {e}")
             dist_km = geodesic((start.latitude, start.longitude), dest_coords).km
             decoded = None
+        else:
+            # A straight-line fallback is not worth keeping
+            self._places[key] = (dest_name, dest_coords, dist_km, decoded)
+
+        return dest_name, dest_coords, dist_km, decoded
+
+    def warm(self, places):
+        """Locate places ahead of time (pre-warm list); returns how many are cached."""
+        for place_name in places:
+            try:
+                self.locate(place_name)
+            except Exception as e:
+                print(f"Pre-warming {place_name} failed: {e}")
+        return sum(p.lower().strip() in self._places for p in places)
+
+    def generate_map(self, place_name):
+        located = self.locate(place_name)
+        if located is None:
+            return None
+        dest_name, dest_coords, dist_km, decoded = located
+        start = self.start_location()
 
         # Create map
         m = folium.Map(location=[start.latitude, start.longitude], zoom_start=15)
@@ -157,7 +227,10 @@ class MapAssistant:
         map_file = os.path.abspath("route_map.html")
         m.save(map_file)
         
-        
+        if not self.open_browser:
+            print(f"Map saved to {map_file} - {dest_name} ({dist_km:.2f} km away).")
+            return (float(dist_km), dest_name)
+
         try:
             # Use subprocess.Popen with DETACHED_PROCESS to not block
             subprocess.Popen(
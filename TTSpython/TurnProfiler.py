@@ -0,0 +1,197 @@
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_DIR = os.getenv("STUDENT_GUIDER_PROFILE_DIR", "profiles")
+PROFILE_TURNS = int(os.getenv("STUDENT_GUIDER_PROFILE_TURNS", "3"))
+PROFILE_HZ = float(os.getenv("STUDENT_GUIDER_PROFILE_HZ", "100"))
+
+# Stops a capture whose turns never come (nobody at the kiosk)
+MAX_SECONDS = 600
+
+
+def _frame_label(code):
+    # ';' separates frames in the collapsed format
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class TurnProfiler:
+    """
+    Stack sampler for the next N interaction turns of a running kiosk.
+
+    arm() attaches to the LatencyTracker; the capture starts at the next
+    begin_turn() and ends after the Nth turn. Meanwhile a thread samples
+    every thread's stack with sys._current_frames() and tags each sample
+    with the stage span open on that thread (asr_decode, db_lookup, ...),
+    or "other". The result is written in collapsed-stack format,
+
+        stage;thread;outer frame;...;inner frame <count>
+
+    ready for flamegraph.pl or speedscope. Until armed nothing is
+    attached and no thread runs.
+    """
+
+    def __init__(self, tracker, directory=PROFILE_DIR, hz=PROFILE_HZ):
+        self.tracker = tracker
+        self.directory = directory
+        self.interval = 1.0 / hz
+        self.last_path = None
+        # Re-entrant: the signal handler may run while the main thread holds it
+        self._lock = threading.RLock()
+        self._turns_left = 0
+        self._first_turn = None
+        self._last_turn = None
+        self._stages = {}
+        self._samples = Counter()
+        self._sample_count = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._deadline = 0.0
+
+    @property
+    def armed(self):
+        return self.tracker.observer is self
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    # -------------------------
+    # Control
+    # -------------------------
+    def arm(self, turns=PROFILE_TURNS):
+        """Profile the next `turns` turns; returns a status dict."""
+        with self._lock:
+            if self.armed:
+                return self.status()
+            self._turns_left = max(1, int(turns))
+            self._first_turn = self._last_turn = None
+            self._stages = {}
+            self._samples = Counter()
+            self._sample_count = 0
+            self.tracker.observer = self
+        print(f"[profile] Armed for the next {self._turns_left} turns")
+        return self.status()
+
+    def stop(self):
+        """End a capture early (writing what was sampled) or disarm."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                if self.armed:
+                    self.tracker.observer = None
+                return
+            self._stop.set()
+        thread.join(timeout=5)
+
+    def status(self):
+        return {
+            "armed": self.armed,
+            "running": self.running,
+            "turns_left": self._turns_left,
+            "samples": self._sample_count,
+            "last_profile": self.last_path,
+        }
+
+    def install_signal(self, signum=getattr(signal, "SIGUSR1", None)):
+        """`kill -USR1 <pid>` profiles the next PROFILE_TURNS turns."""
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.arm())
+        return True
+
+    # -------------------------
+    # Tracker observer
+    # -------------------------
+    def stage_entered(self, stage):
+        self._stages.setdefault(threading.get_ident(), []).append(stage)
+
+    def stage_exited(self, stage):
+        stack = self._stages.get(threading.get_ident())
+        # Spans opened before arming were never pushed
+        if stack and stack[-1] == stage:
+            stack.pop()
+
+    def turn_started(self, turn_id):
+        with self._lock:
+            if self._thread is None:
+                self._first_turn = turn_id
+                self._deadline = time.monotonic() + MAX_SECONDS
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="turn-profiler", daemon=True)
+                self._thread.start()
+            elif self._turns_left <= 0:
+                # The last turn ended without a "turn" record (nothing heard)
+                self._stop.set()
+
+    def turn_finished(self, turn_id):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._last_turn = turn_id
+            self._turns_left -= 1
+            if self._turns_left <= 0:
+                self._stop.set()
+
+    # -------------------------
+    # Sampling
+    # -------------------------
+    def _sample(self, own_ident, names):
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack = self._stages.get(ident)
+            stage = stack[-1] if stack else "other"
+            thread = names.get(ident, str(ident))
+            self._samples[";".join([stage, thread] + frames[::-1])] += 1
+        self._sample_count += 1
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        next_names = 0.0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now > self._deadline:
+                    print("[profile] Stopped: turns did not finish in time")
+                    break
+                if now >= next_names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    next_names = now + 1.0
+                self._sample(own, names)
+                self._stop.wait(self.interval)
+        finally:
+            self.tracker.observer = None
+            self._write()
+            with self._lock:
+                self._thread = None
+                self._turns_left = 0
+
+    def _write(self):
+        if not self._samples:
+            print("[profile] No samples collected")
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        last = self._last_turn if self._last_turn is not None else self._first_turn
+        path = os.path.join(self.directory, f"turns-{self._first_turn}-{last}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w") as f:
+            for stack, count in sorted(self._samples.items()):
+                f.write(f"{stack} {count}\n")
+        self.last_path = path
+
+        by_stage = Counter()
+        for stack, count in self._samples.items():
+            by_stage[stack.split(";", 1)[0]] += count
+        print(f"[profile] {self._sample_count} samples over turns {self._first_turn}-{last} -> {path}")
+        # Thread-seconds: "other" includes threads parked waiting for work
+        for stage, count in by_stage.most_common():
+            print(f"  {stage:<14} {count * self.interval:6.2f} s")
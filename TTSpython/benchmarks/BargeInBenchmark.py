@@ -0,0 +1,117 @@
+"""
+Barge-in gate check on synthetic mic input (no mic or speaker needed).
+
+Each scenario is a sequence of 1024-sample blocks as the mic would
+deliver them while the assistant speaks: room noise until mpg123's audio
+arrives, then speech-like playback, and in some scenarios a student
+talking over it. The gate must stay closed on the assistant's own voice
+and open soon after a student starts.
+
+    cd TTSpython
+    python benchmarks/BargeInBenchmark.py
+    python benchmarks/BargeInBenchmark.py --margin-db 6 --playback-db 60
+
+Exits with status 1 if the gate opens without a student, or misses one
+or opens more than --max-delay-ms after the student starts.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from BargeIn import EnergyGate, MARGIN_DB
+
+RATE = 44100
+BLOCK = 1024
+BLOCK_MS = 1000.0 * BLOCK / RATE
+
+
+def rms_for(db):
+    return 10 ** (db / 20.0)
+
+
+def voice(rng, seconds, db, syllables_per_s=4.0):
+    """Noise shaped like speech: syllable-rate bursts with short gaps between words."""
+    n = int(RATE * seconds)
+    t = np.arange(n) / RATE
+    envelope = np.clip(np.sin(2 * np.pi * syllables_per_s / 2 * t + rng.uniform(0, np.pi)), 0, None) ** 0.5
+    words = (np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, np.pi)) > -0.8).astype(np.float32)
+    carrier = np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 900 * t) + rng.normal(0, 0.3, n)
+    signal = envelope * words * carrier
+    level = np.sqrt(np.mean(signal ** 2)) or 1.0
+    return signal * rms_for(db) / level
+
+
+def scenario(rng, seconds, room_db, playback_db=None, playback_at=0.0, student_db=None, student_at=None):
+    n = int(RATE * seconds)
+    audio = rng.normal(0, rms_for(room_db), n)
+    if playback_db is not None:
+        start = int(RATE * playback_at)
+        audio[start:] += voice(rng, (n - start) / RATE, playback_db)
+    if student_db is not None:
+        start = int(RATE * student_at)
+        audio[start:] += voice(rng, (n - start) / RATE, student_db, syllables_per_s=5.0)
+    samples = np.clip(audio, -32768, 32767).astype(np.int16)
+    return [samples[i:i + BLOCK] for i in range(0, n - BLOCK + 1, BLOCK)]
+
+
+def opened_at_ms(blocks, margin_db):
+    gate = EnergyGate(RATE, BLOCK, margin_db=margin_db)
+    for i, block in enumerate(blocks):
+        if gate.feed(block):
+            return (i + 1) * BLOCK_MS
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the barge-in gate against synthetic playback and speech")
+    parser.add_argument("--margin-db", type=float, default=MARGIN_DB)
+    parser.add_argument("--room-db", type=float, default=30, help="room noise level (dBFS-ish, int16 RMS)")
+    parser.add_argument("--playback-db", type=float, default=64, help="the assistant's voice as the mic hears it")
+    parser.add_argument("--student-db", type=float, default=76, help="a student talking over it")
+    parser.add_argument("--max-delay-ms", type=float, default=1000, help="latest acceptable opening after the student starts")
+    parser.add_argument("--seeds", type=int, default=5)
+    args = parser.parse_args()
+
+    quiet = 25 * BLOCK / RATE  # the 25 quiet blocks the warm-up used to end on
+    scenarios = [
+        # name, playback starts at (s), student starts at (s) or None
+        ("playback after 25 quiet blocks", quiet, None),
+        ("playback from the first block", 0.0, None),
+        ("playback after 1 s", 1.0, None),
+        ("speaker not heard", None, None),
+        ("student over playback", quiet, 4.0),
+        ("student early in playback", quiet, 1.5),
+        ("student, speaker not heard", None, 2.5),
+    ]
+
+    failures = 0
+    print(f"margin {args.margin_db} dB, room {args.room_db} dB, playback {args.playback_db} dB, "
+          f"student {args.student_db} dB, {args.seeds} seeds\n")
+    print(f"{'scenario':<34}{'opened at (ms)':>40}  result")
+    for name, playback_at, student_at in scenarios:
+        opened = []
+        for seed in range(args.seeds):
+            rng = np.random.default_rng(seed)
+            blocks = scenario(rng, 8.0, args.room_db,
+                              None if playback_at is None else args.playback_db, playback_at or 0.0,
+                              None if student_at is None else args.student_db, student_at)
+            opened.append(opened_at_ms(blocks, args.margin_db))
+
+        if student_at is None:
+            ok = all(at is None for at in opened)
+        else:
+            ok = all(at is not None and 0 <= at - student_at * 1000 <= args.max_delay_ms for at in opened)
+        failures += not ok
+        shown = " ".join("-" if at is None else f"{at:.0f}" for at in opened)
+        print(f"{name:<34}{shown:>40}  {'ok' if ok else 'FAIL'}")
+
+    print(f"\n{failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
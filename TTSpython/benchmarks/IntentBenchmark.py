@@ -0,0 +1,172 @@
+"""
+Correctness corpus and throughput benchmark for IntentEngine.py.
+
+Checks every utterance in intent_corpus.json against the compiled
+engines (exit status 1 on any mismatch), shows where the previous
+substring routing disagreed, and times both on the same utterances.
+The scaling table repeats the timing with synthetic keyword lists, since
+the keyword loop grows with every keyword added and the engine does not.
+
+    cd TTSpython
+    python benchmarks/IntentBenchmark.py --repeat 2000 --rule-sizes 10 100 1000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from IntentEngine import IntentEngine, IntentRule, router, number_reader, announcement_detector
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.json")
+
+ENGINES = {
+    "routing": router,
+    "number": number_reader,
+    "announcement": announcement_detector,
+}
+
+
+# -------------------------
+# Previous routing, kept for comparison
+# -------------------------
+
+def legacy_routing(text):
+    q = text.lower().strip()
+    schedule_keywords = [
+        "schedule", "timetable", "orar", "class schedule",
+        "my schedule", "today's schedule", "classes today",
+        "what classes", "when is my class", "when do i have"
+    ]
+    if any(k in q for k in schedule_keywords):
+        return "schedule", {}
+    if "announcement" in q:
+        return "announcements", {}
+    if "map" in q:
+        place = re.sub(
+            r"\bmap\b|\bshow\b|\bopen\b|\bme\b|\bthe\b|\bplease\b|\bof\b|\bfor\b|\bto\b", "", q
+        ).strip()
+        return "map", {"place": place}
+    return None, {}
+
+
+def legacy_number(text):
+    number_words = {
+        'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+        'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+        '1': 1, '2': 2, '3': 3, '4': 4, '5': 5
+    }
+    q = text.lower().strip()
+    for word, num in number_words.items():
+        if word in q:
+            return "number", {"number": str(num)}
+    match = re.search(r'\b(\d+)\b', q)
+    if match:
+        return "number", {"number": match.group(1)}
+    return None, {}
+
+
+def legacy_announcement(text):
+    q = text.lower()
+    q_normalized = re.sub(r'\s+', '', q)
+    keywords = [
+        "announcement", "anunt", "news", "notice", "update", "notifications", "anunturi",
+        "deepmind", "deep mind", "results", "result", "bursa", "scholarship",
+        "volunteer", "grant", "esc", "course", "best", "registration",
+        "enrollment", "chestionar"
+    ]
+    for keyword in keywords:
+        if keyword in q or keyword.replace(" ", "") in q_normalized:
+            return "announcements", {}
+    return None, {}
+
+
+LEGACY = {
+    "routing": legacy_routing,
+    "number": legacy_number,
+    "announcement": legacy_announcement,
+}
+
+
+def check(corpus):
+    failures = 0
+    legacy_wrong = 0
+    for kind, cases in corpus.items():
+        engine, legacy = ENGINES[kind], LEGACY[kind]
+        for case in cases:
+            want = (case["intent"], case.get("slots", {}))
+            intent = engine.classify(case["text"])
+            got = (intent.name, intent.slots)
+            if got[0] != want[0] or any(got[1].get(k) != v for k, v in want[1].items()):
+                failures += 1
+                print(f"FAIL [{kind}] {case['text']!r}: expected {want}, got {got}")
+
+            old = legacy(case["text"])
+            if old[0] != want[0] or any(old[1].get(k) != v for k, v in want[1].items()):
+                legacy_wrong += 1
+                print(f"  legacy differs [{kind}] {case['text']!r}: {old}")
+
+    total = sum(len(c) for c in corpus.values())
+    print(f"\nCorpus: {total - failures}/{total} correct (legacy routing: {total - legacy_wrong}/{total})")
+    return failures
+
+
+def timeit(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def scaling(sizes, texts, repeat, seed=0):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    print(f"\n{'keywords':<14}{'loop us':>11}{'engine us':>11}")
+    for size in sizes:
+        keywords = set()
+        while len(keywords) < size:
+            words = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+                     for _ in range(rng.randint(1, 3))]
+            keywords.add(" ".join(words))
+        keywords = sorted(keywords)
+
+        def loop(text, keywords=keywords):
+            q = text.lower()
+            return any(k in q for k in keywords)
+
+        engine = IntentEngine([IntentRule("topic", keywords, None)])
+        print(f"{size:<14}{timeit(loop, texts, repeat):>11.2f}{timeit(engine.classify, texts, repeat):>11.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent engine corpus check and benchmark")
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--rule-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        corpus = json.load(f)
+
+    failures = check(corpus)
+
+    print(f"\n{'rules':<14}{'legacy us':>11}{'engine us':>11}")
+    for kind, cases in corpus.items():
+        texts = [c["text"] for c in cases]
+        legacy_us = timeit(LEGACY[kind], texts, args.repeat)
+        engine_us = timeit(ENGINES[kind].classify, texts, args.repeat)
+        print(f"{kind:<14}{legacy_us:>11.2f}{engine_us:>11.2f}")
+
+    texts = [c["text"] for cases in corpus.values() for c in cases]
+    scaling(args.rule_sizes, texts, max(1, args.repeat // 10))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
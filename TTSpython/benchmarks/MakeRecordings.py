@@ -0,0 +1,65 @@
+"""
+Generate the WAV turns a TurnBenchmark scenario refers to.
+
+Every turn with a "wav" path whose file is missing is spoken with gTTS
+and decoded by mpg123 to mono 16-bit PCM at --rate (44.1 kHz by default,
+like the kiosk's USB mic, so the benchmark also exercises resampling).
+Synthetic speech is cleaner than a student in a hallway, so ASR accuracy
+from these is an upper bound; replace files with real recordings to
+measure it properly.
+
+    cd TTSpython
+    python benchmarks/MakeRecordings.py --scenario benchmarks/scenario.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from gtts import gTTS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_recording(text, path, rate, lang="en"):
+    fd, mp3 = tempfile.mkstemp(suffix=".mp3")
+    os.close(fd)
+    try:
+        gTTS(text=text, lang=lang).save(mp3)
+        subprocess.run(["mpg123", "-q", "-m", "-r", str(rate), "-w", path, mp3], check=True)
+    finally:
+        os.remove(mp3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthesize missing WAV turns for a benchmark scenario")
+    parser.add_argument("--scenario", default=os.path.join(HERE, "scenario.json"))
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--force", action="store_true", help="regenerate files that already exist")
+    args = parser.parse_args()
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    scenario_dir = os.path.dirname(os.path.abspath(args.scenario))
+
+    made = 0
+    for session in scenario["sessions"]:
+        for turn in session["turns"]:
+            if not turn.get("wav"):
+                continue
+            path = os.path.join(scenario_dir, turn["wav"])
+            if os.path.exists(path) and not args.force:
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            print(f"{turn['wav']}: {turn['text']}")
+            make_recording(turn["text"], path, args.rate)
+            made += 1
+
+    print(f"{made} recordings written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
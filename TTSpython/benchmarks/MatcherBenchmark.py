@@ -0,0 +1,120 @@
+"""
+Micro-benchmark for the question matchers in QuestionMatcher.py.
+
+Generates N synthetic stored questions, asks noisy variants of some of
+them (dropped/duplicated letters and words, like Vosk output) and reports
+build time, per-query latency and how often each backend agrees with the
+exact WRatio scan (rapidfuzz) on the best match.
+
+    cd TTSpython
+    python benchmarks/MatcherBenchmark.py --sizes 100 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import QuestionMatcher
+from QuestionMatcher import BACKENDS, HAVE_FUZZYWUZZY, HAVE_RAPIDFUZZ
+
+SUBJECTS = [
+    "databases", "algorithms", "operating systems", "computer networks", "compilers",
+    "graphics", "machine learning", "physics", "mathematical analysis", "linear algebra",
+    "programming", "electronics", "digital design", "software engineering", "security",
+]
+TEMPLATES = [
+    "when is the {s} lab for group {n}",
+    "where is the {s} exam in session {n}",
+    "who teaches the {s} course this year {n}",
+    "how many credits is {s} worth in year {n}",
+    "what is the deadline for the {s} project number {n}",
+    "in which room is the {s} seminar {n}",
+    "is the {s} lab mandatory for series {n}",
+    "when are the {s} retake exams {n}",
+]
+NUMBERS = ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten"]
+
+
+def make_questions(n, rng):
+    questions = set()
+    while len(questions) < n:
+        template = rng.choice(TEMPLATES)
+        number = " ".join(rng.choice(NUMBERS) for _ in range(rng.randint(1, 3)))
+        questions.add(template.format(s=rng.choice(SUBJECTS), n=number))
+    return sorted(questions)
+
+
+def add_noise(text, rng):
+    words = text.split()
+    if len(words) > 3 and rng.random() < 0.5:
+        words.pop(rng.randrange(len(words)))
+    chars = list(" ".join(words))
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(chars))
+        if rng.random() < 0.5:
+            chars.pop(i)
+        else:
+            chars.insert(i, chars[i])
+    return "".join(chars)
+
+
+def bench(backend, questions, queries, cutoff):
+    start = time.perf_counter()
+    matcher = BACKENDS[backend](questions)
+    build = time.perf_counter() - start
+
+    best = []
+    start = time.perf_counter()
+    for q in queries:
+        hit = matcher.extract_one(q, score_cutoff=cutoff)
+        best.append(hit[2] if hit else None)
+    per_query = (time.perf_counter() - start) / len(queries)
+    return build, per_query, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question matcher scaling benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--cutoff", type=float, default=70)
+    parser.add_argument("--max-fuzzywuzzy", type=int, default=10000,
+                        help="skip the pure-Python backend above this size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    backends = []
+    if HAVE_FUZZYWUZZY:
+        backends.append("fuzzywuzzy")
+    if HAVE_RAPIDFUZZ:
+        backends.append("rapidfuzz")
+    backends.append("tfidf")
+    reference = "rapidfuzz" if HAVE_RAPIDFUZZ else backends[0]
+
+    print(f"{'size':>8} {'backend':<11}{'build ms':>10}{'query ms':>10}{'agree':>8}{'hit':>7}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        questions = make_questions(size, rng)
+        targets = [rng.randrange(size) for _ in range(args.queries)]
+        queries = [add_noise(questions[t], rng) for t in targets]
+        # Match against the normalized text, as search_database does
+        queries = [QuestionMatcher.preprocess(q) for q in queries]
+
+        results = {}
+        for backend in backends:
+            if backend == "fuzzywuzzy" and size > args.max_fuzzywuzzy:
+                continue
+            results[backend] = bench(backend, questions, queries, args.cutoff)
+
+        ref_best = results[reference][2]
+        for backend, (build, per_query, best) in results.items():
+            agree = sum(a == b for a, b in zip(best, ref_best)) / len(queries)
+            hit = sum(b == t for b, t in zip(best, targets)) / len(queries)
+            print(f"{size:>8} {backend:<11}{build * 1000:>10.1f}{per_query * 1000:>10.3f}"
+                  f"{agree:>8.0%}{hit:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+CPU time and allocation comparison: streaming polyphase resampler vs the
+previous resampy path in StudentReceiver.record_audio.
+
+The old path collected 1024-sample int16 blocks, concatenated them, cast to
+float32, ran resampy.resample on the whole capture and cast back to int16.
+The new path resamples each block as it arrives into a reused buffer.
+
+    cd TTSpython
+    python benchmarks/ResamplerBenchmark.py --rates 44100 48000 --seconds 5
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from Resampler import PolyphaseResampler
+
+try:
+    import resampy
+    HAVE_RESAMPY = True
+except ImportError:
+    print("resampy not installed: only the polyphase path is measured")
+    HAVE_RESAMPY = False
+
+MODEL_RATE = 16000
+BLOCK = 1024
+
+
+def make_blocks(rate, seconds, seed=0):
+    """Speech-band test signal, split the way sounddevice delivers it."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    signal = 6000 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t))
+    signal += 2000 * np.sin(2 * np.pi * 1800 * t) + rng.normal(0, 300, len(t))
+    audio = np.clip(signal, -32768, 32767).astype(np.int16)
+    return [audio[i:i + BLOCK].reshape(-1, 1) for i in range(0, len(audio), BLOCK)]
+
+
+def resampy_path(blocks, rate):
+    audio = np.concatenate(blocks).flatten()
+    out = resampy.resample(audio.astype(np.float32), rate, MODEL_RATE)
+    return np.array(out, dtype=np.int16)
+
+
+def make_polyphase_path(rate, total):
+    resampler = PolyphaseResampler(rate, MODEL_RATE)
+    out = np.empty(resampler.max_output(total + BLOCK), dtype=np.int16)
+
+    def run(blocks, _rate):
+        resampler.reset()
+        written = 0
+        for block in blocks:
+            written += resampler.process_into(block[:, 0], out, written)
+        return out[:written]
+
+    return run
+
+
+def measure(fn, blocks, rate, repeat):
+    fn(blocks, rate)  # warm-up (filter design, numba JIT for resampy)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        fn(blocks, rate)
+    cpu = (time.process_time() - cpu_start) / repeat
+    wall = (time.perf_counter() - wall_start) / repeat
+
+    tracemalloc.start()
+    fn(blocks, rate)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resampler CPU/allocation benchmark")
+    parser.add_argument("--rates", type=int, nargs="+", default=[44100, 48000])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'rate':>7} {'path':<10}{'cpu ms':>9}{'wall ms':>9}{'peak alloc KiB':>16}")
+    for rate in args.rates:
+        blocks = make_blocks(rate, args.seconds)
+        total = sum(len(b) for b in blocks)
+
+        paths = [("polyphase", make_polyphase_path(rate, total))]
+        if HAVE_RESAMPY:
+            paths.insert(0, ("resampy", resampy_path))
+
+        for name, fn in paths:
+            cpu, wall, peak = measure(fn, blocks, rate, args.repeat)
+            print(f"{rate:>7} {name:<10}{cpu * 1000:>9.1f}{wall * 1000:>9.1f}{peak / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
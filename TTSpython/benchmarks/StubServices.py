@@ -0,0 +1,153 @@
+"""
+Local stand-ins for the outbound services used by the kiosk.
+
+One threaded HTTP server answers for the announcements page, Nominatim,
+Overpass and openrouteservice, each with a configurable artificial delay,
+so benchmark runs need no internet. gTTS talks to a fixed Google endpoint,
+so it is replaced in-process by FakeGTTS instead.
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANNOUNCEMENTS_HTML = """<html><body>
+<h1>Anunturi</h1>
+<div>15-01-2025 10:00
+Rezultate concurs burse de merit semestrul I</div>
+<div>12-01-2025 09:30
+Inscrieri la programul de voluntariat ESC</div>
+<div>10-01-2025 14:15
+Chestionar de evaluare a cursurilor</div>
+<div>05-01-2025 08:00
+Program secretariat in sesiunea de iarna</div>
+<div>20-12-2024 12:00
+Google DeepMind scholarship registration open</div>
+<div>18-12-2024 16:45
+Rezultate admitere master</div>
+<a href="/anunturi/burse.html">Rezultate concurs burse de merit semestrul I</a>
+</body></html>
+"""
+
+# A short route inside Cluj-Napoca (Google encoded polyline format)
+ROUTE_POLYLINE = "__n|Go~doCjC~sAjCvcAz@~p@"
+
+PLACES = {
+    "default": (46.7712, 23.6236, "Cluj-Napoca"),
+    "library": (46.7695, 23.5910, "Biblioteca Centrala Universitara"),
+    "cafe": (46.7701, 23.5899, "Cafe Central"),
+    "restaurant": (46.7688, 23.5875, "Cantina Studenteasca"),
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    hits = {}
+
+    def _reply(self, body, content_type="application/json"):
+        if self.delay:
+            time.sleep(self.delay)
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _count(self, route):
+        StubHandler.hits[route] = StubHandler.hits.get(route, 0) + 1
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path.endswith("anunturi.html"):
+            self._count("announcements")
+            self._reply(ANNOUNCEMENTS_HTML, "text/html; charset=utf-8")
+        elif path.startswith("/search"):
+            # Nominatim geocoding
+            self._count("nominatim")
+            lat, lon, name = PLACES["default"]
+            self._reply(json.dumps([{
+                "lat": str(lat), "lon": str(lon), "display_name": name,
+                "place_id": 1, "osm_type": "node", "osm_id": 1,
+            }]))
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode(errors="replace")
+
+        if path.startswith("/api/interpreter"):
+            # Overpass: answer with the stock place whose keyword appears in the query
+            self._count("overpass")
+            lat, lon, name = PLACES["library"]
+            for keyword, place in PLACES.items():
+                if keyword in body.lower():
+                    lat, lon, name = place
+                    break
+            self._reply(json.dumps({
+                "version": 0.6,
+                "generator": "stub",
+                "elements": [{"type": "node", "id": 1, "lat": lat, "lon": lon, "tags": {"name": name}}],
+            }))
+        elif path.startswith("/v2/directions"):
+            # openrouteservice directions
+            self._count("ors")
+            self._reply(json.dumps({
+                "routes": [{"summary": {"distance": 2350.0, "duration": 300.0}, "geometry": ROUTE_POLYLINE}],
+            }))
+        else:
+            self.send_error(404)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self, delay_ms=0, host="127.0.0.1", port=0):
+        StubHandler.delay = delay_ms / 1000.0
+        StubHandler.hits = {}
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+
+    @property
+    def netloc(self):
+        return f"{self.host}:{self.port}"
+
+    @property
+    def base_url(self):
+        return f"http://{self.netloc}"
+
+    @property
+    def hits(self):
+        return dict(StubHandler.hits)
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeGTTS:
+    """Drop-in for gtts.gTTS: sleeps like a network synth, writes a stub mp3."""
+
+    # Seconds of synthesis delay: fixed cost + per character
+    base_delay = 0.15
+    per_char_delay = 0.002
+    calls = 0
+
+    def __init__(self, text, lang="en", **kwargs):
+        self.text = text
+        self.lang = lang
+
+    def save(self, savefile):
+        FakeGTTS.calls += 1
+        time.sleep(self.base_delay + self.per_char_delay * len(self.text))
+        with open(savefile, "wb") as f:
+            f.write(b"ID3" + os.urandom(256))
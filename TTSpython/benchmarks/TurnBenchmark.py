@@ -0,0 +1,419 @@
+"""
+Offline end-to-end benchmark for the kiosk interaction loop.
+
+Drives TTS.interaction_loop from recorded WAV files (or text transcripts
+when no Vosk model / recording is available), feeds student names through
+a real named pipe, and points every outbound service at local stubs.
+Reports per-stage and end-to-end turn latency, CPU time and peak RSS, and
+can diff the run against a previous results file.
+
+The recordings are not checked in; MakeRecordings.py synthesizes them.
+Without them (or without --model) the run is transcript-only and the
+capture, resample and asr_decode stages are not measured. No mic,
+speaker or PortAudio is needed in either mode.
+
+    cd TTSpython
+    python benchmarks/MakeRecordings.py
+    python benchmarks/TurnBenchmark.py --scenario benchmarks/scenario.json \
+        --model models/vosk-model-small-en-us-0.15 --out bench.json
+    python benchmarks/TurnBenchmark.py --baseline bench.json
+"""
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import numpy as np
+from vosk import Model, KaldiRecognizer
+
+import AnswerAudio
+import FindStudentsInfo
+import Prefetch
+import TTS
+from AsrGrammar import GrammarBuilder
+from AsrWorker import AsrWorker
+from IdentityChannel import IdentityChannel
+from InteractionLog import interactions
+from LatencyTracker import tracker
+from StudentReceiver import StudentReceiver
+from TestMonitor import MapAssistant
+from TurnProfiler import TurnProfiler
+from StubServices import StubServer, FakeGTTS
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS students(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nume TEXT, facultate TEXT, serie TEXT, grupa TEXT)""",
+    """CREATE TABLE IF NOT EXISTS series_questions(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        facultate TEXT, serie TEXT, intrebare TEXT, raspuns TEXT)""",
+    """CREATE TABLE IF NOT EXISTS group_questions(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        facultate TEXT, grupa TEXT, intrebare TEXT, raspuns TEXT)""",
+    """CREATE TABLE IF NOT EXISTS general_questions(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        intrebare TEXT, raspuns TEXT)""",
+]
+
+
+# -------------------------
+# Audio / identity stand-ins
+# -------------------------
+
+class FileReceiver(StudentReceiver):
+    """StudentReceiver that plays scripted turns instead of opening the mic."""
+
+    def __init__(self, pipe_path, model_path=None, realtime=False, use_grammar=False, asr_worker=False):
+        # No mic detection or pre-warm: there is no audio hardware here
+        self.samplerate = 16000
+        self.pipe_path = pipe_path
+        self.realtime = realtime
+        self.turns = deque()
+        self.current = None
+        self.asr_turns = 0
+        self.asr_exact = 0
+
+        self.model = None
+        self.rec = None
+        self.worker = None
+        self._streamed = False
+        have_model = bool(model_path and os.path.isdir(model_path))
+        if have_model and asr_worker:
+            print(f"Starting ASR worker with model {model_path} ...")
+            self.worker = AsrWorker(model_path, self.samplerate)
+        elif have_model:
+            print(f"Loading Vosk model from {model_path} ...")
+            self.model = Model(model_path)
+            self.rec = KaldiRecognizer(self.model, self.samplerate)
+        else:
+            print("No Vosk model given: WAV turns fall back to their transcripts.")
+        self.open_rec = self.rec
+        self.grammar = GrammarBuilder() if use_grammar and have_model else None
+        self.grammar_recs = {}
+        self.grammar_mode = None
+        self._worker_grammar = None
+        self.resamplers = {}
+        self.record_buffer = None
+
+        # Scripted sessions may repeat a student back to back: never treat them as still present
+        self.identity = IdentityChannel(self.pipe_path, absent_after=0).start()
+
+    def queue_turns(self, turns):
+        self.turns.extend(turns)
+
+    def _uses_asr(self, turn):
+        return (self.rec is not None or self.worker is not None) and turn.get("wav") and os.path.exists(turn["wav"])
+
+    def record_audio(self, duration=5, stop_event=None):
+        self.current = self.turns.popleft() if self.turns else {"text": "exit"}
+        if not self._uses_asr(self.current):
+            # Text-only turn: a one-sample placeholder keeps interaction_loop going
+            return np.zeros(1, dtype=np.int16)
+
+        with tracker.span("capture"):
+            with wave.open(self.current["wav"], "rb") as wav:
+                rate = wav.getframerate()
+                channels = wav.getnchannels()
+                frames = wav.readframes(wav.getnframes())
+            audio = np.frombuffer(frames, dtype=np.int16)
+            if channels > 1:
+                audio = audio.reshape(-1, channels)[:, 0]
+            if self.worker is not None:
+                return self._stream_wav(audio, rate)
+            if self.realtime:
+                time.sleep(len(audio) / rate)
+
+        if np.abs(audio).mean() < 50:
+            return None  # silence
+
+        return self.to_model_rate(audio, rate)
+
+    def _stream_wav(self, audio, rate):
+        """Feed the worker block by block, as record_audio does with the mic."""
+        resampler = self.resampler_for(rate)
+        resampler.reset()
+        self._streamed = True
+        self._stream_to_worker(self.worker.reset)
+        parts = []
+        for start in range(0, len(audio), 1024):
+            block = audio[start:start + 1024]
+            part = resampler.process(block)
+            if self._streamed and len(part):
+                self._stream_to_worker(self.worker.feed, part)
+            parts.append(part)
+            if self.realtime:
+                time.sleep(len(block) / rate)
+
+        if np.abs(audio).mean() < 50:
+            self._streamed = False
+            return None  # silence
+        return np.concatenate(parts)
+
+    def recognize_audio(self, audio):
+        turn = self.current or {}
+        if not self._uses_asr(turn):
+            return turn.get("text", "")
+
+        text = super().recognize_audio(audio)
+        self.asr_turns += 1
+        if TTS.normalize(text) == TTS.normalize(turn.get("text", "")):
+            self.asr_exact += 1
+        return text
+
+
+class IdentityFeed(threading.Thread):
+    """Writes one student name into the FIFO, like FaceRecognition does."""
+
+    def __init__(self, pipe_path, name):
+        super().__init__(daemon=True)
+        self.pipe_path = pipe_path
+        self.name = name
+        self.sent_at = None
+
+    def run(self):
+        with open(self.pipe_path, "w") as pipe:
+            self.sent_at = time.monotonic()
+            pipe.write(self.name + "\n")
+
+
+# -------------------------
+# Setup
+# -------------------------
+
+def build_database(path, seed):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    for statement in SCHEMA:
+        c.execute(statement)
+    for s in seed.get("students", []):
+        c.execute("INSERT INTO students(nume, facultate, serie, grupa) VALUES (?, ?, ?, ?)",
+                  (s["nume"], s.get("facultate", "AC"), s["serie"], s["grupa"]))
+    for q in seed.get("group_questions", []):
+        c.execute("INSERT INTO group_questions(facultate, grupa, intrebare, raspuns) VALUES (?, ?, ?, ?)",
+                  (q.get("facultate", "AC"), q["grupa"], q["intrebare"], q["raspuns"]))
+    for q in seed.get("series_questions", []):
+        c.execute("INSERT INTO series_questions(facultate, serie, intrebare, raspuns) VALUES (?, ?, ?, ?)",
+                  (q.get("facultate", "AC"), q["serie"], q["intrebare"], q["raspuns"]))
+    for q in seed.get("general_questions", []):
+        c.execute("INSERT INTO general_questions(intrebare, raspuns) VALUES (?, ?)",
+                  (q["intrebare"], q["raspuns"]))
+    conn.commit()
+    return conn
+
+
+def patch_services(stubs, tts_latency_ms):
+    FakeGTTS.base_delay = tts_latency_ms / 1000.0
+    TTS.gTTS = FakeGTTS
+    AnswerAudio.gTTS = FakeGTTS
+    TTS.PLAYER_CMD = ["true"]
+    TTS.POST_PLAYBACK_PAUSE = 0
+
+    FindStudentsInfo.ANNOUNCEMENTS_URL = stubs.base_url + "/anunturi.html"
+    FindStudentsInfo.TRANSLATE_TO_ENGLISH = False
+    FindStudentsInfo._announcements_cache = None
+    FindStudentsInfo._announcement_index = None  # opened in the workdir on first use
+    FindStudentsInfo.open_in_browser = lambda url: True
+
+    return MapAssistant(
+        start_address="Cluj-Napoca, Romania",
+        open_browser=False,
+        nominatim_domain=stubs.netloc,
+        overpass_url=stubs.base_url + "/api/interpreter",
+        ors_base_url=stubs.base_url,
+    )
+
+
+def resolve_paths(scenario, scenario_dir):
+    for session in scenario["sessions"]:
+        for turn in session["turns"]:
+            if turn.get("wav") and not os.path.isabs(turn["wav"]):
+                turn["wav"] = os.path.join(scenario_dir, turn["wav"])
+
+
+# -------------------------
+# Run
+# -------------------------
+
+def run(args):
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    resolve_paths(scenario, os.path.dirname(os.path.abspath(args.scenario)))
+    wavs = [t["wav"] for s in scenario["sessions"] for t in s["turns"] if t.get("wav")]
+    missing = [w for w in wavs if not os.path.exists(w)]
+    if missing:
+        print(f"{len(missing)} of {len(wavs)} recordings are missing (run benchmarks/MakeRecordings.py): "
+              "those turns use their transcripts")
+    model_path = os.path.abspath(args.model) if args.model else None
+    profile_dir = os.path.abspath(args.profile_dir)
+
+    workdir = tempfile.mkdtemp(prefix="sg_bench_")
+    os.chdir(workdir)  # speak_response and the map write into the cwd
+
+    conn = build_database(os.path.join(workdir, "students_db.db"), scenario.get("seed", {}))
+    stubs = StubServer(delay_ms=args.service_latency_ms).start()
+    mapper = patch_services(stubs, args.tts_latency_ms)
+
+    # Answer audio lives in the workdir; --prerender does what the TCPserver does at ingest
+    TTS.answer_audio = AnswerAudio.AnswerAudioStore(os.path.join(workdir, "answer_audio"))
+    if args.prerender:
+        rendered, _ = TTS.answer_audio.sync(conn)
+        print(f"Pre-rendered {rendered} answers")
+        FakeGTTS.calls = 0
+    receiver = FileReceiver(os.path.join(workdir, "studentName_pipe"), model_path, args.realtime, args.grammar,
+                            args.asr_worker)
+
+    Prefetch.PREFETCH = Prefetch.PREFETCH and not args.no_prefetch
+    tracker.enabled = True
+    tracker.reset()
+    profiler = TurnProfiler(tracker, profile_dir)
+    if args.profile:
+        profiler.arm(args.profile)
+
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.monotonic()
+    sessions = 0
+
+    try:
+        for _ in range(args.repeat):
+            for session in scenario["sessions"]:
+                receiver.queue_turns(session["turns"] + [{"text": "exit"}])
+                feed = IdentityFeed(receiver.pipe_path, session["student"])
+                feed.start()
+
+                student_name = receiver.start_listening()
+                feed.join()
+                tracker.record("identify", time.monotonic() - feed.sent_at)
+
+                prefetch = TTS.begin_prefetch(student_name)
+                try:
+                    row = conn.execute("SELECT grupa, serie FROM students WHERE nume = ?",
+                                       (student_name,)).fetchone()
+                    if row is None:
+                        print(f"Scenario student '{student_name}' is not in the seed data, skipping")
+                        receiver.turns.clear()
+                        continue
+
+                    TTS.prefetch_session(prefetch, conn, row[0], row[1])
+                    TTS.interaction_loop(
+                        MAX_IDLE=args.max_idle,
+                        receiver=receiver,
+                        student_name=student_name,
+                        conn=conn,
+                        mapper=mapper,
+                        grupa=row[0],
+                        serie=row[1],
+                        prefetch=prefetch,
+                    )
+                finally:
+                    prefetch.close()
+                sessions += 1
+    finally:
+        wall = time.monotonic() - wall_start
+        usage_end = resource.getrusage(resource.RUSAGE_SELF)
+        profiler.stop()
+        interactions.close()
+        stubs.stop()
+        receiver.cleanup()
+        conn.close()
+
+    stats = tracker.stats()
+    cpu = (usage_end.ru_utime - usage_start.ru_utime) + (usage_end.ru_stime - usage_start.ru_stime)
+    return {
+        "scenario": os.path.basename(args.scenario),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "sessions": sessions,
+        "turns": stats["stages"].get("turn", {}).get("count", 0),
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "peak_rss_mb": round(usage_end.ru_maxrss / 1024.0, 1),
+        "asr_turns": receiver.asr_turns,
+        "asr_exact_match": receiver.asr_exact,
+        "tts_calls": FakeGTTS.calls,
+        "service_hits": stubs.hits,
+        "stages": stats["stages"],
+    }
+
+
+# -------------------------
+# Reporting
+# -------------------------
+
+def print_report(result, baseline=None):
+    print(f"\nSessions: {result['sessions']}  turns: {result['turns']}  "
+          f"wall: {result['wall_s']} s  cpu: {result['cpu_s']} s  peak RSS: {result['peak_rss_mb']} MB")
+    if result["asr_turns"]:
+        print(f"ASR exact matches: {result['asr_exact_match']}/{result['asr_turns']}")
+    print(f"Service hits: {result['service_hits']}  TTS calls: {result['tts_calls']}\n")
+
+    header = f"{'stage':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'base p50':>10}{'Δp50':>9}{'base p95':>10}{'Δp95':>9}"
+    print(header)
+
+    base_stages = baseline["stages"] if baseline else {}
+    for stage, s in result["stages"].items():
+        line = f"{stage:<14}{s['count']:>7}{s.get('p50_ms', 0):>10.1f}{s.get('p95_ms', 0):>10.1f}{s.get('p99_ms', 0):>10.1f}"
+        if baseline:
+            b = base_stages.get(stage)
+            if b and b.get("p50_ms"):
+                d50 = (s["p50_ms"] - b["p50_ms"]) / b["p50_ms"] * 100
+                d95 = (s["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b.get("p95_ms") else 0.0
+                line += f"{b['p50_ms']:>10.1f}{d50:>+8.1f}%{b['p95_ms']:>10.1f}{d95:>+8.1f}%"
+            else:
+                line += f"{'-':>10}{'':>9}{'-':>10}"
+        print(line)
+
+    if baseline:
+        for key in ("wall_s", "cpu_s", "peak_rss_mb"):
+            if baseline.get(key):
+                delta = (result[key] - baseline[key]) / baseline[key] * 100
+                print(f"{key:<14}{result[key]:>10} vs {baseline[key]:<10} ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline interaction loop benchmark")
+    parser.add_argument("--scenario", default=os.path.join(HERE, "scenario.json"))
+    parser.add_argument("--model", help="Vosk model directory (omit to use transcripts)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-idle", type=float, default=90)
+    parser.add_argument("--realtime", action="store_true", help="pace WAV capture at real time")
+    parser.add_argument("--grammar", action="store_true", help="decode with the constrained ASR grammars")
+    parser.add_argument("--prerender", action="store_true", help="render stored answers to audio before the run")
+    parser.add_argument("--asr-worker", action="store_true", help="decode in the Vosk worker process")
+    parser.add_argument("--service-latency-ms", type=float, default=50)
+    parser.add_argument("--tts-latency-ms", type=float, default=150)
+    parser.add_argument("--no-prefetch", action="store_true", help="start sessions cold, without the prefetch stage")
+    parser.add_argument("--profile", type=int, default=0, metavar="N", help="sample stacks for the first N turns")
+    parser.add_argument("--profile-dir", default="profiles", help="where --profile writes collapsed stacks")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from a previous run to compare against")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    result = run(args)
+    print_report(result, baseline)
+
+    if out:
+        with open(out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()